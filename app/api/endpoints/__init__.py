@@ -1,3 +1,7 @@
+from .analytics import router as analytics_router  # noqa
 from .meeting_room import router as meeting_room_router  # noqa
+from .metrics import router as metrics_router  # noqa
+from .monitoring import router as monitoring_router  # noqa
 from .reservation import router as reservation_router  # noqa
+from .reservation_series import router as reservation_series_router  # noqa
 from .user import router as user_router  # noqa
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import numpy as np
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.validators import check_time_window
+from app.core.analytics import (HOURS_IN_WEEK, MAX_REPORT_WINDOW,
+                                bounds_array, hour_window, peak_hours,
+                                to_epoch_minutes, utilization)
+from app.core.db import get_async_session
+from app.core.user import current_superuser
+from app.crud.meeting_room import meeting_room_crud
+from app.crud.reservation import reservation_crud
+from app.crud.reservation_series import reservation_series_crud
+from app.schemas.analytics import (PeakHour, RoomUtilization,
+                                   UtilizationReport)
+
+router = APIRouter()
+
+
+@router.get(
+    "/utilization",
+    response_model=UtilizationReport,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_utilization(
+    from_reserve: datetime,
+    to_reserve: datetime,
+    idle_threshold: float = Query(
+        0.05, ge=0, le=1,
+        description="Доля занятости, ниже которой комната простаивает",
+    ),
+    peaks: int = Query(10, ge=1, le=HOURS_IN_WEEK),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Получить загрузку комнат по часам недели за период.
+
+    - Интервал расширяется до целых часов.
+    - Для каждой комнаты возвращается доля занятого времени за весь период
+    и по каждому часу недели (7 дней с понедельника по 24 часа), а также
+    самые загруженные часы недели и простаивающие комнаты.
+    - Учитываются и вхождения повторяющихся бронирований.
+    - Доступен только пользователям с ролью администратора.
+    """
+    check_time_window(from_reserve, to_reserve, MAX_REPORT_WINDOW)
+    from_reserve, to_reserve = hour_window(from_reserve, to_reserve)
+    rooms = await meeting_room_crud.get_multi(session)
+    room_ids = np.array(sorted(room.id for room in rooms), dtype=np.int64)
+    bounds = await reservation_crud.get_minute_bounds(
+        from_reserve=from_reserve, to_reserve=to_reserve, session=session
+    )
+    occurrences = await reservation_series_crud.get_occurrences(
+        room_ids=None,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        session=session,
+    )
+    bounds = np.concatenate([bounds, bounds_array(
+        (
+            occurrence.meetingroom_id,
+            to_epoch_minutes(occurrence.from_reserve),
+            to_epoch_minutes(occurrence.to_reserve),
+        )
+        for occurrence in occurrences
+    )])
+
+    report = utilization(room_ids, bounds, from_reserve, to_reserve)
+    by_hour_of_week = report.by_hour_of_week.round(4)
+    total = report.total.round(4)
+    return UtilizationReport(
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        rooms=[
+            RoomUtilization(
+                room_id=room_id,
+                utilization=total[position],
+                by_hour_of_week=by_hour_of_week[position].reshape(
+                    7, 24
+                ).tolist(),
+            )
+            for position, room_id in enumerate(room_ids.tolist())
+        ],
+        peak_hours=[
+            PeakHour(
+                weekday=hour // 24,
+                hour=hour % 24,
+                utilization=round(mean, 4),
+            )
+            for hour, mean in peak_hours(by_hour_of_week, peaks)
+        ],
+        idle_rooms=room_ids[report.total < idle_threshold].tolist(),
+    )
@@ -1,19 +1,33 @@
-from typing import List
+import base64
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.validators import check_meeting_room_exists, check_name_duplicate
+from app.api.endpoints.reservation import (reservation_fields_without_user,
+                                           reservation_page,
+                                           reservation_page_key)
+from app.api.pagination import NEXT_CURSOR_HEADER, Page, PageParams, paginate
+from app.api.responses import encode_rows, rows_response, schema_fields
+from app.api.validators import (check_grid_slot, check_meeting_room_exists,
+                                check_name_duplicate, check_time_window)
+from app.core.availability import MAX_SEARCH_WINDOW, free_slots
 from app.core.db import get_async_session
+from app.core.grid import MAX_GRID_DAYS, MINUTES_IN_DAY, slot_bitmaps
 from app.core.user import current_superuser
 from app.crud.meeting_room import meeting_room_crud
 from app.crud.reservation import reservation_crud
-from app.schemas.meeting_room import (MeetingRoomCreate, MeetingRoomDB,
-                                      MeetingRoomUpdate)
+from app.schemas.meeting_room import (FreeSlot, MeetingRoomAvailability,
+                                      MeetingRoomCreate, MeetingRoomDB,
+                                      MeetingRoomUpdate, OccupancyGrid)
 from app.schemas.reservation import ReservationDB
 
 router = APIRouter()
 
+meeting_room_page = Page(Tuple[int])
+meeting_room_fields = schema_fields(MeetingRoomDB)
+
 
 @router.post(
     "/",
@@ -29,8 +43,8 @@ async def create_new_meeting_room(
 
     - Доступно только пользователям с ролью администратора.
     """
-    await check_name_duplicate(meeting_room.name, session)
-    new_room = await meeting_room_crud.create(meeting_room, session)
+    with check_name_duplicate():
+        new_room = await meeting_room_crud.create(meeting_room, session)
     return new_room
 
 
@@ -40,14 +54,128 @@ async def create_new_meeting_room(
     response_model_exclude_none=True,
 )
 async def get_all_meeting_rooms(
+    page: PageParams = Depends(meeting_room_page),
     session: AsyncSession = Depends(get_async_session),
 ):
     """Получить список всех комнат.
 
+    - Комнаты возвращаются страницами по `limit` штук, курсор следующей
+    страницы передаётся в заголовке X-Next-Cursor.
+    - Без `limit` и курсора возвращаются все комнаты.
+    - Доступен всем пользователям.
+    """
+    # Pages are cached serialized, a hit skips both the query and encoding.
+    key = ("page", page.after, page.limit)
+    cached = meeting_room_crud.cache.get(key)
+    if cached is None:
+        response = Response()
+        all_rooms = await meeting_room_crud.get_multi_rows(
+            session, after=page.after, limit=page.fetch
+        )
+        all_rooms = paginate(
+            response, all_rooms, page, lambda room: (room.id,)
+        )
+        body = encode_rows(all_rooms, meeting_room_fields, exclude_none=True)
+        cached = body, response.headers.get(NEXT_CURSOR_HEADER)
+        meeting_room_crud.cache.set(key, cached)
+    body, next_cursor = cached
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/availability",
+    response_model=List[MeetingRoomAvailability],
+    response_model_exclude_none=True,
+)
+async def get_free_meeting_rooms(
+    from_reserve: datetime,
+    to_reserve: datetime,
+    min_duration: Optional[int] = Query(
+        None, ge=1, description="Минимальная длительность слота в минутах"
+    ),
+    granularity: int = Query(
+        1, ge=1, le=24 * 60, description="Шаг сетки слотов в минутах"
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Найти свободные комнаты и свободные слоты в них.
+
+    - Границы слотов лежат на сетке с шагом `granularity` минут от начала
+    интервала поиска и не касаются существующих бронирований, поэтому
+    любой найденный слот можно забронировать целиком.
+    - В ответ попадают только комнаты, где есть хотя бы один слот не
+    короче `min_duration` минут.
     - Доступен всем пользователям.
     """
-    all_rooms = await meeting_room_crud.get_multi(session)
-    return all_rooms
+    check_time_window(from_reserve, to_reserve, MAX_SEARCH_WINDOW)
+    rooms = await meeting_room_crud.get_busy_intervals(
+        from_reserve=from_reserve, to_reserve=to_reserve, session=session
+    )
+    availability = []
+    for room, busy in rooms:
+        slots = [
+            FreeSlot(from_reserve=slot_from, to_reserve=slot_to)
+            for slot_from, slot_to in free_slots(
+                busy,
+                from_reserve,
+                to_reserve,
+                timedelta(minutes=granularity),
+                timedelta(minutes=min_duration or 0),
+            )
+        ]
+        if slots:
+            availability.append(MeetingRoomAvailability(
+                room=MeetingRoomDB.from_orm(room), free_slots=slots
+            ))
+    return availability
+
+
+@router.get("/grid", response_model=OccupancyGrid)
+async def get_occupancy_grid(
+    day: date,
+    days: int = Query(1, ge=1, le=MAX_GRID_DAYS),
+    slot: int = Query(
+        15, ge=1, le=MINUTES_IN_DAY, description="Длина слота в минутах"
+    ),
+    rooms: Optional[List[int]] = Query(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Получить занятость комнат по слотам для календаря.
+
+    - Сетка начинается в полночь дня `day` и длится `days` дней, длина
+    слота `slot` должна делить сутки нацело (5, 10, 15, 30, 60 минут...).
+    - Для каждой комнаты возвращается битовая карта в base64: бит на слот
+    по порядку, начиная со старшего бита первого байта, последний байт
+    дополнен нулями. Бит установлен, если бронь или вхождение серии
+    занимает хотя бы минуту слота.
+    - Без `rooms` возвращаются все комнаты.
+    - Доступен всем пользователям.
+    """
+    check_grid_slot(slot)
+    if rooms is None:
+        room_ids = sorted(
+            room.id for room in await meeting_room_crud.get_multi(session)
+        )
+    else:
+        room_ids = sorted(
+            await meeting_room_crud.get_existing_ids(rooms, session)
+        )
+    minutes = await meeting_room_crud.get_minute_bitmaps(
+        room_ids=room_ids, first_day=day, days=days, session=session
+    )
+    bitmaps = slot_bitmaps(minutes, slot)
+    from_reserve = datetime.combine(day, time())
+    return OccupancyGrid(
+        from_reserve=from_reserve,
+        to_reserve=from_reserve + timedelta(days=days),
+        slot_minutes=slot,
+        slots=days * MINUTES_IN_DAY // slot,
+        rooms={
+            room_id: base64.b64encode(bitmap.tobytes()).decode()
+            for room_id, bitmap in zip(room_ids, bitmaps)
+        },
+    )
 
 
 @router.patch(
@@ -66,13 +194,10 @@ async def partially_update_meeting_room(
     - Доступен только пользователям с ролью администратора.
     """
     meeting_room = await check_meeting_room_exists(meeting_room_id, session)
-
-    if obj_in.name is not None:
-        await check_name_duplicate(obj_in.name, session)
-
-    meeting_room = await meeting_room_crud.update(
-        meeting_room, obj_in, session
-    )
+    with check_name_duplicate():
+        meeting_room = await meeting_room_crud.update(
+            meeting_room, obj_in, session
+        )
     return meeting_room
 
 
@@ -103,15 +228,26 @@ async def remove_meeting_room(
 )
 async def get_reservations_for_room(
     meeting_room_id: int,
+    response: Response,
+    page: PageParams = Depends(reservation_page),
     session: AsyncSession = Depends(get_async_session),
 ):
     """Получить список броней по комнате.
 
     - Ответ содержит только актуальные бронирования.
+    - Брони возвращаются страницами, как и в списке всех бронирований.
     - Доступен только пользователям с ролью администратора.
     """
     await check_meeting_room_exists(meeting_room_id, session)
     reservations = await reservation_crud.get_future_reservations_for_room(
-        room_id=meeting_room_id, session=session
+        room_id=meeting_room_id,
+        session=session,
+        after=page.after,
+        limit=page.fetch,
+    )
+    reservations = paginate(response, reservations, page, reservation_page_key)
+    return rows_response(
+        reservations,
+        reservation_fields_without_user,
+        headers=response.headers,
     )
-    return reservations
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.core.metrics import render
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Получить метрики сервиса в текстовом формате Prometheus.
+
+    - Время и число запросов по маршрутам и статус-кодам, запросы в
+    обработке, время SQL-выражений и состояние пула соединений.
+    - Доступен без авторизации: доступ к нему ограничивается на уровне
+    сети или прокси.
+    """
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,40 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.cache import caches
+from app.core.db import engine
+from app.core.pool import pool_stats
+from app.core.user import current_superuser
+from app.schemas.monitoring import CacheStats, PoolStats
+
+router = APIRouter()
+
+
+@router.get(
+    "/caches",
+    response_model=Dict[str, CacheStats],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_cache_stats():
+    """Получить размер и счётчики попаданий кэшей процесса.
+
+    - Счётчики считаются с запуска процесса отдельно в каждом воркере.
+    - Доступен только пользователям с ролью администратора.
+    """
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStats,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_pool_stats():
+    """Получить состояние пула соединений с базой данных.
+
+    - Выданные и свободные соединения, переполнение пула, число выдач
+    соединений и время ожидания выдачи с запуска процесса.
+    - Доступен только пользователям с ролью администратора.
+    """
+    return pool_stats(engine.sync_engine.pool)
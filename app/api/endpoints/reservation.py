@@ -1,20 +1,44 @@
-from typing import List
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.validators import (check_meeting_room_exists,
+from app.api.events import publish
+from app.api.export import MEDIA_TYPES, encode_chunks
+from app.api.pagination import Page, PageParams, paginate
+from app.api.responses import rows_response, schema_fields
+from app.api.validators import (check_batch_reservations,
+                                check_meeting_room_exists,
                                 check_reservation_before_edit,
                                 check_reservation_intersections)
 from app.core.db import get_async_session
-from app.core.user import current_user
+from app.core.events import broker
+from app.core.locks import room_lock
+from app.core.user import (current_superuser, current_user,
+                           current_websocket_user)
 from app.crud.reservation import reservation_crud
 from app.models import User
-from app.schemas.reservation import (ReservationCreate, ReservationDB,
-                                     ReservationUpdate)
+from app.schemas.reservation import (BatchItemStatus, ExportFormat,
+                                     ReservationBatchCreate,
+                                     ReservationBatchItemResult,
+                                     ReservationBatchResult, ReservationCreate,
+                                     ReservationDB, ReservationUpdate)
 
 router = APIRouter()
 
+reservation_page = Page(Tuple[datetime, int])
+reservation_fields = schema_fields(ReservationDB)
+reservation_fields_without_user = schema_fields(
+    ReservationDB, exclude={"user_id"}
+)
+
+
+def reservation_page_key(reservation):
+    return reservation.from_reserve, reservation.id
+
 
 @router.post("/", response_model=ReservationDB)
 async def create_reservation(
@@ -26,28 +50,197 @@ async def create_reservation(
 
     - Доступен всем авторизированным пользователям.
     """
-    await check_meeting_room_exists(reservation.meetingroom_id, session)
-    await check_reservation_intersections(
-        **reservation.dict(), session=session
+    new_reservation = await reservation_crud.create_if_free(
+        reservation, session, user
     )
-    new_reservation = await reservation_crud.create(reservation, session, user)
+    if new_reservation is not None:
+        await publish("reservation", "created", new_reservation)
+        return new_reservation
+    # Find out why the reservation was not inserted. If it only intersects
+    # the span of a series between its occurrences, it is created here.
+    # The checks and the insert must not interleave with other bookings of
+    # the room, in this process or in other workers. The room is read from
+    # the database under the lock: a cached one may be already deleted.
+    async with room_lock(session, reservation.meetingroom_id):
+        await check_meeting_room_exists(
+            reservation.meetingroom_id, session, cached=False
+        )
+        await check_reservation_intersections(
+            **reservation.dict(), session=session
+        )
+        new_reservation = await reservation_crud.create(
+            reservation, session, user
+        )
+    await publish("reservation", "created", new_reservation)
     return new_reservation
 
 
+@router.post("/batch", response_model=ReservationBatchResult)
+async def create_reservations_batch(
+    batch: ReservationBatchCreate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Забронировать несколько комнат одним запросом.
+
+    - Доступен всем авторизированным пользователям.
+    - В режиме `atomic` создаются все брони или ни одной: если хотя бы одна
+    бронь не прошла проверку, возвращается статус-код 422 с результатом
+    проверки каждой брони.
+    - В режиме `best_effort` создаются только брони, прошедшие проверку.
+    - Брони из одного запроса не должны пересекаться между собой: из двух
+    пересекающихся создаётся более ранняя.
+    """
+    reservations = batch.reservations
+    async with room_lock(
+        session, *(reservation.meetingroom_id for reservation in reservations)
+    ):
+        failures = await check_batch_reservations(
+            reservations, batch.mode, session
+        )
+        accepted = [
+            index for index in range(len(reservations))
+            if index not in failures
+        ]
+        created = []
+        if accepted:
+            created = await reservation_crud.create_multi(
+                [reservations[index] for index in accepted], session, user
+            )
+
+    for reservation in created:
+        await publish("reservation", "created", reservation)
+    results = [
+        ReservationBatchItemResult(index=index, status=status, detail=detail)
+        for index, (status, detail) in failures.items()
+    ]
+    results.extend(
+        ReservationBatchItemResult(
+            index=index,
+            status=BatchItemStatus.created,
+            reservation=ReservationDB.from_orm(reservation),
+        )
+        for index, reservation in zip(accepted, created)
+    )
+    results.sort(key=lambda result: result.index)
+    return ReservationBatchResult(created=len(created), results=results)
+
+
 @router.get(
     "/",
     response_model=List[ReservationDB],
     dependencies=[Depends(current_user)],
 )
 async def get_all_reservations(
+    response: Response,
+    page: PageParams = Depends(reservation_page),
     session: AsyncSession = Depends(get_async_session),
 ):
     """Получить список всех актуальных бронирований.
 
+    - Брони отсортированы по времени начала и возвращаются страницами по
+    `limit` штук, курсор следующей страницы передаётся в заголовке
+    X-Next-Cursor. Без `limit` и курсора возвращаются все брони.
     - Доступен всем авторизированным пользователям.
     """
-    reservations = await reservation_crud.get_future_reservations(session)
-    return reservations
+    reservations = await reservation_crud.get_future_reservations(
+        session, after=page.after, limit=page.fetch
+    )
+    reservations = paginate(response, reservations, page, reservation_page_key)
+    return rows_response(
+        reservations, reservation_fields, headers=response.headers
+    )
+
+
+async def _send_events(websocket: WebSocket, subscription) -> None:
+    while True:
+        message = await subscription.get()
+        if message is None:
+            await websocket.close(
+                code=status.WS_1013_TRY_AGAIN_LATER,
+                reason="Клиент не успевает получать события",
+            )
+            return
+        await websocket.send_text(message)
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    # Messages of the client are not expected.
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/live")
+async def live_reservations(
+    websocket: WebSocket,
+    rooms: List[int] = Query([]),
+    user: Optional[User] = Depends(current_websocket_user),
+):
+    """Получать изменения бронирований вместо опроса списка броней.
+
+    - Сообщения — JSON-объекты с типом события (`reservation.created`,
+    `reservation.updated`, `reservation.deleted`, то же для `series`),
+    переговоркой и бронью или серией в том же виде, что и в ответах API.
+    - Переговорки задаются параметрами `rooms`, без них приходят события
+    всех переговорок.
+    - Токен передаётся в параметре `token` или в заголовке Authorization.
+    - Клиент, не успевающий получать события, отключается с кодом 1013,
+    после переподключения нужно заново загрузить брони.
+    - Доступен всем авторизированным пользователям.
+    """
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    with broker.hub.subscribe(rooms) as subscription:
+        tasks = {
+            asyncio.ensure_future(_send_events(websocket, subscription)),
+            asyncio.ensure_future(_wait_disconnect(websocket)),
+        }
+        try:
+            done, _ = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            # A send fails when the client has just left, it is not an error.
+            task.exception()
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(current_superuser)],
+)
+async def export_reservations(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    from_reserve: Optional[datetime] = None,
+    to_reserve: Optional[datetime] = None,
+    meetingroom_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Выгрузить историю бронирований в формате NDJSON или CSV.
+
+    - Выгружаются брони, начинающиеся в промежутке
+    [`from_reserve`, `to_reserve`), в том числе завершённые; можно
+    ограничить выгрузку одной переговоркой.
+    - Ответ передаётся по частям и не собирается в памяти целиком.
+    - Доступен только пользователям с ролью администратора.
+    """
+    chunks = reservation_crud.stream_rows(
+        session, from_reserve, to_reserve, meetingroom_id
+    )
+    return StreamingResponse(
+        encode_chunks(chunks, export_format, list(ReservationDB.__fields__)),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=reservations.{export_format.value}"
+            ),
+        },
+    )
 
 
 @router.delete("/{reservation_id}", response_model=ReservationDB)
@@ -64,6 +257,7 @@ async def delete_reservations(
         reservation_id, session, user
     )
     reservation = await reservation_crud.remove(reservation, session)
+    await publish("reservation", "deleted", reservation)
     return reservation
 
 
@@ -82,17 +276,19 @@ async def update_reservation(
         reservation_id, session, user
     )
 
-    await check_reservation_intersections(
-        **obj_in.dict(),
-        reservation_id=reservation_id,
-        meetingroom_id=reservation.meetingroom_id,
-        session=session
-    )
-    reservation = await reservation_crud.update(
-        db_obj=reservation,
-        obj_in=obj_in,
-        session=session,
-    )
+    async with room_lock(session, reservation.meetingroom_id):
+        await check_reservation_intersections(
+            **obj_in.dict(),
+            reservation_id=reservation_id,
+            meetingroom_id=reservation.meetingroom_id,
+            session=session
+        )
+        reservation = await reservation_crud.update(
+            db_obj=reservation,
+            obj_in=obj_in,
+            session=session,
+        )
+    await publish("reservation", "updated", reservation)
     return reservation
 
 
@@ -102,14 +298,22 @@ async def update_reservation(
     response_model_exclude={"user_id"},
 )
 async def get_me_reservations(
+    response: Response,
+    page: PageParams = Depends(reservation_page),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user),
 ):
     """Получает список всех своих (привязанных к пользователю) бронирований.
 
+    - Брони возвращаются страницами, как и в списке всех бронирований.
     - Доступен всем создателям бронирования.
     """
     reservations = await reservation_crud.get_by_user(
-        session=session, user=user
+        session=session, user=user, after=page.after, limit=page.fetch
+    )
+    reservations = paginate(response, reservations, page, reservation_page_key)
+    return rows_response(
+        reservations,
+        reservation_fields_without_user,
+        headers=response.headers,
     )
-    return reservations
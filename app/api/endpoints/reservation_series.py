@@ -0,0 +1,133 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.events import publish
+from app.api.responses import rows_response, schema_fields
+from app.api.validators import (check_meeting_room_exists,
+                                check_series_before_edit,
+                                check_series_exists,
+                                check_series_intersections)
+from app.core.db import get_async_session
+from app.core.locks import room_lock
+from app.core.recurrence import expand
+from app.core.user import current_user
+from app.crud.reservation_series import reservation_series_crud
+from app.models import User
+from app.schemas.reservation_series import (OccurrenceDB,
+                                            ReservationSeriesCreate,
+                                            ReservationSeriesDB,
+                                            ReservationSeriesUpdate)
+
+router = APIRouter()
+
+series_fields = schema_fields(ReservationSeriesDB)
+
+
+@router.post("/", response_model=ReservationSeriesDB)
+async def create_reservation_series(
+    series: ReservationSeriesCreate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Забронировать комнату на повторяющееся время.
+
+    - Доступен всем авторизированным пользователям.
+    - Серия повторяется ежедневно, еженедельно или ежемесячно с заданным
+    интервалом до даты окончания или заданное число раз.
+    - Ни одно бронирование серии не должно пересекаться с другими бронями.
+    """
+    async with room_lock(session, series.meetingroom_id):
+        await check_meeting_room_exists(
+            series.meetingroom_id, session, cached=False
+        )
+        await check_series_intersections(series, session)
+        new_series = await reservation_series_crud.create(
+            series, session, user
+        )
+    await publish("series", "created", new_series)
+    return new_series
+
+
+@router.get("/my_series", response_model=List[ReservationSeriesDB])
+async def get_my_reservation_series(
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Получить список своих серий бронирований.
+
+    - Доступен всем авторизированным пользователям.
+    """
+    series = await reservation_series_crud.get_by_user(
+        session=session, user=user
+    )
+    return rows_response(series, series_fields)
+
+
+@router.get(
+    "/{series_id}/occurrences",
+    response_model=List[OccurrenceDB],
+    dependencies=[Depends(current_user)],
+)
+async def get_series_occurrences(
+    series_id: int,
+    from_reserve: Optional[datetime] = None,
+    to_reserve: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Получить бронирования серии за период.
+
+    - Без указания периода возвращаются все бронирования серии.
+    - Доступен всем авторизированным пользователям.
+    """
+    series = await check_series_exists(series_id, session)
+    return [
+        OccurrenceDB(from_reserve=start, to_reserve=end)
+        for start, end in expand(series, from_reserve, to_reserve)
+    ]
+
+
+@router.patch("/{series_id}", response_model=ReservationSeriesDB)
+async def update_reservation_series_exceptions(
+    series_id: int,
+    obj_in: ReservationSeriesUpdate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Изменить список отменённых бронирований серии.
+
+    - В списке передаётся время начала каждого отменённого бронирования.
+    - Доступен создателю серии и администраторам.
+    """
+    series = await check_series_before_edit(series_id, session, user)
+    async with room_lock(session, series.meetingroom_id):
+        await check_series_intersections(
+            ReservationSeriesDB.from_orm(series).copy(
+                update={"exceptions": obj_in.exceptions}
+            ),
+            session,
+            series_id=series_id,
+        )
+        series = await reservation_series_crud.update(
+            db_obj=series, obj_in=obj_in, session=session
+        )
+    await publish("series", "updated", series)
+    return series
+
+
+@router.delete("/{series_id}", response_model=ReservationSeriesDB)
+async def delete_reservation_series(
+    series_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Удалить серию бронирований.
+
+    - Доступен создателю серии и администраторам.
+    """
+    series = await check_series_before_edit(series_id, session, user)
+    series = await reservation_series_crud.remove(series, session)
+    await publish("series", "deleted", series)
+    return series
@@ -0,0 +1,34 @@
+"""Events published by the write endpoints, see ``app.core.events``.
+
+An event is a JSON object with the type of the change, the room and the
+changed object as the read endpoints render it::
+
+    {"event": "reservation.created", "meetingroom_id": 1,
+     "data": {"from_reserve": ..., "to_reserve": ..., "id": 5, ...}}
+
+Types are ``reservation.created``, ``reservation.updated``,
+``reservation.deleted`` and the same of ``series``. Events are published
+after the change is committed.
+"""
+import orjson
+
+from app.api.responses import schema_fields
+from app.core.events import broker
+from app.schemas.reservation import ReservationDB
+from app.schemas.reservation_series import ReservationSeriesDB
+
+EVENT_FIELDS = {
+    "reservation": schema_fields(ReservationDB),
+    "series": schema_fields(ReservationSeriesDB),
+}
+
+
+async def publish(kind: str, change: str, db_obj) -> None:
+    """Publish the ``change`` of the reservation or series ``db_obj``."""
+    await broker.publish(db_obj.meetingroom_id, orjson.dumps({
+        "event": f"{kind}.{change}",
+        "meetingroom_id": db_obj.meetingroom_id,
+        "data": {
+            field: getattr(db_obj, field) for field in EVENT_FIELDS[kind]
+        },
+    }).decode())
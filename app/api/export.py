@@ -0,0 +1,69 @@
+"""Streaming serialization of exported rows.
+
+Every chunk of rows is encoded into one piece of the response body, so a
+``StreamingResponse`` sends it while the next chunk is fetched.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Mapping, Sequence
+
+from app.schemas.reservation import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    # Datetimes are written as in JSON, not with ``str()``.
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def ndjson_chunks(
+    chunks: AsyncIterator[List[Mapping]], columns: Sequence[str]
+) -> AsyncIterator[str]:
+    async for rows in chunks:
+        yield "".join(
+            json.dumps(
+                {column: row[column] for column in columns},
+                default=_encode_value,
+            ) + "\n"
+            for row in rows
+        )
+
+
+async def csv_chunks(
+    chunks: AsyncIterator[List[Mapping]], columns: Sequence[str]
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in chunks:
+        writer.writerows(
+            [_csv_value(row[column]) for column in columns] for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header of an empty export.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_chunks(
+    chunks: AsyncIterator[List[Mapping]],
+    export_format: ExportFormat,
+    columns: Sequence[str],
+) -> AsyncIterator[str]:
+    if export_format == ExportFormat.csv:
+        return csv_chunks(chunks, columns)
+    return ndjson_chunks(chunks, columns)
@@ -0,0 +1,96 @@
+"""Keyset pagination of list endpoints.
+
+A page is requested with ``limit`` and an opaque ``cursor``. The cursor
+holds the sort key of the last item of the previous page, and the next
+page is selected with ``WHERE key > cursor ORDER BY key LIMIT n``, so with
+an index on the key every page costs the same, however deep it is. The
+cursor of the next page is returned in the ``X-Next-Cursor`` header; the
+header is absent on the last page.
+
+A request with neither ``limit`` nor ``cursor`` gets the whole list, as
+before the pagination; a ``cursor`` without ``limit`` gets a page of
+``DEFAULT_PAGE_SIZE`` items.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError, parse_obj_as
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    data = json.dumps(jsonable_encoder(list(key)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: Type) -> Tuple:
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return parse_obj_as(key_type, json.loads(data))
+    except (binascii.Error, ValueError, ValidationError):
+        raise HTTPException(status_code=422, detail="Некорректный курсор!")
+
+
+class PageParams:
+    def __init__(self, after: Optional[Tuple], limit: Optional[int]):
+        self.after = after
+        self.limit = limit
+
+    @property
+    def fetch(self) -> Optional[int]:
+        """Rows to select: one more than the page, None for the whole list."""
+        return None if self.limit is None else self.limit + 1
+
+
+class Page:
+    """Dependency of a list endpoint parsing the page parameters.
+
+    ``key_type`` is the type of the sort key, e.g. ``Tuple[datetime, int]``.
+    """
+
+    def __init__(self, key_type: Type):
+        self.key_type = key_type
+
+    def __call__(
+        self,
+        cursor: Optional[str] = Query(
+            None, description="Курсор из заголовка X-Next-Cursor"
+        ),
+        limit: Optional[int] = Query(
+            None,
+            ge=1,
+            le=MAX_PAGE_SIZE,
+            description=(
+                "Размер страницы, с курсором по умолчанию "
+                f"{DEFAULT_PAGE_SIZE}; без limit и курсора возвращается "
+                "весь список"
+            ),
+        ),
+    ) -> PageParams:
+        after = decode_cursor(cursor, self.key_type) if cursor else None
+        if limit is None and cursor:
+            limit = DEFAULT_PAGE_SIZE
+        return PageParams(after, limit)
+
+
+def paginate(
+    response: Response,
+    items: List,
+    page: PageParams,
+    key: Callable[[Any], Sequence[Any]],
+) -> List:
+    """Cut the page from ``limit + 1`` items and set the next cursor.
+
+    The extra item tells that there is a next page without a count query.
+    """
+    if page.limit is not None and len(items) > page.limit:
+        items = items[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+    return items
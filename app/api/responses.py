@@ -0,0 +1,65 @@
+"""Fast JSON responses of list endpoints.
+
+Rows of list endpoints are selected as plain column tuples, without ORM
+instances, and encoded straight to JSON bytes by orjson. The database
+output is trusted to match the response schema, so it is not validated
+by pydantic; the endpoint keeps its ``response_model`` for the documented
+schema, and the fields and their order are taken from it.
+
+orjson writes datetimes as ``datetime.isoformat()`` does, so the body is
+the same as the one FastAPI renders from the response model.
+"""
+from typing import Any, Collection, List, Mapping, Optional, Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def schema_fields(
+    schema: Type[BaseModel], exclude: Collection[str] = ()
+) -> List[str]:
+    """Fields of the response schema in the order of its JSON output."""
+    return [field for field in schema.__fields__ if field not in exclude]
+
+
+def encode_rows(
+    rows: Sequence[Any], fields: Sequence[str], exclude_none: bool = False
+) -> bytes:
+    """JSON array of objects with the ``fields`` of the rows."""
+    if not rows:
+        return b"[]"
+    keys = rows[0]._fields
+    positions = [keys.index(field) for field in fields]
+    if exclude_none:
+        items = [
+            {
+                field: row[position]
+                for field, position in zip(fields, positions)
+                if row[position] is not None
+            }
+            for row in rows
+        ]
+    else:
+        items = [
+            {
+                field: row[position]
+                for field, position in zip(fields, positions)
+            }
+            for row in rows
+        ]
+    return orjson.dumps(items)
+
+
+def rows_response(
+    rows: Sequence[Any],
+    fields: Sequence[str],
+    exclude_none: bool = False,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Response of the rows; ``headers`` are e.g. the next page cursor."""
+    return Response(
+        encode_rows(rows, fields, exclude_none),
+        media_type="application/json",
+        headers=headers,
+    )
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import (meeting_room_router, reservation_router,
+from app.api.endpoints import (analytics_router, meeting_room_router,
+                               metrics_router, monitoring_router,
+                               reservation_router, reservation_series_router,
                                user_router)
 
 main_router = APIRouter()
@@ -10,4 +12,16 @@ main_router.include_router(
 main_router.include_router(
     reservation_router, prefix="/reservations", tags=["Reservations"]
 )
+main_router.include_router(
+    reservation_series_router,
+    prefix="/reservation_series",
+    tags=["Reservation Series"],
+)
+main_router.include_router(
+    analytics_router, prefix="/analytics", tags=["Analytics"]
+)
+main_router.include_router(
+    monitoring_router, prefix="/monitoring", tags=["Monitoring"]
+)
+main_router.include_router(metrics_router, tags=["Monitoring"])
 main_router.include_router(user_router)
@@ -1,19 +1,47 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.grid import MINUTES_IN_DAY
+from app.core.occupancy import (RoomOccupancy, occupancy_index,
+                                sweep_intersections)
+from app.core.recurrence import expand
 from app.crud.meeting_room import meeting_room_crud
 from app.crud.reservation import reservation_crud
-from app.models import Reservation, User
+from app.crud.reservation_series import reservation_series_crud
+from app.models import Reservation, ReservationSeries, User
 from app.models.meeting_room import MeetingRoom
+from app.schemas.reservation import (BatchItemStatus, BatchMode,
+                                     ReservationCreate)
 
 
-async def check_name_duplicate(
-    room_name: str,
-    session: AsyncSession,
-) -> None:
-    """Check duplicates by the name of the meeting room."""
-    room_id = await meeting_room_crud.get_room_id_by_name(room_name, session)
-    if room_id is not None:
+# How the unique constraint of the room name is named in the errors:
+# SQLite names the column, PostgreSQL the default name of the constraint.
+ROOM_NAME_CONSTRAINTS = ("meetingroom.name", "meetingroom_name_key")
+
+
+@contextmanager
+def check_name_duplicate() -> Iterator[None]:
+    """Check duplicates by the name of the meeting room.
+
+    The unique constraint of the name is checked by the write itself, a
+    violation is turned into 422. Other integrity errors are raised as
+    they are.
+    """
+    try:
+        yield
+    except IntegrityError as error:
+        if not any(
+            constraint in str(error.orig)
+            for constraint in ROOM_NAME_CONSTRAINTS
+        ):
+            raise
         raise HTTPException(
             status_code=422,
             detail="Переговорка с таким именем уже существует!",
@@ -23,25 +51,255 @@ async def check_name_duplicate(
 async def check_meeting_room_exists(
     meeting_room_id: int,
     session: AsyncSession,
+    cached: bool = True,
 ) -> MeetingRoom:
     """Check existence meeting room by its id, return object meeting room."""
-    meeting_room = await meeting_room_crud.get(meeting_room_id, session)
+    meeting_room = await meeting_room_crud.get(
+        meeting_room_id, session, cached
+    )
     if meeting_room is None:
         raise HTTPException(status_code=404, detail="Переговорка не найдена!")
     return meeting_room
 
 
+def check_time_window(
+    from_reserve: datetime,
+    to_reserve: datetime,
+    max_length: timedelta,
+) -> None:
+    """Check the time window of a search or a report."""
+    if from_reserve >= to_reserve:
+        raise HTTPException(
+            status_code=422,
+            detail="Начало интервала должно быть раньше его окончания!",
+        )
+    if to_reserve - from_reserve > max_length:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Интервал не может быть длиннее {max_length.days} дней!"
+            ),
+        )
+
+
+def check_grid_slot(slot: int) -> None:
+    """Check the slot of the occupancy grid divides the day."""
+    if MINUTES_IN_DAY % slot:
+        raise HTTPException(
+            status_code=422,
+            detail="Длина слота должна делить сутки на равные части!",
+        )
+
+
 async def check_reservation_intersections(
     session: AsyncSession, **kwargs
 ) -> None:
-    """Check meeting room is not reserved for the same time."""
+    """Check meeting room is not reserved for the same time.
+
+    Occurrences of recurring reservations are checked as well.
+
+    With the occupancy index enabled the database stays authoritative:
+    reservations made by other worker processes are unseen by the index for
+    up to its TTL, so a free room is confirmed by one query and a found
+    conflict by the precise check.
+    """
+    indexed = None
+    if settings.occupancy_index_enabled:
+        indexed = await occupancy_index.get_reservations_at_the_same_time(
+            **kwargs, session=session
+        )
+        if not indexed and not await reservation_crud.is_busy(
+            **kwargs, session=session
+        ):
+            return
     reservations = await reservation_crud.get_reservations_at_the_same_time(
         **kwargs, session=session
     )
+    reservations += await reservation_series_crud.get_occurrences(
+        room_ids=[kwargs["meetingroom_id"]],
+        from_reserve=kwargs["from_reserve"],
+        to_reserve=kwargs["to_reserve"],
+        session=session,
+    )
+    if indexed is not None and bool(indexed) != bool(reservations):
+        # The index missed a change of another worker process.
+        occupancy_index.invalidate(kwargs["meetingroom_id"])
     if reservations:
         raise HTTPException(status_code=422, detail=str(reservations))
 
 
+def _sweep_batch_conflicts(
+    reservations: List[ReservationCreate],
+    candidates: List[int],
+    existing: List[Reservation],
+) -> Dict[int, Tuple[BatchItemStatus, str]]:
+    """Find conflicts of the batch by sorting it and sweeping every room.
+
+    Of two intersecting reservations of the batch the earlier one wins.
+    """
+    failures = {}
+    existing = {
+        room_id: RoomOccupancy(room_reservations)
+        for room_id, room_reservations in groupby(
+            existing, key=lambda reservation: reservation.meetingroom_id
+        )
+    }
+    candidates = sorted(candidates, key=lambda i: (
+        reservations[i].meetingroom_id, reservations[i].from_reserve, i
+    ))
+    for room_id, indexes in groupby(
+        candidates, key=lambda i: reservations[i].meetingroom_id
+    ):
+        occupancy = existing.get(room_id, RoomOccupancy())
+        last_accepted = None
+        for index in indexes:
+            reservation = reservations[index]
+            positions = occupancy.get_intersections(
+                reservation.from_reserve, reservation.to_reserve
+            )
+            if positions:
+                failures[index] = (BatchItemStatus.conflict, str([
+                    Reservation(
+                        from_reserve=occupancy.starts[position],
+                        to_reserve=occupancy.ends[position],
+                    )
+                    for position in positions
+                ]))
+            elif (
+                last_accepted is not None and
+                reservation.from_reserve <=
+                reservations[last_accepted].to_reserve
+            ):
+                failures[index] = (
+                    BatchItemStatus.conflict,
+                    f"Пересекается с бронью {last_accepted} из запроса",
+                )
+            else:
+                last_accepted = index
+    return failures
+
+
+async def check_batch_reservations(
+    reservations: List[ReservationCreate],
+    mode: BatchMode,
+    session: AsyncSession,
+) -> Dict[int, Tuple[BatchItemStatus, str]]:
+    """Check a batch of reservations with a fixed number of queries.
+
+    Rooms are checked with one query, and existing reservations and series
+    of all the rooms are loaded with one query each; conflicts with them and
+    inside the batch are found in one pass over the sorted batch.
+
+    In the atomic mode any failure raises 422 with the result of every
+    reservation, otherwise failures are returned by index in the batch.
+    """
+    failures = {}
+    room_ids = await meeting_room_crud.get_existing_ids(
+        (reservation.meetingroom_id for reservation in reservations), session
+    )
+    candidates = []
+    for index, reservation in enumerate(reservations):
+        if reservation.meetingroom_id in room_ids:
+            candidates.append(index)
+        else:
+            failures[index] = (
+                BatchItemStatus.room_not_found, "Переговорка не найдена!"
+            )
+
+    if candidates:
+        kwargs = dict(
+            room_ids=room_ids,
+            from_reserve=min(reservations[i].from_reserve for i in candidates),
+            to_reserve=max(reservations[i].to_reserve for i in candidates),
+            session=session,
+        )
+        existing = await reservation_crud.get_reservations_in_rooms(**kwargs)
+        existing += await reservation_series_crud.get_occurrences(**kwargs)
+        existing.sort(key=lambda reservation: (
+            reservation.meetingroom_id, reservation.from_reserve
+        ))
+        failures.update(
+            _sweep_batch_conflicts(reservations, candidates, existing)
+        )
+
+    if failures and mode == BatchMode.atomic:
+        results = []
+        for index in range(len(reservations)):
+            status, detail = failures.get(
+                index, (BatchItemStatus.not_created, None)
+            )
+            results.append(
+                {"index": index, "status": status.value, "detail": detail}
+            )
+        raise HTTPException(status_code=422, detail=results)
+    return failures
+
+
+async def check_series_intersections(
+    series, session: AsyncSession, series_id: Optional[int] = None
+) -> None:
+    """Check no occurrence of the series intersects other reservations.
+
+    Reservations and occurrences of other series in the span of the series
+    are loaded with two queries and checked against all occurrences in one
+    pass over the sorted lists.
+    """
+    occurrences = expand(series)
+    if not occurrences:
+        return
+    kwargs = dict(
+        room_ids=[series.meetingroom_id],
+        from_reserve=occurrences[0][0],
+        to_reserve=occurrences[-1][1],
+        session=session,
+    )
+    reservations = await reservation_crud.get_reservations_in_rooms(**kwargs)
+    reservations += await reservation_series_crud.get_occurrences(
+        **kwargs, series_id=series_id
+    )
+    reservations.sort(key=lambda reservation: reservation.from_reserve)
+    intersections = sweep_intersections(occurrences, [
+        (reservation.from_reserve, reservation.to_reserve)
+        for reservation in reservations
+    ])
+    if intersections:
+        raise HTTPException(
+            status_code=422,
+            detail=str([reservations[index] for index in intersections]),
+        )
+
+
+async def check_series_exists(
+    series_id: int,
+    session: AsyncSession,
+) -> ReservationSeries:
+    """Check existence of reservation series by its id, return it."""
+    series = await reservation_series_crud.get(series_id, session=session)
+    if not series:
+        raise HTTPException(status_code=404, detail="Серия не найдена!")
+    return series
+
+
+async def check_series_before_edit(
+    series_id: int,
+    session: AsyncSession,
+    user: User,
+) -> ReservationSeries:
+    """Check series exists, and belongs to the author of the request.
+
+    When requested from the superuser, authorship does not raise.
+    """
+    series = await check_series_exists(series_id, session)
+
+    if series.user_id != user.id and not user.is_superuser:
+        raise HTTPException(
+            status_code=403,
+            detail="Невозможно редактировать или удалить чужую серию!",
+        )
+
+    return series
+
+
 async def check_reservation_before_edit(
     reservation_id: int,
     session: AsyncSession,
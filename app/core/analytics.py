@@ -0,0 +1,192 @@
+"""Vectorized utilization analytics of meeting rooms.
+
+Reservation bounds are loaded as NumPy arrays of minutes since the Unix
+epoch, computed by the database, and bucketed into hours of the window
+without Python loops over reservations:
+
+- minutes of the first and the last hour of every reservation are summed
+  into their hours with ``bincount``;
+- hours covered completely are marked in a difference array, ``+1`` at
+  the first of them and ``-1`` after the last, and a ``cumsum`` along the
+  hours turns the marks into counts of reservations covering every hour.
+
+Hours of the window are then folded into the 168 hours of the week.
+"""
+import calendar
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, extract, func, literal_column
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+HOURS_IN_WEEK = 7 * 24
+# Longest window of one report.
+MAX_REPORT_WINDOW = timedelta(days=366)
+
+
+class epoch_minutes(FunctionElement):
+    """Minutes since the Unix epoch of a naive datetime column."""
+
+    type = BigInteger()
+    name = "epoch_minutes"
+    inherit_cache = True
+
+
+@compiles(epoch_minutes, "sqlite")
+def _sqlite_epoch_minutes(element, compiler, **kw):
+    (value,) = element.clauses
+    return compiler.process(
+        cast(func.strftime("%s", value), BigInteger) / 60, **kw
+    )
+
+
+@compiles(epoch_minutes, "postgresql")
+def _postgresql_epoch_minutes(element, compiler, **kw):
+    (value,) = element.clauses
+    return compiler.process(
+        cast(extract("epoch", value), BigInteger) / 60, **kw
+    )
+
+
+@compiles(epoch_minutes, "mysql")
+def _mysql_epoch_minutes(element, compiler, **kw):
+    (value,) = element.clauses
+    return compiler.process(
+        func.timestampdiff(literal_column("MINUTE"), "1970-01-01", value),
+        **kw,
+    )
+
+
+def to_epoch_minutes(value: datetime) -> int:
+    # Naive datetimes are taken as UTC, as the database functions do.
+    return calendar.timegm(value.timetuple()) // 60
+
+
+def bounds_array(rows: Iterable[Tuple[int, int, int]]) -> np.ndarray:
+    """Rows of room id, start and end in epoch minutes as an n x 3 array."""
+    # ``np.array`` inspects every row as a sequence, a flat iterator of
+    # numbers is several times faster for millions of rows.
+    return np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(
+        -1, 3
+    )
+
+
+def hour_window(from_reserve: datetime, to_reserve: datetime):
+    """Widen the window to whole hours."""
+    from_reserve = from_reserve.replace(minute=0, second=0, microsecond=0)
+    if to_reserve.replace(minute=0, second=0, microsecond=0) != to_reserve:
+        to_reserve = to_reserve.replace(
+            minute=0, second=0, microsecond=0
+        ) + timedelta(hours=1)
+    return from_reserve, to_reserve
+
+
+class Utilization(NamedTuple):
+    # Share of every hour of the week the room is busy, rooms x 168.
+    by_hour_of_week: np.ndarray
+    # Share of the whole window the room is busy.
+    total: np.ndarray
+
+
+def hourly_busy_minutes(
+    rooms: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    room_count: int,
+    hour_count: int,
+) -> np.ndarray:
+    """Busy minutes of every room in every hour of the window.
+
+    ``rooms`` are room positions, ``starts`` and ``ends`` are minutes from
+    the start of the window clipped to it. Returns rooms x hours.
+    """
+    keep = ends > starts
+    rooms, starts, ends = rooms[keep], starts[keep], ends[keep]
+    first_hours, last_hours = starts // 60, ends // 60
+    same_hour = first_hours == last_hours
+    # A column more for reservations ending at the end of the window.
+    width = hour_count + 1
+    size = room_count * width
+    offsets = rooms * width
+
+    minutes = np.bincount(
+        offsets + first_hours,
+        weights=np.where(same_hour, ends - starts, 60 - starts % 60),
+        minlength=size,
+    )
+    minutes += np.bincount(
+        offsets + last_hours,
+        weights=np.where(same_hour, 0, ends % 60),
+        minlength=size,
+    )
+    spans = ~same_hour
+    full_hours = np.bincount(
+        offsets[spans] + first_hours[spans] + 1, minlength=size
+    ) - np.bincount(offsets[spans] + last_hours[spans], minlength=size)
+    full_hours = full_hours.reshape(room_count, width).cumsum(axis=1)
+    minutes = minutes.reshape(room_count, width) + 60 * full_hours
+    return minutes[:, :hour_count]
+
+
+def utilization(
+    room_ids: np.ndarray,
+    bounds: np.ndarray,
+    from_reserve: datetime,
+    to_reserve: datetime,
+) -> Utilization:
+    """Utilization of the rooms in the window of whole hours.
+
+    ``room_ids`` are sorted ids of the rooms, ``bounds`` are rows of room
+    id, start and end of reservations in epoch minutes. Reservations of
+    rooms missing from ``room_ids`` are skipped.
+    """
+    room_count = len(room_ids)
+    rooms = np.searchsorted(room_ids, bounds[:, 0])
+    known = rooms < room_count
+    known[known] = room_ids[rooms[known]] == bounds[known, 0]
+    rooms, starts, ends = rooms[known], bounds[known, 1], bounds[known, 2]
+
+    window_from = to_epoch_minutes(from_reserve)
+    window_minutes = to_epoch_minutes(to_reserve) - window_from
+    hour_count = window_minutes // 60
+    minutes = hourly_busy_minutes(
+        rooms,
+        np.clip(starts - window_from, 0, window_minutes),
+        np.clip(ends - window_from, 0, window_minutes),
+        room_count,
+        hour_count,
+    )
+
+    hours_of_week = (
+        from_reserve.weekday() * 24 + from_reserve.hour +
+        np.arange(hour_count)
+    ) % HOURS_IN_WEEK
+    # Folding is a bincount per room with room offsets, as above.
+    offsets = np.arange(room_count)[:, None] * HOURS_IN_WEEK
+    week_minutes = np.bincount(
+        (offsets + hours_of_week).ravel(),
+        weights=minutes.ravel(),
+        minlength=room_count * HOURS_IN_WEEK,
+    ).reshape(room_count, HOURS_IN_WEEK)
+    hour_counts = np.bincount(hours_of_week, minlength=HOURS_IN_WEEK)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        by_hour_of_week = np.where(
+            hour_counts > 0, week_minutes / (60 * hour_counts), 0.0
+        )
+    total = minutes.sum(axis=1) / max(window_minutes, 1)
+    return Utilization(by_hour_of_week, total)
+
+
+def peak_hours(
+    by_hour_of_week: np.ndarray, count: int
+) -> List[Tuple[int, float]]:
+    """Hours of the week with the highest mean utilization of the rooms."""
+    if not len(by_hour_of_week):
+        return []
+    mean = by_hour_of_week.mean(axis=0)
+    # A stable sort keeps earlier hours first among equal ones.
+    hours = np.argsort(-mean, kind="stable")[:count]
+    return list(zip(hours.tolist(), mean[hours].tolist()))
@@ -0,0 +1,157 @@
+"""Archival of finished reservations.
+
+Requests serving traffic read actual reservations only, so finished ones
+are moved from ``reservation`` to ``reservation_archive`` and the live
+table and its indexes keep the size of the working set. History queries
+(``my_reservations``, the export and the utilization report) read both
+tables, see ``CRUDReservation``.
+
+Reservations finished more than ``settings.archive_after_days`` ago are
+moved in batches of ``settings.archive_batch_size``, one transaction per
+batch, so the write lock is held briefly. Archived reservations finished
+more than ``settings.archive_retention_days`` ago are deleted the same
+way.
+
+The job runs in the application every ``settings.archive_interval``
+seconds, or once from cron:
+
+    python -m app.core.archive
+
+Archived rows keep their ids, which ``reservation`` never gives again
+(AUTOINCREMENT on SQLite, a sequence on server databases). Concurrent
+runs in several workers are safe: a batch taken by another run fails on
+the primary key of the archive and is rolled back.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, engine
+from app.models import Reservation, ReservationArchive
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [column.name for column in Reservation.__table__.c]
+
+
+async def archive_batch(
+    session: AsyncSession, before: datetime, batch_size: int
+) -> int:
+    """Move up to ``batch_size`` reservations finished before ``before``."""
+    live = Reservation.__table__
+    ids = (await session.execute(
+        select(live.c.id)
+        .where(live.c.to_reserve < before)
+        .order_by(live.c.to_reserve)
+        .limit(batch_size)
+    )).scalars().all()
+    if not ids:
+        return 0
+    try:
+        await session.execute(
+            insert(ReservationArchive.__table__).from_select(
+                COLUMNS,
+                select(*(live.c[name] for name in COLUMNS)).where(
+                    live.c.id.in_(ids)
+                ),
+            )
+        )
+        await session.execute(delete(live).where(live.c.id.in_(ids)))
+        await session.commit()
+    except IntegrityError as error:
+        # Archived by a concurrent run, or ids of the archive are given
+        # again, which stalls the archival until fixed.
+        logger.warning("Archival batch rolled back: %s", error.orig)
+        await session.rollback()
+        return 0
+    return len(ids)
+
+
+async def purge_batch(
+    session: AsyncSession, before: datetime, batch_size: int
+) -> int:
+    """Delete up to ``batch_size`` archived reservations finished before
+    ``before``."""
+    archive = ReservationArchive.__table__
+    ids = (await session.execute(
+        select(archive.c.id)
+        .where(archive.c.to_reserve < before)
+        .order_by(archive.c.to_reserve)
+        .limit(batch_size)
+    )).scalars().all()
+    if ids:
+        await session.execute(delete(archive).where(archive.c.id.in_(ids)))
+        await session.commit()
+    return len(ids)
+
+
+async def _run_batches(
+    session_factory: Callable[[], AsyncSession],
+    batch,
+    before: datetime,
+    batch_size: int,
+) -> int:
+    total = 0
+    while True:
+        async with session_factory() as session:
+            done = await batch(session, before, batch_size)
+        total += done
+        if done < batch_size:
+            return total
+        # Let requests run between batches.
+        await asyncio.sleep(0)
+
+
+async def archive_reservations(
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """Archive finished reservations and apply the retention."""
+    now = now or datetime.now()
+    result = {
+        "archived": await _run_batches(
+            session_factory,
+            archive_batch,
+            now - timedelta(days=settings.archive_after_days),
+            settings.archive_batch_size,
+        ),
+        "purged": 0,
+    }
+    if settings.archive_retention_days is not None:
+        result["purged"] = await _run_batches(
+            session_factory,
+            purge_batch,
+            now - timedelta(days=settings.archive_retention_days),
+            settings.archive_batch_size,
+        )
+    return result
+
+
+async def run_archiver(interval: float) -> None:
+    """Archive every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            result = await archive_reservations()
+            if any(result.values()):
+                logger.info("Reservations archived: %s", result)
+        except Exception:
+            logger.exception("Archival of reservations failed")
+        await asyncio.sleep(interval)
+
+
+async def main() -> None:
+    try:
+        print(json.dumps(await archive_reservations(), indent=2))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
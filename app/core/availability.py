@@ -0,0 +1,79 @@
+"""Free slots of meeting rooms.
+
+Busy intervals of a room come sorted by start. One pass over them yields
+the gaps between merged busy intervals, and every gap is narrowed to the
+slot grid. Bounds of reservations are inclusive, as in the conflict
+check, so a free slot never touches a busy interval: a slot found here
+can be booked as is.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+# Longest window of one search.
+MAX_SEARCH_WINDOW = timedelta(days=31)
+
+
+def _grid_ceil(
+    value: datetime, origin: datetime, step: timedelta, strict: bool
+) -> datetime:
+    steps, remainder = divmod(value - origin, step)
+    if remainder or strict:
+        steps += 1
+    return origin + steps * step
+
+
+def _grid_floor(
+    value: datetime, origin: datetime, step: timedelta, strict: bool
+) -> datetime:
+    steps, remainder = divmod(value - origin, step)
+    if not remainder and strict:
+        steps -= 1
+    return origin + steps * step
+
+
+def free_slots(
+    busy: Iterable[Interval],
+    window_from: datetime,
+    window_to: datetime,
+    granularity: timedelta,
+    min_duration: timedelta = timedelta(0),
+) -> Iterator[Interval]:
+    """Free slots of the window between the busy intervals.
+
+    ``busy`` must be sorted by start. Bounds of the slots lie on the grid
+    of ``granularity`` steps from ``window_from``; slots shorter than
+    ``min_duration`` or empty are skipped.
+    """
+    # The earliest start of the next slot and whether it ends a busy
+    # interval, then the slot must start strictly after it.
+    start, start_busy = window_from, False
+    for busy_from, busy_to in busy:
+        if busy_from > window_to:
+            break
+        yield from _slot(
+            start, start_busy, busy_from, True,
+            window_from, granularity, min_duration,
+        )
+        if busy_to >= start:
+            start, start_busy = busy_to, True
+    yield from _slot(
+        start, start_busy, window_to, False,
+        window_from, granularity, min_duration,
+    )
+
+
+def _slot(
+    start: datetime,
+    start_busy: bool,
+    end: datetime,
+    end_busy: bool,
+    origin: datetime,
+    granularity: timedelta,
+    min_duration: timedelta,
+) -> Iterator[Interval]:
+    start = _grid_ceil(start, origin, granularity, start_busy)
+    end = _grid_floor(end, origin, granularity, end_busy)
+    if end > start and end - start >= min_duration:
+        yield start, end
@@ -1,5 +1,6 @@
 """Импорты класса Base и всех моделей для Alembic."""
 from app.core.db import Base  # noqa
-from app.models import MeetingRoom, Reservation, User  # noqa
+from app.models import (MeetingRoom, Reservation,  # noqa
+                        ReservationArchive, ReservationSeries, User)
 from app.models.meeting_room import MeetingRoom  # noqa
 from app.models.reservation import Reservation  # noqa
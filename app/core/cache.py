@@ -0,0 +1,105 @@
+"""In-process caches bounded by size and time to live.
+
+Every cache is registered by its name, so the monitoring endpoint can
+report the counters of all of them and tests can reset them.
+
+Caches are per process: an entry written by another worker process is
+seen after at most ``ttl`` seconds, as with the occupancy index.
+
+Model instances are cached as snapshots of their column values, never as
+instances bound to the session of the request that loaded them.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+_MISSING = object()
+
+caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """LRU cache whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        caches[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > self.timer():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set the value, ``ttl`` shortens the lifetime of this entry."""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (self.timer() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests if requests else None,
+        }
+
+
+def snapshot(db_obj) -> Dict[str, Any]:
+    """Column values of a loaded model instance."""
+    return {
+        attribute.key: getattr(db_obj, attribute.key)
+        for attribute in inspect(type(db_obj)).column_attrs
+    }
+
+
+async def restore(model, columns: Dict[str, Any], session: AsyncSession):
+    """Attach an instance built from a snapshot to the session.
+
+    No query is made, and the instance can be updated or deleted as a
+    loaded one.
+    """
+    db_obj = model(**columns)
+    make_transient_to_detached(db_obj)
+    return await session.merge(db_obj, load=False)
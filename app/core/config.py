@@ -9,6 +9,62 @@ class Settings(BaseSettings):
     secret: str = "SECRET"
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
+    # In-process occupancy index for the reservation conflict check.
+    occupancy_index_enabled: bool = False
+    occupancy_index_ttl: int = 60
+    # Connection pool of server databases and SQLite files. Recycle and
+    # statement timeout are disabled by -1 and None.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    # Milliseconds, PostgreSQL and MySQL only.
+    db_statement_timeout: Optional[int] = None
+    # Pragmas set on every SQLite connection.
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # Negative values are KiB, positive are pages.
+    sqlite_cache_size: int = -64 * 1024
+    # Finished reservations are moved to the archive table by a background
+    # job every ``archive_interval`` seconds, disabled while it is None.
+    archive_interval: Optional[int] = None
+    archive_after_days: int = 1
+    archive_batch_size: int = 1000
+    # Archived reservations finished more days ago are deleted, None keeps
+    # them forever.
+    archive_retention_days: Optional[int] = None
+    # Live reservation events over WebSocket: a subscriber falling behind
+    # by ``live_queue_size`` events is disconnected. Worker processes share
+    # events through the relay at ``live_relay`` (host:port), None keeps
+    # them in the process.
+    live_queue_size: int = 100
+    live_relay: Optional[str] = None
+    # Debug header with the number of SQL statements of the request.
+    query_count_header: bool = False
+    # A request running one statement more times is logged as N+1.
+    repeated_query_threshold: int = 10
+    # Cache of busy minutes of a room and day for the occupancy grid,
+    # writes of other worker processes are seen after the TTL in seconds.
+    occupancy_grid_cache_size: int = 50000
+    occupancy_grid_cache_ttl: int = 60
+    # Cache of meeting rooms and pages of the room list.
+    meeting_room_cache_size: int = 1024
+    meeting_room_cache_ttl: int = 300
+    # Cache of active users read by the JWT strategy. A deactivated user
+    # keeps access to other worker processes for up to the TTL in seconds.
+    user_cache_size: int = 10000
+    user_cache_ttl: int = 60
+    # Cache of verified JWT claims, an entry lives until its token expires.
+    token_cache_size: int = 10000
+    # Passwords are hashed and verified in a pool of threads, a login or
+    # registration finding ``password_hash_queue`` more waiting is answered
+    # with 503. Hashes of another bcrypt cost are replaced on login.
+    password_hash_workers: int = 2
+    password_hash_queue: int = 32
+    password_hash_rounds: int = 12
 
     class Config:
         env_file = ".env"
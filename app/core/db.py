@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from typing import Any, Dict
+
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.pool import InstrumentedQueuePool
 
 
 class PreBase:
@@ -16,7 +22,75 @@ class PreBase:
 
 
 Base = declarative_base(cls=PreBase)
-engine = create_async_engine(settings.database_url)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers go on while a writer holds the lock, NORMAL skips
+    # the fsync of every commit, which is still safe in WAL mode.
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout:d}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size:d}")
+    cursor.execute(f"PRAGMA cache_size={settings.sqlite_cache_size:d}")
+    # Off by default in SQLite, reservations of a deleted room are removed
+    # by ON DELETE CASCADE.
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+STATEMENT_TIMEOUT = {
+    "postgresql": "SET statement_timeout = {:d}",
+    "mysql": "SET SESSION MAX_EXECUTION_TIME = {:d}",
+}
+
+
+def _statement_timeout_listener(statement: str):
+    def set_statement_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(statement)
+        cursor.close()
+    return set_statement_timeout
+
+
+def make_engine(database_url: str) -> AsyncEngine:
+    """Create the engine with the pool and connection settings."""
+    url = make_url(database_url)
+    options: Dict[str, Any] = {}
+    sqlite = url.get_backend_name() == "sqlite"
+    in_memory = sqlite and url.database in (None, "", ":memory:")
+    # An in-memory SQLite database lives in its only connection, which
+    # the default static pool keeps.
+    if not in_memory:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    engine = create_async_engine(database_url, **options)
+    if sqlite:
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    elif (
+        settings.db_statement_timeout is not None and
+        url.get_backend_name() in STATEMENT_TIMEOUT
+    ):
+        event.listen(
+            engine.sync_engine,
+            "connect",
+            _statement_timeout_listener(
+                STATEMENT_TIMEOUT[url.get_backend_name()].format(
+                    settings.db_statement_timeout
+                )
+            ),
+        )
+    return engine
+
+
+engine = make_engine(settings.database_url)
+instrument_engine(engine.sync_engine)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
 
 
@@ -0,0 +1,310 @@
+"""Live events of meeting rooms.
+
+Write endpoints publish an event of every change of a reservation to the
+``broker``, and subscribers, the WebSockets of ``/reservations/live``,
+receive the events of the rooms they follow instead of polling the
+reservation list.
+
+Events are JSON texts encoded once by the publisher. ``EventHub`` fans
+them out in the process: every subscriber has a queue of
+``settings.live_queue_size`` events, and a subscriber whose queue is full
+is dropped and disconnected, so a slow client never holds back the
+publisher or the other subscribers. A dropped client reconnects and
+reloads the state of its rooms.
+
+The broker carries events between worker processes:
+
+- ``LocalBroker``, the default, delivers them in the process only;
+- ``RelayBroker`` also sends them to the relay at ``settings.live_relay``
+  and delivers the events of the other workers. The relay is a stand-in
+  of a message broker for the workers of one host:
+
+      python -m app.core.events --port 8765
+
+Another broker, e.g. on Redis pub/sub, implements ``Broker``. Events
+published while a worker is disconnected from the relay are not seen by
+the other workers. Events are written to the relay without waiting for
+it; a worker whose unsent events exceed ``RELAY_BUFFER_LIMIT`` bytes drops
+the connection, as a stalled relay does not read them, and reconnects.
+"""
+import argparse
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to connect to the relay.
+RECONNECT_DELAY = 1
+# Bytes queued to a relay connection, by the relay or by a worker, before
+# it is closed as slow.
+RELAY_BUFFER_LIMIT = 4 * 2 ** 20
+# Longest line of the relay protocol, longer events stay in the worker.
+RELAY_LINE_LIMIT = 2 ** 20
+
+
+class Subscription:
+    """Queue of the events of the rooms followed by one subscriber.
+
+    ``rooms`` is empty to follow all rooms.
+    """
+
+    def __init__(self, rooms: Iterable[int], maxsize: int):
+        self.rooms = frozenset(rooms)
+        self.maxsize = maxsize
+        self.dropped = False
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize)
+
+    def put(self, message: str) -> bool:
+        """Queue the event, False when the queue is full."""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def drop(self) -> None:
+        # Queued events are discarded to wake the consumer at once.
+        self.dropped = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self) -> Optional[str]:
+        """The next event, None once the subscriber is dropped."""
+        return await self._queue.get()
+
+
+class EventHub:
+    """Subscribers of the process by the rooms they follow."""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size
+        # Subscribers of all rooms are kept under None.
+        self._subscriptions: Dict[Optional[int], Set[Subscription]] = (
+            defaultdict(set)
+        )
+        self.subscribers = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    @contextmanager
+    def subscribe(self, rooms: Iterable[int] = ()) -> Iterator[Subscription]:
+        subscription = Subscription(
+            rooms,
+            self.queue_size if self.queue_size is not None
+            else settings.live_queue_size,
+        )
+        keys = subscription.rooms or {None}
+        for key in keys:
+            self._subscriptions[key].add(subscription)
+        self.subscribers += 1
+        try:
+            yield subscription
+        finally:
+            self.subscribers -= 1
+            self._remove(subscription, keys)
+
+    def _remove(self, subscription: Subscription, keys) -> None:
+        for key in keys:
+            subscriptions = self._subscriptions.get(key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[key]
+
+    def deliver(self, room_id: int, message: str) -> None:
+        """Queue the event to the subscribers of the room."""
+        for key in (room_id, None):
+            for subscription in tuple(self._subscriptions.get(key, ())):
+                if subscription.put(message):
+                    self.delivered += 1
+                    continue
+                subscription.drop()
+                self._remove(subscription, subscription.rooms or {None})
+                self.dropped += 1
+                logger.info(
+                    "A live subscriber of rooms %s fell behind by %d events "
+                    "and was dropped",
+                    sorted(subscription.rooms) or "all",
+                    subscription.maxsize,
+                )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": self.subscribers,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class Broker(ABC):
+    """Transport of events between the worker processes."""
+
+    def __init__(self, hub: Optional[EventHub] = None):
+        self.hub = hub if hub is not None else EventHub()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, room_id: int, message: str) -> None:
+        """Deliver the event to the subscribers of all workers."""
+
+
+class LocalBroker(Broker):
+    """Events are delivered in the process only."""
+
+    async def publish(self, room_id: int, message: str) -> None:
+        self.hub.deliver(room_id, message)
+
+
+class RelayBroker(Broker):
+    """Events are shared with the other workers through the relay.
+
+    Lines of the relay protocol are the room id and the event separated
+    by a space.
+    """
+
+    def __init__(self, address: str, hub: Optional[EventHub] = None):
+        super().__init__(hub)
+        self.host, port = address.rsplit(":", 1)
+        self.port = int(port)
+        self.connected: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        # Made in the running loop, on Python 3.9 it binds to a loop.
+        self.connected = asyncio.Event()
+        self._listener = asyncio.ensure_future(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, limit=RELAY_LINE_LIMIT
+                )
+            except OSError as error:
+                logger.warning("Event relay is unavailable: %s", error)
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            self._writer = writer
+            self.connected.set()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    room_id, _, message = line.decode().partition(" ")
+                    self.hub.deliver(int(room_id), message.rstrip("\n"))
+            except (OSError, ValueError) as error:
+                # ValueError is a line over the limit of the reader.
+                logger.warning("Event relay connection is lost: %s", error)
+            finally:
+                self.connected.clear()
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def publish(self, room_id: int, message: str) -> None:
+        self.hub.deliver(room_id, message)
+        if self._writer is None:
+            return
+        line = f"{room_id} {message}\n".encode()
+        if len(line) > RELAY_LINE_LIMIT:
+            logger.warning(
+                "Event of %d bytes is not relayed to other workers",
+                len(line),
+            )
+            return
+        if self._writer.transport.get_write_buffer_size() > RELAY_BUFFER_LIMIT:
+            # The relay does not read: close, _listen reconnects.
+            logger.warning("Event relay is not reading, reconnecting")
+            self._writer.close()
+            self._writer = None
+            return
+        self._writer.write(line)
+
+
+class Relay:
+    """Forwards every line of a worker to the other workers."""
+
+    def __init__(self):
+        self.writers: Set[asyncio.StreamWriter] = set()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for other in tuple(self.writers):
+                    if other is writer:
+                        continue
+                    if (
+                        other.transport.get_write_buffer_size() >
+                        RELAY_BUFFER_LIMIT
+                    ):
+                        # Not reading its events: the worker reconnects.
+                        self.writers.discard(other)
+                        other.close()
+                        continue
+                    other.write(line)
+        except (OSError, ValueError):
+            # ValueError is a line over the limit: the worker reconnects.
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+async def start_relay(host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        Relay().handle, host, port, limit=RELAY_LINE_LIMIT
+    )
+
+
+def make_broker() -> Broker:
+    if settings.live_relay:
+        return RelayBroker(settings.live_relay)
+    return LocalBroker()
+
+
+broker = make_broker()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Relay of live events between the worker processes."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = await start_relay(args.host, args.port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
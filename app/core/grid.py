@@ -0,0 +1,123 @@
+"""Occupancy grid of meeting rooms for calendar views.
+
+Busy time of every room and day is kept as a bitmap of the 1440 minutes
+of the day packed into 180 bytes, computed with NumPy from reservation
+bounds in epoch minutes, without Python loops over reservations:
+
+- a difference array marks ``+1`` at the first minute of every
+  reservation and ``-1`` at its end, offset by the room, and a ``cumsum``
+  along the minutes turns the marks into the reservations covering every
+  minute;
+- minutes covered by any reservation are set and packed with
+  ``packbits``.
+
+Slots of the grid are ORed from the minutes: unpacked minutes are
+reshaped to slots x minutes of a slot and reduced with ``any``, so any
+slot size dividing the day is served from the same bitmaps. A slot is
+busy when a reservation overlaps it by a minute or more.
+
+Minute bitmaps are cached per room and day. Reservation writes of the
+process forget the days they touch, series and room writes all days of
+the room; writes of other worker processes are seen after at most
+``settings.occupancy_grid_cache_ttl`` seconds.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+MINUTES_IN_DAY = 24 * 60
+# Longest grid of one request.
+MAX_GRID_DAYS = 31
+
+
+def minute_bitmaps(
+    room_ids: np.ndarray, bounds: np.ndarray, first_minute: int, days: int
+) -> np.ndarray:
+    """Packed busy minutes of the rooms by day, rooms x days x 180 bytes.
+
+    ``room_ids`` are sorted ids of the rooms, ``bounds`` are rows of room
+    id, start and end of reservations in epoch minutes and
+    ``first_minute`` is the start of the first day. Reservations of rooms
+    missing from ``room_ids`` are skipped.
+    """
+    room_count = len(room_ids)
+    rooms = np.searchsorted(room_ids, bounds[:, 0])
+    known = rooms < room_count
+    known[known] = room_ids[rooms[known]] == bounds[known, 0]
+    width = days * MINUTES_IN_DAY
+    starts = np.clip(bounds[known, 1] - first_minute, 0, width)
+    ends = np.clip(bounds[known, 2] - first_minute, 0, width)
+    keep = ends > starts
+    # A column more for reservations ending at the end of the window.
+    offsets = rooms[known][keep] * (width + 1)
+    size = room_count * (width + 1)
+    marks = np.bincount(
+        offsets + starts[keep], minlength=size
+    ) - np.bincount(offsets + ends[keep], minlength=size)
+    busy = marks.reshape(room_count, width + 1).cumsum(axis=1)[:, :width] > 0
+    return np.packbits(busy.reshape(room_count, days, MINUTES_IN_DAY), axis=2)
+
+
+def slot_bitmaps(minutes: np.ndarray, slot: int) -> np.ndarray:
+    """Packed busy slots of ``slot`` minutes from packed busy minutes.
+
+    ``minutes`` are rooms x days x 180 bytes, the result is a row of bytes
+    per room, one bit per slot from the first one, the most significant
+    bit first, and the last byte padded with zeros.
+    """
+    room_count, days, _ = minutes.shape
+    busy = np.unpackbits(minutes, axis=2).reshape(
+        room_count, days * MINUTES_IN_DAY // slot, slot
+    ).any(axis=2)
+    return np.packbits(busy, axis=1)
+
+
+class OccupancyGridCache:
+    """Minute bitmaps by room and day.
+
+    A room-wide invalidation bumps the generation of the room, which is a
+    part of the keys, and the entries of older generations are evicted as
+    the least recently used ones.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            "occupancy_grid",
+            maxsize=settings.occupancy_grid_cache_size,
+            ttl=settings.occupancy_grid_cache_ttl,
+        )
+        self._generations: Dict[int, int] = {}
+
+    def _key(self, meetingroom_id: int, day: date):
+        return meetingroom_id, self._generations.get(meetingroom_id, 0), day
+
+    def get(self, meetingroom_id: int, day: date) -> Optional[np.ndarray]:
+        return self.cache.get(self._key(meetingroom_id, day))
+
+    def set(self, meetingroom_id: int, day: date, minutes: np.ndarray):
+        self.cache.set(self._key(meetingroom_id, day), minutes)
+
+    def invalidate(
+        self,
+        meetingroom_id: int,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+    ) -> None:
+        """Forget the days of the room touched by the interval or, without
+        one, all days of the room."""
+        if from_reserve is None or to_reserve is None:
+            self._generations[meetingroom_id] = (
+                self._generations.get(meetingroom_id, 0) + 1
+            )
+            return
+        day = from_reserve.date()
+        while day <= to_reserve.date():
+            self.cache.pop(self._key(meetingroom_id, day))
+            day += timedelta(days=1)
+
+
+occupancy_grid = OccupancyGridCache()
@@ -0,0 +1,69 @@
+"""Serialization of reservation writes per meeting room.
+
+The conflict check and the insert of a reservation are separate
+statements, so two concurrent requests for the same slot could both pass
+the check. ``room_lock`` makes the pair atomic:
+
+- inside one process, requests for the same room wait on an
+  ``asyncio.Lock`` of that room, requests for other rooms do not wait;
+- across processes, the database serializes writers. Server databases lock
+  the rows of the rooms with ``SELECT ... FOR UPDATE``, so only writers of
+  the same room wait. SQLite has a single writer per database, so the
+  transaction is started with ``BEGIN IMMEDIATE``, which takes the write
+  lock before the check instead of at the insert.
+
+The database lock is released by the commit of the write or by the
+rollback done on error.
+"""
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Iterable
+from weakref import WeakValueDictionary
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.meeting_room import MeetingRoom
+
+# Locks are dropped as soon as no request holds or waits for them.
+_room_locks: "WeakValueDictionary[int, asyncio.Lock]" = WeakValueDictionary()
+
+
+def _get_room_lock(room_id: int) -> asyncio.Lock:
+    lock = _room_locks.get(room_id)
+    if lock is None:
+        lock = _room_locks[room_id] = asyncio.Lock()
+    return lock
+
+
+async def _lock_rooms_in_database(
+    session: AsyncSession, room_ids: Iterable[int]
+) -> None:
+    if session.bind.dialect.name == "sqlite":
+        await session.execute(text("BEGIN IMMEDIATE"))
+    else:
+        await session.execute(
+            select(MeetingRoom.id)
+            .where(MeetingRoom.id.in_(room_ids))
+            .order_by(MeetingRoom.id)
+            .with_for_update()
+        )
+
+
+@asynccontextmanager
+async def room_lock(session: AsyncSession, *room_ids: int):
+    """Serialize reservation writes of the rooms until the session commits.
+
+    Must be entered before the session writes anything. Rooms are locked in
+    ascending order, so writers of several rooms cannot deadlock.
+    """
+    room_ids = sorted(set(room_ids))
+    async with AsyncExitStack() as stack:
+        for room_id in room_ids:
+            await stack.enter_async_context(_get_room_lock(room_id))
+        try:
+            await _lock_rooms_in_database(session, room_ids)
+            yield
+        except BaseException:
+            await session.rollback()
+            raise
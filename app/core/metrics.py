@@ -0,0 +1,202 @@
+"""Prometheus metrics of requests, database statements and the pool.
+
+- ``MetricsMiddleware`` is a plain ASGI middleware: it times every HTTP
+  request and labels it with the route template, not the raw path, so the
+  number of series is bounded by the number of routes.
+- ``instrument_engine`` times every statement of the engine with cursor
+  events and exposes the pool state, read at scrape time.
+
+Labelled metrics are looked up once and then updated under a lock.
+``python -m benchmarks.metrics`` measures about 15 microseconds per
+request and per statement, most of the latter in the event dispatch of
+SQLAlchemy; a statement through aiosqlite takes hundreds of them.
+
+Metrics are kept per process. With several worker processes set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by the workers,
+and the scrape aggregates the counters and histograms of all of them;
+pool gauges are reported by the process that serves the scrape.
+"""
+import os
+import time
+from typing import List
+
+from prometheus_client import (CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.pool import pool_stats
+
+UNMATCHED_ROUTE = "unmatched"
+
+registry = CollectorRegistry()
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code.",
+    ["method", "route", "status"],
+    registry=registry,
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests by route.",
+    ["method", "route"],
+    registry=registry,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served.",
+    ["method"],
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Duration of SQL statements by operation.",
+    ["operation"],
+    registry=registry,
+    buckets=(
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1,
+        2.5, 5, 10,
+    ),
+)
+STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "SQL statements failed with an error.",
+    registry=registry,
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # Path templates of the routes by their endpoint functions.
+        self.routes = {}
+        # Labelled metrics are looked up once, ``labels`` is the most
+        # expensive part of an update.
+        self.in_progress = {}
+        self.observed = {}
+
+    def route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self.routes.get(endpoint)
+        if route is None:
+            route = self.routes[endpoint] = next(
+                (
+                    route.path for route in scope["app"].routes
+                    if getattr(route, "endpoint", None) is endpoint
+                ),
+                UNMATCHED_ROUTE,
+            )
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = self.in_progress.get(method)
+        if in_progress is None:
+            in_progress = self.in_progress[method] = (
+                REQUESTS_IN_PROGRESS.labels(method)
+            )
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            key = method, self.route(scope), status
+            observed = self.observed.get(key)
+            if observed is None:
+                observed = self.observed[key] = (
+                    REQUEST_DURATION.labels(method, key[1]),
+                    REQUESTS.labels(method, key[1], str(status)),
+                )
+            observed[0].observe(elapsed)
+            observed[1].inc()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    context._metrics_started = time.perf_counter()
+
+
+_statement_durations = {}
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    operation = statement.split(None, 1)[0].upper() if statement else ""
+    duration = _statement_durations.get(operation)
+    if duration is None:
+        duration = _statement_durations[operation] = (
+            STATEMENT_DURATION.labels(operation)
+        )
+    duration.observe(elapsed)
+
+
+def _handle_error(exception_context):
+    STATEMENT_ERRORS.inc()
+
+
+class PoolCollector:
+    """Gauges of the connection pool read when metrics are scraped."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def collect(self):
+        stats = pool_stats(self.engine.pool)
+        for name, description in (
+            ("size", "Connections the pool keeps open."),
+            ("checked_out", "Connections in use."),
+            ("checked_in", "Idle connections in the pool."),
+            ("overflow", "Connections open over the size of the pool."),
+            ("checkouts", "Connections given out since the start."),
+            ("failed_checkouts", "Connections failed to be given out."),
+            ("max_checkout_seconds", "Longest wait for a connection."),
+        ):
+            if stats.get(name) is not None:
+                yield GaugeMetricFamily(
+                    f"db_pool_{name}", description, value=stats[name]
+                )
+
+
+pool_collectors: List[PoolCollector] = []
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time the statements of the engine and expose its pool."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    collector = PoolCollector(engine)
+    registry.register(collector)
+    pool_collectors.append(collector)
+
+
+def render() -> bytes:
+    """Metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        MultiProcessCollector(collected)
+        # Live pool state is not shared between processes.
+        for collector in pool_collectors:
+            collected.register(collector)
+        return generate_latest(collected)
+    return generate_latest(registry)
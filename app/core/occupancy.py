@@ -0,0 +1,238 @@
+"""In-process occupancy index of meeting rooms.
+
+For every room the index keeps the actual reservations as sorted parallel
+lists, so the question "is the room busy from X to Y" is answered with a
+binary search instead of a SQL query. A room is loaded from the database on
+first use and reloaded when its entry becomes stale:
+
+- the entry is older than ``settings.occupancy_index_ttl`` seconds, which
+  bounds how long reservations made by other worker processes stay unseen;
+- a write of this process contradicts the entry (an unknown reservation is
+  changed or removed, a new reservation overlaps a known one);
+- a conflict reported by the index is not confirmed by the database.
+
+The database remains the source of truth: the index is optional
+(``settings.occupancy_index_enabled``), every conflict it reports is
+confirmed with a query before the request is rejected, and a room it
+reports free is confirmed with a single ``EXISTS`` query, since
+reservations of other worker processes may be unseen yet.
+
+Recurring reservations are kept as series and expanded for the checked
+interval only.
+"""
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.recurrence import expand
+from app.models.reservation import Reservation
+from app.models.reservation_series import ReservationSeries
+
+Interval = Tuple[datetime, datetime]
+
+
+def sweep_intersections(
+    intervals: Sequence[Interval], others: Sequence[Interval]
+) -> List[int]:
+    """Indexes of ``others`` intersecting any of ``intervals``.
+
+    Both sequences are sorted by start and ``intervals`` do not overlap each
+    other, so one pass over both of them is enough. Bounds are inclusive.
+    """
+    intersections = set()
+    position = 0
+    for start, end in intervals:
+        # What ends before this interval ends before all the next ones.
+        while position < len(others) and others[position][1] < start:
+            position += 1
+        current = position
+        while current < len(others) and others[current][0] <= end:
+            if others[current][1] >= start:
+                intersections.add(current)
+            current += 1
+    return sorted(intersections)
+
+
+class RoomOccupancy:
+    """Non-overlapping reservations of one room sorted by their start.
+
+    Since reservations of a room do not overlap, their ends are sorted as
+    well, which allows to binary search by either bound.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "series", "loaded_at", "stale")
+
+    def __init__(self, reservations=(), series=()):
+        reservations = sorted(reservations, key=lambda r: r.from_reserve)
+        self.starts: List[datetime] = [r.from_reserve for r in reservations]
+        self.ends: List[datetime] = [r.to_reserve for r in reservations]
+        self.ids: List[int] = [r.id for r in reservations]
+        self.series = list(series)
+        self.loaded_at = time.monotonic()
+        self.stale = any(
+            self.ends[i] >= self.starts[i + 1]
+            for i in range(len(self.starts) - 1)
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_fresh(self, ttl: float) -> bool:
+        return not self.stale and time.monotonic() - self.loaded_at < ttl
+
+    def get_intersections(
+        self,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        reservation_id: Optional[int] = None,
+    ) -> List[int]:
+        """Return indexes of reservations intersecting the interval.
+
+        Bounds are inclusive, as in the database check.
+        """
+        position = bisect_left(self.ends, from_reserve)
+        intersections = []
+        while (
+            position < len(self.starts) and
+            self.starts[position] <= to_reserve
+        ):
+            if self.ids[position] != reservation_id:
+                intersections.append(position)
+            position += 1
+        return intersections
+
+    def add(
+        self, reservation_id: int, from_reserve: datetime,
+        to_reserve: datetime,
+    ) -> None:
+        position = bisect_left(self.starts, from_reserve)
+        if (
+            position > 0 and self.ends[position - 1] >= from_reserve or
+            position < len(self.starts) and
+            self.starts[position] <= to_reserve
+        ):
+            # The database accepted a reservation the index considers
+            # conflicting: the index missed a change.
+            self.stale = True
+            return
+        self.starts.insert(position, from_reserve)
+        self.ends.insert(position, to_reserve)
+        self.ids.insert(position, reservation_id)
+
+    def discard(self, reservation_id: int) -> None:
+        try:
+            position = self.ids.index(reservation_id)
+        except ValueError:
+            # Unknown reservation was changed: it was made elsewhere.
+            self.stale = True
+            return
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+
+
+class OccupancyIndex:
+    """Lazily loaded occupancy of all meeting rooms."""
+
+    def __init__(self):
+        self._rooms: Dict[int, RoomOccupancy] = {}
+
+    @property
+    def ttl(self) -> int:
+        return settings.occupancy_index_ttl
+
+    async def get_room(
+        self, meetingroom_id: int, session: AsyncSession
+    ) -> RoomOccupancy:
+        """Return occupancy of the room, loading it if missing or stale."""
+        room = self._rooms.get(meetingroom_id)
+        if room is None or not room.is_fresh(self.ttl):
+            reservations = await session.execute(
+                select(
+                    Reservation.id,
+                    Reservation.from_reserve,
+                    Reservation.to_reserve,
+                ).where(
+                    Reservation.meetingroom_id == meetingroom_id,
+                    Reservation.to_reserve > datetime.now(),
+                )
+            )
+            series = await session.execute(
+                select(
+                    ReservationSeries.from_reserve,
+                    ReservationSeries.to_reserve,
+                    ReservationSeries.frequency,
+                    ReservationSeries.interval,
+                    ReservationSeries.until,
+                    ReservationSeries.count,
+                    ReservationSeries.exceptions,
+                ).where(
+                    ReservationSeries.meetingroom_id == meetingroom_id,
+                    ReservationSeries.last_to_reserve > datetime.now(),
+                )
+            )
+            room = RoomOccupancy(reservations.all(), series.all())
+            self._rooms[meetingroom_id] = room
+        return room
+
+    async def get_reservations_at_the_same_time(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: int,
+        reservation_id: Optional[int] = None,
+        session: AsyncSession
+    ) -> List[Reservation]:
+        """Same as the CRUD method, but answered from memory if possible."""
+        room = await self.get_room(meetingroom_id, session)
+        reservations = [
+            Reservation(
+                id=room.ids[position],
+                from_reserve=room.starts[position],
+                to_reserve=room.ends[position],
+                meetingroom_id=meetingroom_id,
+            )
+            for position in room.get_intersections(
+                from_reserve, to_reserve, reservation_id
+            )
+        ]
+        reservations.extend(
+            Reservation(
+                from_reserve=start,
+                to_reserve=end,
+                meetingroom_id=meetingroom_id,
+            )
+            for series in room.series
+            for start, end in expand(series, from_reserve, to_reserve)
+        )
+        return reservations
+
+    def add(self, reservation: Reservation) -> None:
+        room = self._rooms.get(reservation.meetingroom_id)
+        if room is not None:
+            room.add(
+                reservation.id,
+                reservation.from_reserve,
+                reservation.to_reserve,
+            )
+
+    def discard(self, meetingroom_id: int, reservation_id: int) -> None:
+        room = self._rooms.get(meetingroom_id)
+        if room is not None:
+            room.discard(reservation_id)
+
+    def invalidate(self, meetingroom_id: Optional[int] = None) -> None:
+        """Forget one room or, without arguments, the whole index."""
+        if meetingroom_id is None:
+            self._rooms.clear()
+        else:
+            self._rooms.pop(meetingroom_id, None)
+
+
+occupancy_index = OccupancyIndex()
@@ -0,0 +1,89 @@
+"""Password hashing off the event loop.
+
+A bcrypt hash or verification takes a few hundred milliseconds of CPU by
+design. Run on the event loop, as fastapi-users does, a burst of logins
+stalls every other request of the worker for as long. ``PasswordHasher``
+runs them in a pool of ``settings.password_hash_workers`` threads, bcrypt
+releases the GIL while hashing, and lets at most
+``settings.password_hash_queue`` more wait for a thread: beyond that
+``PasswordHashQueueFull`` is raised and the request is answered with 503
+at once instead of timing out behind the queue.
+
+New hashes have the cost of ``settings.password_hash_rounds`` (log2 of the
+bcrypt rounds), a hash of another cost is replaced on a successful login.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from fastapi_users.password import PasswordHelper
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+
+class PasswordHashQueueFull(Exception):
+    """Too many passwords are waiting to be hashed or verified."""
+
+
+def password_context(rounds: int) -> CryptContext:
+    """bcrypt context hashing with ``rounds`` and deprecating other costs."""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int, rounds: int):
+        self.helper = PasswordHelper(password_context(rounds))
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Jobs of the pool, running and waiting. Changed on the event loop
+        # only, no lock is needed.
+        self.pending = 0
+        self.rejected = 0
+
+    async def _run(self, function: Callable, *args):
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise PasswordHashQueueFull()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="password"
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.helper.hash, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Whether the password matches and its new hash if the cost of
+        the old one differs from the configured one."""
+        return await self._run(
+            self.helper.verify_and_update, password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers,
+    settings.password_hash_queue,
+    settings.password_hash_rounds,
+)
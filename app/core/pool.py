@@ -0,0 +1,59 @@
+"""Connection pool with checkout statistics.
+
+``InstrumentedQueuePool`` times every checkout: the wait for a free
+connection, or the creation of a new one, and the pre-ping if enabled. A
+pool under pressure shows long checkouts and overflow connections before
+requests start to fail with a pool timeout.
+"""
+import time
+from typing import Any, Dict
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+        self.failed_checkouts = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except Exception:
+            self.failed_checkouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.checkouts += 1
+            self.checkout_seconds += elapsed
+            self.max_checkout_seconds = max(self.max_checkout_seconds, elapsed)
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """Current state of the pool and its checkout statistics."""
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            # Negative while the pool has not opened all of its connections.
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkouts=pool.checkouts,
+            failed_checkouts=pool.failed_checkouts,
+            mean_checkout_seconds=(
+                pool.checkout_seconds / pool.checkouts
+                if pool.checkouts else None
+            ),
+            max_checkout_seconds=pool.max_checkout_seconds,
+        )
+    return stats
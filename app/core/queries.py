@@ -0,0 +1,123 @@
+"""Request-scoped recording of SQL statements.
+
+``record_queries`` starts a recorder in a context variable, and every
+statement executed by any engine in that context is appended to it and to
+the recorders it is nested in. ``QueryRecorderMiddleware`` records every
+HTTP request:
+
+- with ``settings.query_count_header`` the number of statements is
+  returned in the ``X-Query-Count`` header, statements of a streamed body
+  run after the header is sent are not counted;
+- a request running the same normalized statement more than
+  ``settings.repeated_query_threshold`` times, the sign of an N+1 loop, is
+  logged with the statement.
+
+Statements are normalized by collapsing whitespace and lists of
+placeholders, so ``IN (?, ?)`` and ``IN (?, ?, ?)`` are the same statement.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST = re.compile(
+    rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)"
+)
+_REPEATED_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    # Rows of a multi-row VALUES.
+    return _REPEATED_LIST.sub("(?)", statement)
+
+
+class QueryRecorder:
+    def __init__(self, parent: Optional["QueryRecorder"] = None):
+        self.parent = parent
+        self.statements: List[str] = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Normalized statements run more than ``threshold`` times."""
+        if len(self.statements) <= threshold:
+            return []
+        counts = Counter(map(normalize, self.statements))
+        return [
+            (statement, count) for statement, count in counts.most_common()
+            if count > threshold
+        ]
+
+
+_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar(
+    "query_recorder", default=None
+)
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryRecorder]:
+    """Record the statements executed in the block."""
+    recorder = QueryRecorder(_recorder.get())
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context,
+                      executemany):
+    recorder = _recorder.get()
+    while recorder is not None:
+        recorder.statements.append(statement)
+        recorder = recorder.parent
+
+
+class QueryRecorderMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with record_queries() as recorder:
+            async def send_with_count(message):
+                if (
+                    message["type"] == "http.response.start" and
+                    settings.query_count_header
+                ):
+                    message["headers"] = [*message.get("headers", []), (
+                        QUERY_COUNT_HEADER.lower().encode(),
+                        str(len(recorder)).encode(),
+                    )]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_count)
+            finally:
+                for statement, count in recorder.repeated(
+                    settings.repeated_query_threshold
+                ):
+                    logger.warning(
+                        "%s %s ran the same statement %d times: %s",
+                        scope["method"], scope["path"], count, statement,
+                    )
@@ -0,0 +1,101 @@
+"""Expansion of recurring reservations into occurrences.
+
+A series is described by its first occurrence, a frequency with an
+interval, an end (a date or a number of occurrences) and exceptions: the
+starts of cancelled occurrences. Occurrences are never stored, they are
+expanded for the window a query is interested in.
+"""
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY, rrule, rruleset
+
+# Upper bound of occurrences in one series.
+MAX_OCCURRENCES = 1000
+
+
+class Frequency(str, Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+
+
+RRULE_FREQUENCIES = {
+    Frequency.daily: DAILY,
+    Frequency.weekly: WEEKLY,
+    Frequency.monthly: MONTHLY,
+}
+
+# Shortest distance between two starts for an interval of 1.
+MIN_PERIODS = {
+    Frequency.daily: timedelta(days=1),
+    Frequency.weekly: timedelta(weeks=1),
+    Frequency.monthly: timedelta(days=28),
+}
+
+
+def _as_datetime(value: Union[datetime, str]) -> datetime:
+    # Exceptions are stored in a JSON column as ISO strings.
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def iter_starts(
+    from_reserve: datetime,
+    frequency: Frequency,
+    interval: int = 1,
+    until: Optional[datetime] = None,
+    count: Optional[int] = None,
+    exceptions: Iterable[Union[datetime, str]] = (),
+    after: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+) -> Iterator[datetime]:
+    """Starts of the occurrences, limited by ``after`` and ``before``.
+
+    Limits are inclusive.
+    """
+    # dateutil drops microseconds of the start, so the rule is built for the
+    # whole second and every start is shifted back.
+    shift = timedelta(microseconds=from_reserve.microsecond)
+    rule = rruleset()
+    rule.rrule(rrule(
+        RRULE_FREQUENCIES[Frequency(frequency)],
+        dtstart=from_reserve - shift,
+        interval=interval,
+        until=until - shift if until else None,
+        count=count,
+    ))
+    for exception in exceptions or ():
+        rule.exdate(_as_datetime(exception) - shift)
+    if after is not None or before is not None:
+        rule = rule.between(
+            after - shift if after else from_reserve - shift,
+            before - shift if before else datetime.max,
+            inc=True,
+        )
+    return (start + shift for start in rule)
+
+
+def expand(
+    series,
+    window_from: Optional[datetime] = None,
+    window_to: Optional[datetime] = None,
+) -> List[Tuple[datetime, datetime]]:
+    """Occurrences of the series intersecting the window, by start.
+
+    ``series`` is a model or a schema. Bounds are inclusive, as in the
+    reservation conflict check. Without a window all occurrences are
+    returned.
+    """
+    duration = series.to_reserve - series.from_reserve
+    starts = iter_starts(
+        series.from_reserve,
+        series.frequency,
+        series.interval,
+        series.until,
+        series.count,
+        series.exceptions,
+        after=window_from - duration if window_from else None,
+        before=window_to,
+    )
+    return [(start, start + duration) for start in starts]
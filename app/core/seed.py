@@ -0,0 +1,490 @@
+"""Bulk seeding and import of rooms, users and reservations.
+
+Rows are written with Core ``executemany`` in chunks of ``--chunk-size``
+rows and committed every ``--transaction-size`` rows, instead of one
+``CRUDBase.create`` with its commit per row. A load of at least
+``REBUILD_INDEXES_FROM`` reservations drops the secondary indexes of the
+table and builds them again at the end, which is several times faster
+than updating them for every row. Every distinct password is hashed once.
+
+Generate a dataset, the reservations of every room follow each other
+without overlapping, most of them in the past:
+
+    python -m app.core.seed generate --rooms 2000 --users 5000 \\
+        --reservations 1000000
+
+Import CSV files with a header or NDJSON files, by their extension.
+Reservations are read in the format of ``GET /reservations/export`` in
+chunks of ``IMPORT_CHUNK_SIZE`` rows, those overlapping each other, a
+reservation already in the database or an occurrence of a series are
+skipped, the others get new ids. A chunk is checked against the chunks
+inserted before it, so the indexes of the table are kept during an import:
+
+    python -m app.core.seed import --rooms rooms.csv --users users.csv \\
+        --reservations reservations.ndjson
+
+The tables must exist (``alembic upgrade head``), ``--reset`` drops and
+creates them again.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import groupby, islice
+from pathlib import Path
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+import numpy as np
+from faker import Faker
+from sqlalchemy import Table, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.core.db import Base, engine
+from app.core.occupancy import sweep_intersections
+from app.core.passwords import password_hasher
+from app.crud.reservation_series import reservation_series_crud
+from app.models import MeetingRoom, Reservation, User
+
+CHUNK_SIZE = 50000
+TRANSACTION_SIZE = 500000
+REBUILD_INDEXES_FROM = 100000
+# Below REBUILD_INDEXES_FROM: the conflicts of a chunk are looked up by the
+# indexes of the table.
+IMPORT_CHUNK_SIZE = 50000
+# Generated reservations take one of five slots of two hours a day from
+# 8:00, and are shorter than the slot, so neighbours do not touch.
+SLOTS_PER_DAY = 5
+DURATIONS = (30, 60, 90, 110)
+FUTURE_SHARE = 0.1
+DEFAULT_PASSWORD = "password"
+
+
+@lru_cache(maxsize=None)
+def hash_password(password: str) -> str:
+    """Hash of the password with the configured cost, computed once per
+    distinct value."""
+    return password_hasher.helper.hash(password)
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+async def bulk_insert(
+    engine: AsyncEngine,
+    table: Table,
+    rows: Iterable[Dict[str, Any]],
+    chunk_size: int = CHUNK_SIZE,
+    transaction_size: int = TRANSACTION_SIZE,
+) -> int:
+    """Insert the rows in chunks, commit every ``transaction_size`` rows."""
+    inserted = pending = 0
+    async with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # A crash in the middle of a load loses the load anyway.
+            await conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            await conn.commit()
+        try:
+            transaction = await conn.begin()
+            for chunk in chunked(rows, chunk_size):
+                await conn.execute(table.insert(), chunk)
+                inserted += len(chunk)
+                pending += len(chunk)
+                if pending >= transaction_size:
+                    await transaction.commit()
+                    transaction = await conn.begin()
+                    pending = 0
+            await transaction.commit()
+        finally:
+            if sqlite:
+                await conn.exec_driver_sql(
+                    f"PRAGMA synchronous={settings.sqlite_synchronous}"
+                )
+                await conn.commit()
+    return inserted
+
+
+@asynccontextmanager
+async def indexes_dropped(engine: AsyncEngine, table: Table, drop: bool):
+    """Drop the secondary indexes of the table for the block."""
+    indexes = [index for index in table.indexes if not index.unique]
+    if not drop or not indexes:
+        yield
+        return
+    async with engine.begin() as conn:
+        for index in indexes:
+            await conn.run_sync(index.drop, checkfirst=True)
+    try:
+        yield
+    finally:
+        async with engine.begin() as conn:
+            for index in indexes:
+                await conn.run_sync(index.create, checkfirst=True)
+
+
+async def next_id(engine: AsyncEngine, table: Table) -> int:
+    async with engine.connect() as conn:
+        return (await conn.scalar(select(func.max(table.c.id))) or 0) + 1
+
+
+def reservation_days(reservations: int, rooms: int) -> int:
+    """Days taken by the generated reservations."""
+    per_room = -(-reservations // rooms)
+    return -(-per_room // SLOTS_PER_DAY)
+
+
+def generate_rooms(first_id: int, count: int, fake: Faker) -> Iterator[dict]:
+    for room_id in range(first_id, first_id + count):
+        yield {
+            "id": room_id,
+            "name": f"{fake.city()} {room_id}",
+            "description": fake.sentence(),
+        }
+
+
+def generate_users(
+    first_id: int, count: int, password: str, fake: Faker
+) -> Iterator[dict]:
+    hashed_password = hash_password(password)
+    for user_id in range(first_id, first_id + count):
+        yield {
+            "id": user_id,
+            "email": f"{user_id}.{fake.user_name()}@example.com",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_superuser": False,
+            "is_verified": False,
+        }
+
+
+def generate_reservations(
+    room_ids: Sequence[int],
+    user_ids: Sequence[int],
+    count: int,
+    first_day: datetime,
+    seed: int = 0,
+) -> Iterator[dict]:
+    """Reservations of the rooms in turn, each in the next slot of its
+    room, by random users."""
+    rng = np.random.default_rng(seed)
+    rooms = np.asarray(room_ids)
+    users = np.asarray(user_ids) if len(user_ids) else None
+    for offset in range(0, count, CHUNK_SIZE):
+        numbers = np.arange(offset, min(offset + CHUNK_SIZE, count))
+        slots = numbers // len(rooms)
+        starts = (
+            (slots // SLOTS_PER_DAY) * 24 * 60 +
+            8 * 60 + (slots % SLOTS_PER_DAY) * 120
+        )
+        ends = starts + rng.choice(DURATIONS, len(numbers))
+        chunk_users = (
+            rng.choice(users, len(numbers)).tolist() if users is not None
+            else [None] * len(numbers)
+        )
+        for room_id, start, end, user_id in zip(
+            rooms[numbers % len(rooms)].tolist(), starts.tolist(),
+            ends.tolist(), chunk_users,
+        ):
+            yield {
+                "meetingroom_id": room_id,
+                "user_id": user_id,
+                "from_reserve": first_day + timedelta(minutes=start),
+                "to_reserve": first_day + timedelta(minutes=end),
+            }
+
+
+def _bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+ROOM_FIELDS: Dict[str, Callable] = {
+    "id": int, "name": str, "description": str,
+}
+USER_FIELDS: Dict[str, Callable] = {
+    "id": int, "email": str, "password": str, "hashed_password": str,
+    "is_active": _bool, "is_superuser": _bool, "is_verified": _bool,
+}
+# The ids of the export are not imported: one may be taken by a live or an
+# archived reservation, the database assigns new ones.
+RESERVATION_FIELDS: Dict[str, Callable] = {
+    "meetingroom_id": int, "user_id": int,
+    "from_reserve": datetime.fromisoformat,
+    "to_reserve": datetime.fromisoformat,
+}
+
+
+def read_records(
+    path: Path, fields: Dict[str, Callable]
+) -> Iterator[Dict[str, Any]]:
+    """Records of a CSV or NDJSON file with the known fields converted."""
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.suffix == ".csv":
+            records: Iterable[dict] = csv.DictReader(file)
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+        for record in records:
+            row = {}
+            for field, convert in fields.items():
+                value = record.get(field)
+                if value in (None, ""):
+                    continue
+                row[field] = convert(value) if isinstance(value, str) else (
+                    value
+                )
+            yield row
+
+
+def user_rows(records: Iterable[dict]) -> Iterator[dict]:
+    for record in records:
+        password = record.pop("password", None)
+        if "hashed_password" not in record:
+            record["hashed_password"] = hash_password(password)
+        yield {
+            "is_active": True, "is_superuser": False, "is_verified": False,
+            **record,
+        }
+
+
+async def free_reservations(
+    engine: AsyncEngine, rows: List[dict]
+) -> Tuple[List[dict], int]:
+    """Rows not overlapping each other, the stored reservations nor the
+    occurrences of series, and the number of the skipped ones."""
+    valid = sorted(
+        (row for row in rows if row["from_reserve"] < row["to_reserve"]),
+        key=lambda row: (row["meetingroom_id"], row["from_reserve"]),
+    )
+    if not valid:
+        return [], len(rows)
+    from_reserve = min(row["from_reserve"] for row in valid)
+    to_reserve = max(row["to_reserve"] for row in valid)
+    async with engine.connect() as conn:
+        stored = await conn.execute(
+            select(
+                Reservation.meetingroom_id,
+                Reservation.from_reserve,
+                Reservation.to_reserve,
+            )
+            .where(
+                Reservation.to_reserve >= from_reserve,
+                Reservation.from_reserve <= to_reserve,
+            )
+            .order_by(Reservation.meetingroom_id, Reservation.from_reserve)
+        )
+        stored_by_room = {
+            room_id: [(start, end) for _, start, end in intervals]
+            for room_id, intervals in groupby(
+                stored.all(), key=lambda interval: interval[0]
+            )
+        }
+        async with AsyncSession(bind=conn) as session:
+            occurrences = await reservation_series_crud.get_occurrences(
+                room_ids={row["meetingroom_id"] for row in valid},
+                from_reserve=from_reserve,
+                to_reserve=to_reserve,
+                session=session,
+            )
+    for room_id, room_occurrences in groupby(
+        occurrences, key=lambda occurrence: occurrence.meetingroom_id
+    ):
+        stored_by_room[room_id] = sorted(
+            stored_by_room.get(room_id, []) + [
+                (occurrence.from_reserve, occurrence.to_reserve)
+                for occurrence in room_occurrences
+            ]
+        )
+    free = []
+    for room_id, room_rows in groupby(
+        valid, key=lambda row: row["meetingroom_id"]
+    ):
+        room_rows = list(room_rows)
+        taken = set(sweep_intersections(
+            stored_by_room.get(room_id, []),
+            [(row["from_reserve"], row["to_reserve"]) for row in room_rows],
+        ))
+        last_end: Optional[datetime] = None
+        for position, row in enumerate(room_rows):
+            # Bounds are inclusive, as in the conflict check of the API.
+            if position in taken or (
+                last_end is not None and row["from_reserve"] <= last_end
+            ):
+                continue
+            free.append(row)
+            last_end = row["to_reserve"]
+    return free, len(rows) - len(free)
+
+
+async def sync_sequences(engine: AsyncEngine) -> None:
+    """Move the id sequences of PostgreSQL past the inserted ids."""
+    if engine.dialect.name != "postgresql":
+        return
+    async with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            last_id = select(func.max(table.c.id)).scalar_subquery()
+            await conn.execute(select(func.setval(
+                func.pg_get_serial_sequence(table.name, "id"),
+                func.coalesce(last_id, 0) + 1,
+                False,
+            )))
+
+
+async def reset(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def load_reservations(
+    engine: AsyncEngine, rows: Iterable[dict], count: int, **options
+) -> int:
+    table = Reservation.__table__
+    async with indexes_dropped(
+        engine, table, drop=count >= REBUILD_INDEXES_FROM
+    ):
+        return await bulk_insert(engine, table, rows, **options)
+
+
+async def generate(
+    engine: AsyncEngine,
+    rooms: int,
+    users: int,
+    reservations: int,
+    password: str = DEFAULT_PASSWORD,
+    first_day: Optional[datetime] = None,
+    seed: int = 0,
+    **options,
+) -> Dict[str, int]:
+    """Generate rooms, users and the reservations of the new rooms."""
+    if reservations and not rooms:
+        raise ValueError("Reservations are generated for the new rooms")
+    Faker.seed(seed)
+    fake = Faker()
+    first_room = await next_id(engine, MeetingRoom.__table__)
+    first_user = await next_id(engine, User.__table__)
+    await bulk_insert(
+        engine, MeetingRoom.__table__,
+        generate_rooms(first_room, rooms, fake), **options,
+    )
+    await bulk_insert(
+        engine, User.__table__,
+        generate_users(first_user, users, password, fake), **options,
+    )
+    if first_day is None:
+        today = datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        days = reservation_days(reservations, rooms) if rooms else 0
+        first_day = today - timedelta(days=int(days * (1 - FUTURE_SHARE)))
+    await load_reservations(engine, generate_reservations(
+        range(first_room, first_room + rooms),
+        range(first_user, first_user + users),
+        reservations, first_day, seed,
+    ), reservations, **options)
+    await sync_sequences(engine)
+    return {"rooms": rooms, "users": users, "reservations": reservations}
+
+
+async def import_files(
+    engine: AsyncEngine,
+    rooms: Optional[Path] = None,
+    users: Optional[Path] = None,
+    reservations: Optional[Path] = None,
+    **options,
+) -> Dict[str, int]:
+    """Import the files, rooms and users before the reservations."""
+    result = {}
+    if rooms is not None:
+        result["rooms"] = await bulk_insert(
+            engine, MeetingRoom.__table__,
+            read_records(rooms, ROOM_FIELDS), **options,
+        )
+    if users is not None:
+        result["users"] = await bulk_insert(
+            engine, User.__table__,
+            user_rows(read_records(users, USER_FIELDS)), **options,
+        )
+    if reservations is not None:
+        result["reservations"] = result["skipped_reservations"] = 0
+        for chunk in chunked(
+            read_records(reservations, RESERVATION_FIELDS),
+            IMPORT_CHUNK_SIZE,
+        ):
+            rows, skipped = await free_reservations(engine, chunk)
+            result["reservations"] += await load_reservations(
+                engine, rows, len(rows), **options
+            )
+            result["skipped_reservations"] += skipped
+    await sync_sequences(engine)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="drop and create the tables before the load",
+    )
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "--transaction-size", type=int, default=TRANSACTION_SIZE
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser(
+        "generate", help="generate a dataset"
+    )
+    generate_parser.add_argument("--rooms", type=int, default=100)
+    generate_parser.add_argument("--users", type=int, default=1000)
+    generate_parser.add_argument("--reservations", type=int, default=100000)
+    generate_parser.add_argument(
+        "--password", default=DEFAULT_PASSWORD,
+        help="password of all generated users",
+    )
+    generate_parser.add_argument("--seed", type=int, default=0)
+    import_parser = commands.add_parser("import", help="import files")
+    import_parser.add_argument("--rooms", type=Path)
+    import_parser.add_argument("--users", type=Path)
+    import_parser.add_argument("--reservations", type=Path)
+    args = parser.parse_args()
+
+    async def run() -> Dict[str, int]:
+        if args.reset:
+            await reset(engine)
+        options = {
+            "chunk_size": args.chunk_size,
+            "transaction_size": args.transaction_size,
+        }
+        try:
+            if args.command == "generate":
+                return await generate(
+                    engine, args.rooms, args.users, args.reservations,
+                    args.password, seed=args.seed, **options,
+                )
+            return await import_files(
+                engine, args.rooms, args.users, args.reservations, **options
+            )
+        finally:
+            await engine.dispose()
+
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    seconds = time.perf_counter() - started
+    print(json.dumps({
+        **result,
+        "seconds": round(seconds, 3),
+        "reservations_per_minute": round(
+            result.get("reservations", 0) / seconds * 60
+        ),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
-from typing import Optional, Union
+import hashlib
+import time
+from typing import Any, Dict, Optional, Union
 
-from fastapi import Depends, Request
+import jwt
+from fastapi import Depends, Request, WebSocket
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (BaseUserManager, FastAPIUsers, IntegerIDMixin,
-                           InvalidPasswordException)
+                           InvalidPasswordException, exceptions)
 from fastapi_users.authentication import (AuthenticationBackend,
                                           BearerTransport, JWTStrategy)
+from fastapi_users.jwt import decode_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache, restore, snapshot
 from app.core.config import settings
-from app.core.db import get_async_session
+from app.core.db import AsyncSessionLocal, get_async_session
+from app.core.passwords import password_hasher
 from app.models.user import User
 from app.schemas.user import UserCreate
 
@@ -24,12 +31,66 @@ async def get_user_db(session: AsyncSession = Depends(get_async_session)):
 bearer_transport = BearerTransport(tokenUrl="auth/jwt/login")
 
 
+TOKEN_LIFETIME = 3600
+
+# Verified claims by the digest of the token.
+token_cache = TTLCache(
+    "tokens", maxsize=settings.token_cache_size, ttl=TOKEN_LIFETIME
+)
+
+
+class CachingJWTStrategy(JWTStrategy):
+    """JWT strategy verifying every token once until it expires.
+
+    The signature and the claims of a token are checked on its first use,
+    then its claims are taken from ``token_cache``. The user is loaded on
+    every request as before, so a deactivated user loses access with a
+    still valid token.
+    """
+
+    async def read_token(self, token, user_manager):
+        if token is None:
+            return None
+
+        key = hashlib.sha256(token.encode()).digest()
+        data = token_cache.get(key)
+        if data is None:
+            try:
+                data = decode_jwt(
+                    token,
+                    self.decode_key,
+                    self.token_audience,
+                    algorithms=[self.algorithm],
+                )
+            except jwt.PyJWTError:
+                return None
+            expires_at = data.get("exp")
+            token_cache.set(key, data, ttl=(
+                expires_at - time.time() if expires_at is not None else None
+            ))
+
+        user_id = data.get("user_id")
+        if user_id is None:
+            return None
+        try:
+            parsed_id = user_manager.parse_id(user_id)
+            return await user_manager.get(parsed_id)
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+
+
 # Define the strategy: store the token as a JWT.
+# To a special class from the application settings
+# pass the secret word used to generate the token.
+# The second argument is the token expiration date in seconds.
+jwt_strategy = CachingJWTStrategy(
+    secret=settings.secret, lifetime_seconds=TOKEN_LIFETIME
+)
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    # To a special class from the application settings
-    # pass the secret word used to generate the token.
-    # The second argument is the token expiration date in seconds.
-    return JWTStrategy(secret=settings.secret, lifetime_seconds=3600)
+    # The strategy keeps no per-request state, one instance serves all.
+    return jwt_strategy
 
 
 # Create an authentication backend object with the selected parameters.
@@ -40,14 +101,113 @@ auth_backend = AuthenticationBackend(
 )
 
 
+# Active users by id. The JWT strategy loads the user of every request
+# through ``UserManager.get``, a hit spares the query. Changes made by this
+# process drop the entry at once, changes made by other worker processes
+# (e.g. deactivation) are seen within ``settings.user_cache_ttl`` seconds.
+user_cache = TTLCache(
+    "users", maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl
+)
+
+
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     """Here you can describe your password validation conditions.
 
     On successful validation, the function returns nothing.
     On validation error, a special error class will be called
     InvalidPasswordException.
+
+    Passwords are hashed and verified by ``password_hasher`` off the event
+    loop, the synchronous helper of fastapi-users is not used.
     """
 
+    def __init__(self, user_db):
+        super().__init__(user_db, password_helper=password_hasher.helper)
+
+    async def get(self, id: int) -> User:
+        columns = user_cache.get(id)
+        if columns is not None:
+            return await restore(User, columns, self.user_db.session)
+        user = await super().get(id)
+        if user.is_active:
+            user_cache.set(id, snapshot(user))
+        return user
+
+    # Update covers deactivation and password change.
+    async def on_after_update(
+            self,
+            user: User,
+            update_dict: Dict[str, Any],
+            request: Optional[Request] = None,
+    ):
+        user_cache.pop(user.id)
+
+    async def on_after_reset_password(
+            self, user: User, request: Optional[Request] = None
+    ):
+        user_cache.pop(user.id)
+
+    async def authenticate(
+            self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            # Hash anyway, an unknown email must take as long as a wrong
+            # password.
+            await password_hasher.hash(credentials.password)
+            return None
+        verified, updated_password_hash = (
+            await password_hasher.verify_and_update(
+                credentials.password, user.hashed_password
+            )
+        )
+        if not verified:
+            return None
+        # The hash has another cost than the configured one.
+        if updated_password_hash is not None:
+            await self.user_db.update(
+                user, {"hashed_password": updated_password_hash}
+            )
+            user_cache.pop(user.id)
+        return user
+
+    async def create(
+            self,
+            user_create: UserCreate,
+            safe: bool = False,
+            request: Optional[Request] = None,
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+        if await self.user_db.get_by_email(user_create.email) is not None:
+            raise exceptions.UserAlreadyExists()
+        user_dict = (
+            user_create.create_update_dict()
+            if safe
+            else user_create.create_update_dict_superuser()
+        )
+        user_dict["hashed_password"] = await password_hasher.hash(
+            user_dict.pop("password")
+        )
+        created_user = await self.user_db.create(user_dict)
+        await self.on_after_register(created_user, request)
+        return created_user
+
+    async def _update(self, user: User, update_dict: Dict[str, Any]) -> User:
+        # The base class passes a hashed password through as it is.
+        if "password" in update_dict:
+            update_dict = dict(update_dict)
+            password = update_dict.pop("password")
+            await self.validate_password(password, user)
+            update_dict["hashed_password"] = await password_hasher.hash(
+                password
+            )
+        return await super()._update(user, update_dict)
+
+    async def delete(self, user: User) -> None:
+        await super().delete(user)
+        user_cache.pop(user.id)
+
     async def validate_password(
             self,
             password: str,
@@ -81,3 +241,28 @@ fastapi_users = FastAPIUsers[User, int](
 
 current_user = fastapi_users.current_user(active=True)
 current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+
+async def current_websocket_user(
+    websocket: WebSocket, token: Optional[str] = None
+) -> Optional[User]:
+    """Active user of a WebSocket, None if the token is missing or invalid.
+
+    Browsers cannot set the headers of a WebSocket, so the token is taken
+    from the ``token`` query parameter or the Authorization header. The
+    session is closed before the connection is accepted: an open WebSocket
+    does not hold a connection of the pool.
+    """
+    if token is None:
+        scheme, _, token = websocket.headers.get(
+            "authorization", ""
+        ).partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+    async with AsyncSessionLocal() as session:
+        user = await jwt_strategy.read_token(
+            token, UserManager(SQLAlchemyUserDatabase(session, User))
+        )
+    if user is None or not user.is_active:
+        return None
+    return user
@@ -1,17 +1,52 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence
 
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import insert, inspect, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
 
 from app.models import User
 
 
 class CRUDBase:
-    """Implements CRUD to work with the database using sqlalchemy."""
+    """Implements CRUD to work with the database using sqlalchemy.
+
+    Every write is one statement followed by the commit. Backends with
+    RETURNING write and read back the row at once; on the others the ORM
+    takes the primary key of an inserted row from the cursor. The written
+    instance is detached before the commit, so the commit does not expire
+    it and it is not reloaded by another SELECT.
+
+    A write violating a constraint rolls the session back and raises
+    ``IntegrityError``.
+    """
 
     def __init__(self, model):
         self.model = model  # sqlalchemy model
+        self.fields = [
+            attribute.key for attribute in inspect(model).column_attrs
+        ]
+
+    @staticmethod
+    def paginate(
+        statement: Select,
+        key: Sequence,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ) -> Select:
+        """Order the statement by the key columns and cut a keyset page.
+
+        Rows strictly after the ``after`` values of the key are selected,
+        so the key must be unique and covered by an index.
+        """
+        if after is not None:
+            statement = statement.where(tuple_(*key) > tuple_(*after))
+        statement = statement.order_by(*key)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return statement
 
     async def get(
         self,
@@ -23,10 +58,29 @@ class CRUDBase:
         )
         return db_obj.scalars().first()
 
-    async def get_multi(self, session: AsyncSession):
-        db_objs = await session.execute(select(self.model))
+    async def get_multi(
+        self,
+        session: AsyncSession,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ):
+        db_objs = await session.execute(
+            self.paginate(select(self.model), (self.model.id,), after, limit)
+        )
         return db_objs.scalars().all()
 
+    async def get_multi_rows(
+        self,
+        session: AsyncSession,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        """Same as ``get_multi``, but plain rows of the columns."""
+        rows = await session.execute(self.paginate(
+            select(*self.model.__table__.c), (self.model.id,), after, limit
+        ))
+        return rows.all()
+
     async def get_by_attribute(
         self,
         attr_name: str,
@@ -39,6 +93,52 @@ class CRUDBase:
         )
         return db_obj.scalars().first()
 
+    async def insert(self, values: Dict[str, Any], session: AsyncSession):
+        """Insert a row and commit, return the instance."""
+        table = self.model.__table__
+        try:
+            if session.bind.dialect.full_returning:
+                row = await session.execute(
+                    insert(table).values(values).returning(*table.c)
+                )
+                db_obj = self.model(**row.mappings().one())
+            else:
+                db_obj = self.model(**values)
+                session.add(db_obj)
+                await session.flush()
+                session.expunge(db_obj)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise
+        return db_obj
+
+    async def write(
+        self, db_obj, values: Dict[str, Any], session: AsyncSession
+    ):
+        """Update the row of the instance and commit, return the instance."""
+        table = self.model.__table__
+        try:
+            if values and session.bind.dialect.full_returning:
+                row = await session.execute(
+                    update(table)
+                    .where(table.c.id == db_obj.id)
+                    .values(values)
+                    .returning(*table.c)
+                )
+                for field, value in row.mappings().one().items():
+                    set_committed_value(db_obj, field, value)
+            else:
+                for field, value in values.items():
+                    setattr(db_obj, field, value)
+                await session.flush()
+            session.expunge(db_obj)
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            raise
+        return db_obj
+
     async def create(
         self, obj_in, session: AsyncSession, user: Optional[User] = None
     ):
@@ -47,11 +147,7 @@ class CRUDBase:
         if user is not None:
             obj_in_data["user_id"] = user.id
 
-        db_obj = self.model(**obj_in_data)
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
-        return db_obj
+        return await self.insert(obj_in_data, session)
 
     async def update(
         self,
@@ -59,16 +155,16 @@ class CRUDBase:
         obj_in,
         session: AsyncSession,
     ):
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
-        return db_obj
+        return await self.write(
+            db_obj,
+            {
+                field: update_data[field]
+                for field in self.fields
+                if field in update_data
+            },
+            session,
+        )
 
     async def remove(
         self,
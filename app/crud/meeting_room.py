@@ -1,23 +1,215 @@
-from typing import Optional
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.analytics import bounds_array, to_epoch_minutes
+from app.core.availability import Interval
+from app.core.cache import TTLCache, restore, snapshot
+from app.core.config import settings
+from app.core.grid import MINUTES_IN_DAY, minute_bitmaps, occupancy_grid
+from app.core.occupancy import occupancy_index
 from app.crud.base import CRUDBase
+from app.crud.reservation import reservation_crud
+from app.crud.reservation_series import reservation_series_crud
+from app.models import User
 from app.models.meeting_room import MeetingRoom
+from app.models.reservation import Reservation
 
 
 class CRUDMeetingRoom(CRUDBase):
-    async def get_room_id_by_name(
+    """Meeting room CRUD with a read-through cache of rooms.
+
+    Rooms are cached by id as column values, the room list endpoint keeps
+    its serialized pages in the same cache. Any write clears the whole
+    cache: rooms change rarely and a page may hold any room.
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.cache = TTLCache(
+            "meeting_rooms",
+            maxsize=settings.meeting_room_cache_size,
+            ttl=settings.meeting_room_cache_ttl,
+        )
+
+    async def get(
+        self,
+        obj_id: int,
+        session: AsyncSession,
+        cached: bool = True,
+    ):
+        """The room from the cache, or from the database if ``cached`` is
+        False: a write must not trust a room deleted by another worker."""
+        columns = self.cache.get(("room", obj_id)) if cached else None
+        if columns is None:
+            db_obj = await super().get(obj_id, session)
+            if db_obj is None:
+                self.cache.pop(("room", obj_id))
+            else:
+                self.cache.set(("room", obj_id), snapshot(db_obj))
+            return db_obj
+        return await restore(MeetingRoom, columns, session)
+
+    async def create(
+        self, obj_in, session: AsyncSession, user: Optional[User] = None
+    ):
+        db_obj = await super().create(obj_in, session, user)
+        self.cache.clear()
+        return db_obj
+
+    async def update(
+        self,
+        db_obj,
+        obj_in,
+        session: AsyncSession,
+    ):
+        db_obj = await super().update(db_obj, obj_in, session)
+        self.cache.clear()
+        return db_obj
+
+    async def get_existing_ids(
+        self,
+        room_ids: Iterable[int],
+        session: AsyncSession,
+    ) -> Set[int]:
+        """Return those of the given ids that belong to existing rooms."""
+        db_room_ids = await session.execute(
+            select(MeetingRoom.id).where(MeetingRoom.id.in_(set(room_ids)))
+        )
+        return set(db_room_ids.scalars().all())
+
+    async def get_busy_intervals(
         self,
-        room_name: str,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
         session: AsyncSession,
-    ) -> Optional[int]:
-        db_room_id = await session.execute(
-            select(MeetingRoom.id).where(MeetingRoom.name == room_name)
+        room_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[MeetingRoom, List[Interval]]]:
+        """Rooms with their reservations intersecting the interval.
+
+        Reservations and series occurrences of every room are returned as
+        intervals sorted by start; rooms are ordered by id and include the
+        rooms without reservations. The rooms and their reservations are
+        selected by one query through the room index of reservations, the
+        series by one more, whatever the number of rooms.
+        """
+        statement = (
+            select(MeetingRoom, Reservation.from_reserve,
+                   Reservation.to_reserve)
+            .outerjoin(Reservation, and_(
+                Reservation.meetingroom_id == MeetingRoom.id,
+                Reservation.to_reserve >= from_reserve,
+                Reservation.from_reserve <= to_reserve,
+            ))
+            .order_by(MeetingRoom.id)
+        )
+        if room_ids is not None:
+            statement = statement.where(MeetingRoom.id.in_(set(room_ids)))
+        rows = await session.execute(statement)
+        busy: Dict[int, Tuple[MeetingRoom, List[Interval]]] = {}
+        for room, busy_from, busy_to in rows:
+            intervals = busy.setdefault(room.id, (room, []))[1]
+            if busy_from is not None:
+                intervals.append((busy_from, busy_to))
+
+        for occurrence in await reservation_series_crud.get_occurrences(
+            room_ids=room_ids,
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            session=session,
+        ):
+            if occurrence.meetingroom_id in busy:
+                busy[occurrence.meetingroom_id][1].append(
+                    (occurrence.from_reserve, occurrence.to_reserve)
+                )
+        for _, intervals in busy.values():
+            intervals.sort()
+        return list(busy.values())
+
+    async def get_minute_bitmaps(
+        self,
+        *,
+        room_ids: List[int],
+        first_day: date,
+        days: int,
+        session: AsyncSession,
+    ) -> np.ndarray:
+        """Packed busy minutes of the rooms by day, rooms x days x 180
+        bytes, see ``app.core.grid``.
+
+        ``room_ids`` are sorted. Days are read from the grid cache; rooms
+        missing a day are loaded for the whole window with two queries,
+        reservations and series, whatever the number of rooms.
+        """
+        day_list = [first_day + timedelta(days=day) for day in range(days)]
+        bitmaps = np.zeros(
+            (len(room_ids), days, MINUTES_IN_DAY // 8), dtype=np.uint8
         )
-        db_room_id = db_room_id.scalars().first()
-        return db_room_id
+        missing = []
+        for position, room_id in enumerate(room_ids):
+            for day_position, day in enumerate(day_list):
+                minutes = occupancy_grid.get(room_id, day)
+                if minutes is None:
+                    missing.append(position)
+                    break
+                bitmaps[position, day_position] = minutes
+        if not missing:
+            return bitmaps
+
+        missing_ids = np.array(
+            [room_ids[position] for position in missing], dtype=np.int64
+        )
+        from_reserve = datetime.combine(first_day, time())
+        to_reserve = from_reserve + timedelta(days=days)
+        bounds = await reservation_crud.get_minute_bounds(
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            session=session,
+            room_ids=missing_ids.tolist(),
+        )
+        occurrences = await reservation_series_crud.get_occurrences(
+            room_ids=missing_ids.tolist(),
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            session=session,
+        )
+        bounds = np.concatenate([bounds, bounds_array(
+            (
+                occurrence.meetingroom_id,
+                to_epoch_minutes(occurrence.from_reserve),
+                to_epoch_minutes(occurrence.to_reserve),
+            )
+            for occurrence in occurrences
+        )])
+        loaded = minute_bitmaps(
+            missing_ids, bounds, to_epoch_minutes(from_reserve), days
+        )
+        for loaded_position, position in enumerate(missing):
+            bitmaps[position] = loaded[loaded_position]
+            for day_position, day in enumerate(day_list):
+                # A copy does not keep the whole array alive.
+                occupancy_grid.set(
+                    room_ids[position], day,
+                    loaded[loaded_position, day_position].copy(),
+                )
+        return bitmaps
+
+    async def remove(
+        self,
+        db_obj,
+        session: AsyncSession,
+    ):
+        room_id = db_obj.id
+        db_obj = await super().remove(db_obj, session)
+        self.cache.clear()
+        # Reservations of the room are deleted with it.
+        occupancy_index.invalidate(room_id)
+        occupancy_grid.invalidate(room_id)
+        return db_obj
 
 
 meeting_room_crud = CRUDMeetingRoom(MeetingRoom)
@@ -1,15 +1,108 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import (AsyncIterator, Callable, Iterable, List, Optional,
+                    Sequence)
 
-from sqlalchemy import and_, select
+import numpy as np
+from sqlalchemy import (Table, exists, func, insert, literal, select,
+                        tuple_, union_all)
+from sqlalchemy.engine import Row, RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import CompoundSelect
 
+from app.core.analytics import bounds_array, epoch_minutes
+from app.core.grid import occupancy_grid
+from app.core.locks import room_lock
+from app.core.occupancy import occupancy_index
 from app.crud.base import CRUDBase
 from app.models import User
+from app.models.meeting_room import MeetingRoom
 from app.models.reservation import Reservation
+from app.models.reservation_archive import ReservationArchive
+from app.models.reservation_series import ReservationSeries
+
+# Sort key of reservation lists.
+PAGE_KEY = (Reservation.from_reserve, Reservation.id)
+# Rows fetched from the cursor at once by exports.
+EXPORT_CHUNK_SIZE = 1000
+# Live and archived reservations, see ``app.core.archive``.
+HISTORY_TABLES = (Reservation.__table__, ReservationArchive.__table__)
+
+
+def history(
+    where: Callable[[Table], Sequence] = lambda table: (),
+    after: Optional[Sequence] = None,
+    limit: Optional[int] = None,
+) -> CompoundSelect:
+    """Live and archived reservations in the order of ``PAGE_KEY``.
+
+    ``where`` gives the conditions for the columns of either table. Both
+    tables are read in the order of their indexes and merged, the page is
+    cut from the merge.
+    """
+    branches = []
+    for table in HISTORY_TABLES:
+        branch = select(*table.c).where(*where(table))
+        if after is not None:
+            branch = branch.where(
+                tuple_(table.c.from_reserve, table.c.id) > tuple_(*after)
+            )
+        branches.append(branch)
+    statement = union_all(*branches)
+    statement = statement.order_by(
+        statement.selected_columns.from_reserve,
+        statement.selected_columns.id,
+    )
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def _forget_occupancy(reservation) -> None:
+    occupancy_grid.invalidate(
+        reservation.meetingroom_id,
+        reservation.from_reserve,
+        reservation.to_reserve,
+    )
 
 
 class CRUDReservation(CRUDBase):
+    """Reservation CRUD that keeps the occupancy index and the cached
+    occupancy grid up to date."""
+
+    async def create(
+        self, obj_in, session: AsyncSession, user: Optional[User] = None
+    ):
+        db_obj = await super().create(obj_in, session, user)
+        occupancy_index.add(db_obj)
+        _forget_occupancy(db_obj)
+        return db_obj
+
+    async def update(
+        self,
+        db_obj,
+        obj_in,
+        session: AsyncSession,
+    ):
+        meetingroom_id, reservation_id = db_obj.meetingroom_id, db_obj.id
+        _forget_occupancy(db_obj)
+        db_obj = await super().update(db_obj, obj_in, session)
+        occupancy_index.discard(meetingroom_id, reservation_id)
+        occupancy_index.add(db_obj)
+        _forget_occupancy(db_obj)
+        return db_obj
+
+    async def remove(
+        self,
+        db_obj,
+        session: AsyncSession,
+    ):
+        meetingroom_id, reservation_id = db_obj.meetingroom_id, db_obj.id
+        db_obj = await super().remove(db_obj, session)
+        occupancy_index.discard(meetingroom_id, reservation_id)
+        _forget_occupancy(db_obj)
+        return db_obj
+
     async def get_reservations_at_the_same_time(
         self,
         *,
@@ -19,12 +112,14 @@ class CRUDReservation(CRUDBase):
         reservation_id: Optional[int] = None,
         session: AsyncSession
     ) -> List[Reservation]:
+        # The room is matched by equality and the end of the interval by
+        # range, so the lookup is a seek on
+        # ix_reservation_meetingroom_id_to_reserve_from_reserve; the start of
+        # the interval is checked on the same index entries.
         select_stmt = select(Reservation).where(
             Reservation.meetingroom_id == meetingroom_id,
-            and_(
-                from_reserve <= Reservation.to_reserve,
-                to_reserve >= Reservation.from_reserve,
-            ),
+            Reservation.to_reserve >= from_reserve,
+            Reservation.from_reserve <= to_reserve,
         )
         if reservation_id is not None:
             select_stmt = select_stmt.where(Reservation.id != reservation_id)
@@ -32,39 +127,313 @@ class CRUDReservation(CRUDBase):
         reservations = reservations.scalars().all()
         return reservations
 
-    async def get_future_reservations_for_room(
+    async def is_busy(
         self,
-        room_id: int,
-        session: AsyncSession,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: int,
+        reservation_id: Optional[int] = None,
+        session: AsyncSession
+    ) -> bool:
+        """Whether a reservation or the span of a series of the room
+        intersects the interval, in one query.
+
+        A series span may intersect the interval while none of its
+        occurrences do, so ``True`` calls for the precise check.
+        """
+        reservations = exists().where(
+            Reservation.meetingroom_id == meetingroom_id,
+            Reservation.to_reserve >= from_reserve,
+            Reservation.from_reserve <= to_reserve,
+        )
+        if reservation_id is not None:
+            reservations = reservations.where(Reservation.id != reservation_id)
+        return await session.scalar(select(
+            reservations | exists().where(
+                ReservationSeries.meetingroom_id == meetingroom_id,
+                ReservationSeries.last_to_reserve >= from_reserve,
+                ReservationSeries.from_reserve <= to_reserve,
+            )
+        ))
+
+    async def get_reservations_in_rooms(
+        self,
+        *,
+        room_ids: Iterable[int],
+        from_reserve: datetime,
+        to_reserve: datetime,
+        session: AsyncSession
     ) -> List[Reservation]:
+        """Reservations of the rooms intersecting the interval in one query.
+
+        The result is ordered by room and start of the reservation.
+        """
         reservations = await session.execute(
             select(Reservation).where(
-                Reservation.meetingroom_id == room_id,
-                Reservation.to_reserve > datetime.now(),
+                Reservation.meetingroom_id.in_(set(room_ids)),
+                Reservation.to_reserve >= from_reserve,
+                Reservation.from_reserve <= to_reserve,
+            ).order_by(Reservation.meetingroom_id, Reservation.from_reserve)
+        )
+        return reservations.scalars().all()
+
+    async def create_multi(
+        self,
+        objs_in,
+        session: AsyncSession,
+        user: Optional[User] = None,
+    ) -> List[Reservation]:
+        """Insert reservations with one statement and commit.
+
+        Reservations of one room must not overlap: the room and the start
+        identify a created row when the backend can not return it.
+        """
+        rows = [obj_in.dict() for obj_in in objs_in]
+        if user is not None:
+            for row in rows:
+                row["user_id"] = user.id
+        statement = insert(Reservation).values(rows)
+        if session.bind.dialect.full_returning:
+            created = await session.execute(
+                statement.returning(*Reservation.__table__.c)
             )
+        else:
+            await session.execute(statement)
+            created = await session.execute(
+                select(*Reservation.__table__.c).where(
+                    tuple_(
+                        Reservation.meetingroom_id, Reservation.from_reserve
+                    ).in_(
+                        [(row["meetingroom_id"], row["from_reserve"])
+                         for row in rows]
+                    )
+                )
+            )
+        # Plain rows are not expired by the commit.
+        created = [Reservation(**row) for row in created.mappings()]
+        await session.commit()
+        created = {
+            (reservation.meetingroom_id, reservation.from_reserve):
+                reservation
+            for reservation in created
+        }
+        created = [
+            created[row["meetingroom_id"], row["from_reserve"]]
+            for row in rows
+        ]
+        for reservation in created:
+            occupancy_index.add(reservation)
+            _forget_occupancy(reservation)
+        return created
+
+    async def create_if_free(
+        self, obj_in, session: AsyncSession, user: Optional[User] = None
+    ) -> Optional[Reservation]:
+        """Insert the reservation if its room exists and is free, and commit.
+
+        One ``INSERT ... SELECT ... WHERE EXISTS ... AND NOT EXISTS`` checks
+        the room, intersecting reservations of the room and spans of its
+        series, and inserts the row. If any check fails nothing is inserted
+        and ``None`` is returned. A series span may intersect the
+        reservation while none of the occurrences do, so the caller tells a
+        real conflict by the precise check.
+        """
+        values = obj_in.dict()
+        if user is not None:
+            values["user_id"] = user.id
+        # An untyped NULL in the select list is taken for text by
+        # PostgreSQL, omitted columns are NULL anyway.
+        values = {
+            field: value for field, value in values.items()
+            if value is not None
+        }
+        table = Reservation.__table__
+        meetingroom_id = values["meetingroom_id"]
+        from_reserve, to_reserve = values["from_reserve"], values["to_reserve"]
+        statement = insert(table).from_select(
+            list(values),
+            select(*(
+                literal(value, table.c[field].type)
+                for field, value in values.items()
+            )).where(
+                exists().where(MeetingRoom.id == meetingroom_id),
+                ~exists().where(
+                    Reservation.meetingroom_id == meetingroom_id,
+                    Reservation.to_reserve >= from_reserve,
+                    Reservation.from_reserve <= to_reserve,
+                ),
+                ~exists().where(
+                    ReservationSeries.meetingroom_id == meetingroom_id,
+                    ReservationSeries.last_to_reserve >= from_reserve,
+                    ReservationSeries.from_reserve <= to_reserve,
+                ),
+            ),
         )
-        reservations = reservations.scalars().all()
-        return reservations
+        returning = session.bind.dialect.full_returning
+        if returning:
+            statement = statement.returning(table.c.id)
+        if session.bind.dialect.name == "sqlite":
+            # A single statement is atomic under the write lock of SQLite.
+            inserted = await session.execute(statement)
+        else:
+            # Under READ COMMITTED two inserts could both see no conflict.
+            async with room_lock(session, meetingroom_id):
+                inserted = await session.execute(statement)
+        if returning:
+            reservation_id = inserted.scalar_one_or_none()
+        else:
+            reservation_id = inserted.lastrowid if inserted.rowcount else None
+        if reservation_id is None:
+            if user is not None and user in session:
+                # The user of the request is loaded in the same session,
+                # the rollback would expire it while the caller needs it.
+                session.expunge(user)
+            await session.rollback()
+            return None
+        await session.commit()
+        db_obj = Reservation(id=reservation_id, **values)
+        occupancy_index.add(db_obj)
+        _forget_occupancy(db_obj)
+        return db_obj
+
+    async def get_future_reservations_for_room(
+        self,
+        room_id: int,
+        session: AsyncSession,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        # Reservations of a room do not overlap, so they are in the same
+        # order by their end as by their start, and the page is read in the
+        # order of the room index. The rows after the cursor end after its
+        # start, which moves the seek past the previous pages.
+        to_reserve = datetime.now()
+        if after is not None:
+            to_reserve = max(to_reserve, after[0])
+        statement = select(*Reservation.__table__.c).where(
+            Reservation.meetingroom_id == room_id,
+            Reservation.to_reserve > to_reserve,
+        )
+        if after is not None:
+            statement = statement.where(tuple_(*PAGE_KEY) > tuple_(*after))
+        statement = statement.order_by(Reservation.to_reserve, *PAGE_KEY)
+        if limit is not None:
+            statement = statement.limit(limit)
+        reservations = await session.execute(statement)
+        return reservations.all()
 
     async def get_future_reservations(
         self,
         session: AsyncSession,
-    ) -> List[Reservation]:
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        # Pages are read in the order of ix_reservation_from_reserve_id from
+        # the earliest start of an actual reservation, so finished history
+        # is not read. Reservations of a room do not overlap, its first
+        # actual reservation is found with one seek of the room index.
+        now = datetime.now()
+        actual = aliased(Reservation)
+        first_actual = select(actual.from_reserve).where(
+            actual.meetingroom_id == MeetingRoom.id,
+            actual.to_reserve > now,
+        ).order_by(actual.to_reserve).limit(1).correlate(
+            MeetingRoom
+        ).scalar_subquery()
+        first_start = select(func.min(first_actual)).select_from(
+            MeetingRoom
+        ).correlate(None).scalar_subquery()
         reservations = await session.execute(
-            select(Reservation).where(
-                Reservation.to_reserve > datetime.now(),
+            self.paginate(
+                select(*Reservation.__table__.c).where(
+                    Reservation.from_reserve >= first_start,
+                    Reservation.to_reserve > now,
+                ),
+                PAGE_KEY,
+                after,
+                limit,
             )
         )
-        reservations = reservations.scalars().all()
-        return reservations
+        return reservations.all()
 
     async def get_by_user(
-        self, session: AsyncSession, user: User
-    ) -> List[Reservation]:
-        reservations = await session.execute(
-            select(Reservation).where(Reservation.user_id == user.id)
+        self,
+        session: AsyncSession,
+        user: User,
+        after: Optional[Sequence] = None,
+        limit: Optional[int] = None,
+    ) -> List[Row]:
+        reservations = await session.execute(history(
+            lambda table: (table.c.user_id == user.id,), after, limit
+        ))
+        return reservations.all()
+
+    async def get_minute_bounds(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        session: AsyncSession,
+        room_ids: Optional[Iterable[int]] = None,
+    ) -> np.ndarray:
+        """Room ids and bounds in epoch minutes of reservations in the window.
+
+        Minutes are computed by the database, so no datetimes are built for
+        the rows. Archived reservations are included. ``room_ids=None``
+        selects reservations of all rooms.
+        """
+        def where(table):
+            conditions = [
+                table.c.to_reserve > from_reserve,
+                table.c.from_reserve < to_reserve,
+            ]
+            if room_ids is not None:
+                conditions.append(table.c.meetingroom_id.in_(set(room_ids)))
+            return conditions
+
+        bounds = await session.execute(union_all(*(
+            select(
+                table.c.meetingroom_id,
+                epoch_minutes(table.c.from_reserve),
+                epoch_minutes(table.c.to_reserve),
+            ).where(*where(table))
+            for table in HISTORY_TABLES
+        )))
+        return bounds_array(bounds.all())
+
+    async def stream_rows(
+        self,
+        session: AsyncSession,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        meetingroom_id: Optional[int] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[List[RowMapping]]:
+        """Reservations starting in ``[from_reserve, to_reserve)``, in chunks.
+
+        Rows are read from a server-side cursor ``chunk_size`` at a time and
+        are not turned into ORM objects, so memory does not depend on the
+        number of rows. Archived reservations are included.
+        """
+        def where(table):
+            conditions = []
+            if from_reserve is not None:
+                conditions.append(table.c.from_reserve >= from_reserve)
+            if to_reserve is not None:
+                conditions.append(table.c.from_reserve < to_reserve)
+            if meetingroom_id is not None:
+                conditions.append(table.c.meetingroom_id == meetingroom_id)
+            return conditions
+
+        statement = history(where)
+        # Core rows ignore ``yield_per`` in SQLAlchemy 1.4: the size of a
+        # fetch is given to ``partitions`` and the cursor buffer is capped.
+        result = await session.stream(
+            statement.execution_options(max_row_buffer=chunk_size)
         )
-        return reservations.scalars().all()
+        async for rows in result.mappings().partitions(chunk_size):
+            yield rows
 
 
 reservation_crud = CRUDReservation(Reservation)
@@ -0,0 +1,138 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.grid import occupancy_grid
+from app.core.occupancy import occupancy_index
+from app.core.recurrence import expand, iter_starts
+from app.crud.base import CRUDBase
+from app.models import User
+from app.models.reservation import Reservation
+from app.models.reservation_series import ReservationSeries
+
+
+class CRUDReservationSeries(CRUDBase):
+    async def create(
+        self, obj_in, session: AsyncSession, user: Optional[User] = None
+    ):
+        obj_in_data = obj_in.dict()
+        obj_in_data["exceptions"] = [
+            exception.isoformat() for exception in obj_in.exceptions
+        ]
+        # Exceptions do not move the bound of the series.
+        *_, last_from_reserve = iter_starts(
+            obj_in.from_reserve,
+            obj_in.frequency,
+            obj_in.interval,
+            obj_in.until,
+            obj_in.count,
+        )
+        obj_in_data["last_to_reserve"] = last_from_reserve + (
+            obj_in.to_reserve - obj_in.from_reserve
+        )
+
+        if user is not None:
+            obj_in_data["user_id"] = user.id
+
+        db_obj = await self.insert(obj_in_data, session)
+        occupancy_index.invalidate(db_obj.meetingroom_id)
+        occupancy_grid.invalidate(db_obj.meetingroom_id)
+        return db_obj
+
+    async def update(
+        self,
+        db_obj,
+        obj_in,
+        session: AsyncSession,
+    ):
+        db_obj = await self.write(db_obj, {"exceptions": [
+            exception.isoformat() for exception in obj_in.exceptions
+        ]}, session)
+        occupancy_index.invalidate(db_obj.meetingroom_id)
+        occupancy_grid.invalidate(db_obj.meetingroom_id)
+        return db_obj
+
+    async def remove(
+        self,
+        db_obj,
+        session: AsyncSession,
+    ):
+        meetingroom_id = db_obj.meetingroom_id
+        db_obj = await super().remove(db_obj, session)
+        occupancy_index.invalidate(meetingroom_id)
+        occupancy_grid.invalidate(meetingroom_id)
+        return db_obj
+
+    async def get_in_rooms(
+        self,
+        *,
+        room_ids: Optional[Iterable[int]],
+        from_reserve: datetime,
+        to_reserve: datetime,
+        session: AsyncSession
+    ) -> List[ReservationSeries]:
+        """Series of the rooms whose span intersects the interval.
+
+        ``room_ids=None`` selects series of all rooms.
+        """
+        statement = select(ReservationSeries).where(
+            ReservationSeries.last_to_reserve >= from_reserve,
+            ReservationSeries.from_reserve <= to_reserve,
+        )
+        if room_ids is not None:
+            statement = statement.where(
+                ReservationSeries.meetingroom_id.in_(set(room_ids))
+            )
+        series = await session.execute(statement)
+        return series.scalars().all()
+
+    async def get_occurrences(
+        self,
+        *,
+        room_ids: Optional[Iterable[int]],
+        from_reserve: datetime,
+        to_reserve: datetime,
+        session: AsyncSession,
+        series_id: Optional[int] = None
+    ) -> List[Reservation]:
+        """Occurrences of series of the rooms intersecting the interval.
+
+        Occurrences are returned as not persisted reservations ordered by
+        room and start; the series ``series_id`` is skipped.
+        """
+        occurrences = [
+            Reservation(
+                from_reserve=start,
+                to_reserve=end,
+                meetingroom_id=series.meetingroom_id,
+                user_id=series.user_id,
+            )
+            for series in await self.get_in_rooms(
+                room_ids=room_ids,
+                from_reserve=from_reserve,
+                to_reserve=to_reserve,
+                session=session,
+            )
+            if series.id != series_id
+            for start, end in expand(series, from_reserve, to_reserve)
+        ]
+        occurrences.sort(key=lambda occurrence: (
+            occurrence.meetingroom_id, occurrence.from_reserve
+        ))
+        return occurrences
+
+    async def get_by_user(
+        self, session: AsyncSession, user: User
+    ) -> List[Row]:
+        series = await session.execute(
+            select(*ReservationSeries.__table__.c)
+            .where(ReservationSeries.user_id == user.id)
+            .order_by(ReservationSeries.from_reserve)
+        )
+        return series.all()
+
+
+reservation_series_crud = CRUDReservationSeries(ReservationSeries)
@@ -1,13 +1,48 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 from app.api.routers import main_router
+from app.core.archive import run_archiver
 from app.core.config import settings
+from app.core.events import broker
 from app.core.init_db import create_first_superuser
+from app.core.metrics import MetricsMiddleware
+from app.core.passwords import PasswordHashQueueFull, password_hasher
+from app.core.queries import QueryRecorderMiddleware
 
 app = FastAPI(title=settings.app_title)
 app.include_router(main_router)
+app.add_middleware(QueryRecorderMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHashQueueFull)
+async def password_hash_queue_full(
+        request: Request, exc: PasswordHashQueueFull
+):
+    return JSONResponse(
+        status_code=503,
+        content={'detail': 'Слишком много входов, повторите попытку позже!'},
+        headers={'Retry-After': '1'},
+    )
 
 
 @app.on_event('startup')
 async def startup():
     await create_first_superuser()
+    await broker.start()
+    if settings.archive_interval is not None:
+        app.state.archiver = asyncio.create_task(
+            run_archiver(settings.archive_interval)
+        )
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    await broker.stop()
+    password_hasher.shutdown()
+    archiver = getattr(app.state, 'archiver', None)
+    if archiver is not None:
+        archiver.cancel()
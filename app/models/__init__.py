@@ -1,3 +1,5 @@
 from .meeting_room import MeetingRoom  # noqa
 from .reservation import Reservation  # noqa
+from .reservation_archive import ReservationArchive  # noqa
+from .reservation_series import ReservationSeries  # noqa
 from .user import User  # noqa
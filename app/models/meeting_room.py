@@ -7,7 +7,17 @@ from app.core.db import Base
 class MeetingRoom(Base):
     name = Column(String(100), unique=True, nullable=False)
     description = Column(Text)
-    reservations = relationship("Reservation", cascade="delete")
+    # Reservations are deleted with the room by the database, ON DELETE
+    # CASCADE, and are not loaded to be deleted one by one.
+    reservations = relationship(
+        "Reservation", cascade="delete", passive_deletes=True
+    )
+    archived_reservations = relationship(
+        "ReservationArchive", cascade="delete", passive_deletes=True
+    )
+    reservation_series = relationship(
+        "ReservationSeries", cascade="delete", passive_deletes=True
+    )
 
     def __str__(self):
         return self.name
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
 
 from app.core.db import Base
 
@@ -6,8 +6,34 @@ from app.core.db import Base
 class Reservation(Base):
     from_reserve = Column(DateTime)
     to_reserve = Column(DateTime)
-    meetingroom_id = Column(Integer, ForeignKey("meetingroom.id"))
-    user_id = Column(Integer, ForeignKey("user.id"))
+    meetingroom_id = Column(
+        Integer, ForeignKey("meetingroom.id", ondelete="CASCADE")
+    )
+    user_id = Column(
+        Integer, ForeignKey("user.id", ondelete="SET NULL")
+    )
+
+    __table_args__ = (
+        # Overlap check and the list of room reservations: equality on the
+        # room, range on the end of the interval.
+        Index(
+            "ix_reservation_meetingroom_id_to_reserve_from_reserve",
+            "meetingroom_id",
+            "to_reserve",
+            "from_reserve",
+        ),
+        # Reservations of the user in chronological order.
+        Index(
+            "ix_reservation_user_id_from_reserve", "user_id", "from_reserve"
+        ),
+        # All actual reservations (to_reserve > now).
+        Index("ix_reservation_to_reserve", "to_reserve"),
+        # Pages of all reservations, sorted by (from_reserve, id).
+        Index("ix_reservation_from_reserve_id", "from_reserve", "id"),
+        # Ids of deleted rows are never given again: archived reservations
+        # keep their ids in ``reservation_archive``.
+        {"sqlite_autoincrement": True},
+    )
 
     def __repr__(self):
         return f"Уже забронировано с {self.from_reserve} по {self.to_reserve}"
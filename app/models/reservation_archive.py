@@ -0,0 +1,37 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from app.core.db import Base
+
+
+class ReservationArchive(Base):
+    """Finished reservation moved out of the live table.
+
+    Rows keep the columns and the id they had in ``reservation``.
+    """
+
+    __tablename__ = "reservation_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    from_reserve = Column(DateTime)
+    to_reserve = Column(DateTime)
+    meetingroom_id = Column(
+        Integer, ForeignKey("meetingroom.id", ondelete="CASCADE")
+    )
+    user_id = Column(
+        Integer, ForeignKey("user.id", ondelete="SET NULL")
+    )
+
+    __table_args__ = (
+        # History of the user, merged with the live reservations.
+        Index(
+            "ix_reservation_archive_user_id_from_reserve",
+            "user_id",
+            "from_reserve",
+        ),
+        # Exports and reports over a period.
+        Index(
+            "ix_reservation_archive_from_reserve_id", "from_reserve", "id"
+        ),
+        # Retention deletes the oldest rows first.
+        Index("ix_reservation_archive_to_reserve", "to_reserve"),
+    )
@@ -0,0 +1,45 @@
+from sqlalchemy import (JSON, Column, DateTime, ForeignKey, Index, Integer,
+                        String)
+
+from app.core.db import Base
+
+
+class ReservationSeries(Base):
+    """Recurring reservation, occurrences are expanded on demand."""
+
+    # The first occurrence.
+    from_reserve = Column(DateTime, nullable=False)
+    to_reserve = Column(DateTime, nullable=False)
+    frequency = Column(String(10), nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    until = Column(DateTime)
+    count = Column(Integer)
+    # Starts of cancelled occurrences.
+    exceptions = Column(JSON, nullable=False, default=list)
+    # End of the last occurrence, bounds the series in queries.
+    last_to_reserve = Column(DateTime, nullable=False)
+    meetingroom_id = Column(
+        Integer, ForeignKey("meetingroom.id", ondelete="CASCADE")
+    )
+    user_id = Column(
+        Integer, ForeignKey("user.id", ondelete="SET NULL")
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_reservationseries_meetingroom_id_last_to_reserve",
+            "meetingroom_id",
+            "last_to_reserve",
+        ),
+        Index(
+            "ix_reservationseries_user_id_from_reserve",
+            "user_id",
+            "from_reserve",
+        ),
+    )
+
+    def __repr__(self):
+        return (
+            f"Серия бронирований с {self.from_reserve} "
+            f"по {self.last_to_reserve}"
+        )
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class RoomUtilization(BaseModel):
+    room_id: int
+    # Share of the whole window the room is busy.
+    utilization: float
+    # Share of every hour the room is busy, 7 days from Monday x 24 hours.
+    by_hour_of_week: List[List[float]]
+
+
+class PeakHour(BaseModel):
+    weekday: int = Field(ge=0, le=6, description="0 - понедельник")
+    hour: int = Field(ge=0, le=23)
+    utilization: float
+
+
+class UtilizationReport(BaseModel):
+    # The requested window widened to whole hours.
+    from_reserve: datetime
+    to_reserve: datetime
+    rooms: List[RoomUtilization]
+    peak_hours: List[PeakHour]
+    idle_rooms: List[int]
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
@@ -25,3 +26,22 @@ class MeetingRoomDB(MeetingRoomCreate):
 
     class Config:
         orm_mode = True
+
+
+class FreeSlot(BaseModel):
+    from_reserve: datetime
+    to_reserve: datetime
+
+
+class MeetingRoomAvailability(BaseModel):
+    room: MeetingRoomDB
+    free_slots: List[FreeSlot]
+
+
+class OccupancyGrid(BaseModel):
+    from_reserve: datetime
+    to_reserve: datetime
+    slot_minutes: int
+    slots: int
+    # Base64 of the packed bits of the slots by room id.
+    rooms: Dict[int, str]
@@ -0,0 +1,26 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_ratio: Optional[float]
+
+
+class PoolStats(BaseModel):
+    pool_class: str
+    size: Optional[int]
+    checked_in: Optional[int]
+    checked_out: Optional[int]
+    overflow: Optional[int]
+    max_overflow: Optional[int]
+    timeout: Optional[float]
+    checkouts: Optional[int]
+    failed_checkouts: Optional[int]
+    mean_checkout_seconds: Optional[float]
+    max_checkout_seconds: Optional[float]
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 
 from pydantic import BaseModel, Extra, Field, root_validator, validator
 
@@ -50,3 +51,43 @@ class ReservationDB(ReservationBase):
 
     class Config:
         orm_mode = True
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class BatchMode(str, Enum):
+    # Create all reservations or none of them.
+    atomic = "atomic"
+    # Create the reservations that pass the checks, skip the rest.
+    best_effort = "best_effort"
+
+
+class BatchItemStatus(str, Enum):
+    created = "created"
+    room_not_found = "room_not_found"
+    conflict = "conflict"
+    # The item passed the checks, but the atomic batch was rejected.
+    not_created = "not_created"
+
+
+class ReservationBatchCreate(BaseModel):
+    reservations: List[ReservationCreate] = Field(min_items=1, max_items=1000)
+    mode: BatchMode = BatchMode.atomic
+
+    class Config:
+        extra = Extra.forbid
+
+
+class ReservationBatchItemResult(BaseModel):
+    index: int
+    status: BatchItemStatus
+    reservation: Optional[ReservationDB]
+    detail: Optional[str]
+
+
+class ReservationBatchResult(BaseModel):
+    created: int
+    results: List[ReservationBatchItemResult]
@@ -0,0 +1,96 @@
+from datetime import datetime
+from itertools import islice
+from typing import List, Optional
+
+from pydantic import BaseModel, Extra, Field, root_validator, validator
+
+from app.core.recurrence import (MAX_OCCURRENCES, MIN_PERIODS, Frequency,
+                                 iter_starts)
+from app.schemas.reservation import FROM_TIME, TO_TIME
+
+
+class ReservationSeriesBase(BaseModel):
+    # The first occurrence.
+    from_reserve: datetime = Field(example=FROM_TIME)
+    to_reserve: datetime = Field(example=TO_TIME)
+    frequency: Frequency
+    interval: int = Field(1, ge=1, le=365)
+    until: Optional[datetime]
+    count: Optional[int] = Field(None, ge=1, le=MAX_OCCURRENCES)
+    # Starts of cancelled occurrences.
+    exceptions: List[datetime] = []
+
+    class Config:
+        extra = Extra.forbid
+
+
+class ReservationSeriesCreate(ReservationSeriesBase):
+    meetingroom_id: int
+
+    @validator("from_reserve")
+    def check_from_reserve_later_than_now(cls, value):
+        if value <= datetime.now():
+            raise ValueError(
+                "Время начала бронирования "
+                "не может быть меньше текущего времени"
+            )
+        return value
+
+    @root_validator(skip_on_failure=True)
+    def check_series(cls, values):
+        if values["from_reserve"] >= values["to_reserve"]:
+            raise ValueError(
+                "Время начала бронирования "
+                "не может быть больше времени окончания"
+            )
+        if (values["until"] is None) == (values["count"] is None):
+            raise ValueError(
+                "Укажите либо дату окончания серии, либо число повторений"
+            )
+        if (
+            values["until"] is not None and
+            values["until"] < values["from_reserve"]
+        ):
+            raise ValueError(
+                "Дата окончания серии не может быть раньше её начала"
+            )
+        period = MIN_PERIODS[values["frequency"]] * values["interval"]
+        if values["to_reserve"] - values["from_reserve"] >= period:
+            raise ValueError(
+                "Бронирования серии не могут пересекаться между собой"
+            )
+        if values["until"] is not None:
+            occurrences = islice(iter_starts(
+                values["from_reserve"],
+                values["frequency"],
+                values["interval"],
+                until=values["until"],
+            ), MAX_OCCURRENCES + 1)
+            if len(list(occurrences)) > MAX_OCCURRENCES:
+                raise ValueError(
+                    f"Серия не может содержать больше {MAX_OCCURRENCES} "
+                    "бронирований"
+                )
+        return values
+
+
+class ReservationSeriesUpdate(BaseModel):
+    exceptions: List[datetime]
+
+    class Config:
+        extra = Extra.forbid
+
+
+class ReservationSeriesDB(ReservationSeriesBase):
+    id: int
+    meetingroom_id: int
+    user_id: Optional[int]
+    last_to_reserve: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class OccurrenceDB(BaseModel):
+    from_reserve: datetime
+    to_reserve: datetime
@@ -0,0 +1,116 @@
+"""Benchmark of the live reservation table before and after archival.
+
+A fresh SQLite file is seeded with reservations, most of them finished,
+then the size of the live table with its indexes and the latency of the
+queries serving traffic are measured before and after the finished
+reservations are moved to the archive:
+
+- the conflict check of a new reservation in a random room;
+- the first page of all actual reservations.
+
+    python -m benchmarks.archive --rooms 2000 --reservations 1000000
+
+Sizes are read from the ``dbstat`` table of SQLite, latencies are the
+median and the 99th percentile of ``--checks`` queries.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./archive.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.core.archive import archive_reservations  # noqa: E402
+from app.core.db import AsyncSessionLocal, engine  # noqa: E402
+from app.core.seed import generate, reset  # noqa: E402
+from app.crud.reservation import reservation_crud  # noqa: E402
+from app.models import Reservation  # noqa: E402
+
+LIVE_TABLE_SIZE = text(
+    "SELECT sum(pgsize) FROM dbstat WHERE name = 'reservation' "
+    "OR name LIKE 'ix_reservation\\_%' ESCAPE '\\' "
+    "AND name NOT LIKE 'ix_reservation_archive%'"
+)
+
+
+def percentiles(seconds) -> dict:
+    p50, p99 = np.percentile(np.array(seconds) * 1e6, (50, 99))
+    return {"p50_us": round(float(p50), 1), "p99_us": round(float(p99), 1)}
+
+
+async def measure(rooms: int, checks: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now()
+    conflict_checks = []
+    pages = []
+    async with AsyncSessionLocal() as session:
+        for _ in range(checks):
+            start = now + timedelta(minutes=rng.randrange(7 * 24 * 60))
+            started = time.perf_counter()
+            await reservation_crud.get_reservations_at_the_same_time(
+                from_reserve=start,
+                to_reserve=start + timedelta(hours=1),
+                meetingroom_id=rng.randint(1, rooms),
+                session=session,
+            )
+            conflict_checks.append(time.perf_counter() - started)
+        for _ in range(max(checks // 10, 1)):
+            started = time.perf_counter()
+            await reservation_crud.get_future_reservations(
+                session, limit=100
+            )
+            pages.append(time.perf_counter() - started)
+        live_rows = await session.scalar(select(func.count(Reservation.id)))
+        size = await session.scalar(LIVE_TABLE_SIZE)
+    return {
+        "live_rows": live_rows,
+        "live_table_mib": round(size / 2 ** 20, 1),
+        "conflict_check": percentiles(conflict_checks),
+        "future_page": percentiles(pages),
+    }
+
+
+async def run(args) -> dict:
+    await reset(engine)
+    await generate(
+        engine, args.rooms, args.users, args.reservations, seed=args.seed
+    )
+    before = await measure(args.rooms, args.checks, args.seed)
+    started = time.perf_counter()
+    archived = await archive_reservations()
+    archive_seconds = time.perf_counter() - started
+    async with engine.connect() as conn:
+        # Measure the tables, not the write-ahead log of the archival.
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    after = await measure(args.rooms, args.checks, args.seed)
+    await engine.dispose()
+    return {
+        "reservations": args.reservations,
+        "archived": archived["archived"],
+        "archive_seconds": round(archive_seconds, 3),
+        "before": before,
+        "after": after,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, default=1000000)
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
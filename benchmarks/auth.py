@@ -0,0 +1,70 @@
+"""Microbenchmark of per-request JWT authentication overhead.
+
+The same bearer token is read many times by the plain ``JWTStrategy``
+built for every request, as before, and by the shared caching strategy.
+The user manager is a stub that returns the user without a query, so
+only the verification of the token is measured.
+
+    python -m benchmarks.auth --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./benchmark.db")
+
+from fastapi_users.authentication import JWTStrategy  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.user import TOKEN_LIFETIME, jwt_strategy  # noqa: E402
+from app.models import User  # noqa: E402
+
+USER = User(id=1, email="bench@example.com", is_active=True)
+
+
+class StubUserManager:
+    def parse_id(self, value):
+        return int(value)
+
+    async def get(self, id):
+        return USER
+
+
+async def measure(get_strategy, token: str, requests: int) -> float:
+    user_manager = StubUserManager()
+    started = time.perf_counter()
+    for _ in range(requests):
+        user = await get_strategy().read_token(token, user_manager)
+        assert user is USER
+    return (time.perf_counter() - started) / requests
+
+
+async def run(requests: int) -> dict:
+    token = await jwt_strategy.write_token(USER)
+
+    def plain_strategy():
+        return JWTStrategy(
+            secret=settings.secret, lifetime_seconds=TOKEN_LIFETIME
+        )
+
+    before = await measure(plain_strategy, token, requests)
+    after = await measure(lambda: jwt_strategy, token, requests)
+    return {
+        "requests": requests,
+        "before_us_per_request": round(before * 1e6, 2),
+        "after_us_per_request": round(after * 1e6, 2),
+        "speedup": round(before / after, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
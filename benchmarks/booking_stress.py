@@ -0,0 +1,154 @@
+"""Stress test of concurrent bookings of the same slots.
+
+Several worker processes, each with its own engine and connection pool
+made by ``make_engine`` with the settings of the application, fire
+concurrent ``POST /reservations/`` requests for overlapping slots of a few
+rooms, as uvicorn workers would. At the end the script reports the
+throughput, the statuses of the responses and the number of overlapping
+reservation pairs in the database, which must be zero. A request failing
+in the application, e.g. on a SQLite write lock not released within
+``SQLITE_BUSY_TIMEOUT``, is counted as a 500, as a worker would answer.
+
+    python -m benchmarks.booking_stress --processes 4 --requests 1000
+
+By default a fresh SQLite file is used; pass ``--database-url`` to run
+against a server database (its tables are dropped and created again).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./booking_stress.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.db import Base, get_async_session, make_engine  # noqa: E402
+from app.core.user import current_user  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import MeetingRoom, User  # noqa: E402
+
+DOUBLE_BOOKINGS = text(
+    "SELECT count(*) FROM reservation AS a JOIN reservation AS b "
+    "ON a.meetingroom_id = b.meetingroom_id AND a.id < b.id "
+    "AND a.from_reserve <= b.to_reserve AND a.to_reserve >= b.from_reserve"
+)
+
+
+async def prepare_database(
+    database_url: str, rooms: int, users: int
+) -> None:
+    engine = make_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            MeetingRoom.__table__.insert(),
+            [{"name": f"Stress room {number}"} for number in range(rooms)],
+        )
+        # The user of every worker, foreign keys are enforced.
+        await conn.execute(
+            User.__table__.insert(),
+            [
+                {"id": user_id, "email": f"stress{user_id}@example.com",
+                 "hashed_password": ""}
+                for user_id in range(1, users + 1)
+            ],
+        )
+    await engine.dispose()
+
+
+async def fire_requests(
+    database_url: str, worker: int, requests: int, rooms: int,
+    start: datetime,
+) -> Counter:
+    engine = make_engine(database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[current_user] = lambda: User(
+        id=worker, is_active=True, is_superuser=False
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://stress",
+    ) as client:
+        responses = await asyncio.gather(*(
+            client.post("/reservations/", json={
+                # Slots shift by a minute, so most of them overlap.
+                "from_reserve": (
+                    start + timedelta(minutes=number % 50)
+                ).isoformat(),
+                "to_reserve": (
+                    start + timedelta(minutes=30 + number % 50)
+                ).isoformat(),
+                "meetingroom_id": number % rooms + 1,
+            })
+            for number in range(requests)
+        ))
+    await engine.dispose()
+    return Counter(response.status_code for response in responses)
+
+
+def worker_main(args) -> Counter:
+    return asyncio.run(fire_requests(*args))
+
+
+async def count_double_bookings(database_url: str) -> int:
+    engine = make_engine(database_url)
+    async with engine.connect() as conn:
+        double_bookings = await conn.scalar(DOUBLE_BOOKINGS)
+    await engine.dispose()
+    return double_bookings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument(
+        "--requests", type=int, default=1000, help="requests per process"
+    )
+    parser.add_argument("--rooms", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(
+        prepare_database(args.database_url, args.rooms, args.processes)
+    )
+    start = datetime.now() + timedelta(days=1)
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(worker_main, [
+            (args.database_url, worker, args.requests, args.rooms, start)
+            for worker in range(1, args.processes + 1)
+        ])
+    elapsed = time.perf_counter() - started
+
+    statuses = sum(results, Counter())
+    total = sum(statuses.values())
+    print(json.dumps({
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "statuses": {str(code): count for code, count in statuses.items()},
+        "double_bookings": asyncio.run(
+            count_double_bookings(args.database_url)
+        ),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark of the occupancy grid of meeting rooms.
+
+A fresh SQLite file is seeded with rooms and reservations, and the grid
+of all rooms is requested through the application for a day and for a
+week: the size of the response is compared with the JSON of the
+reservations of the same window, which a calendar would load without the
+grid, and the latency is measured with the grid cache empty (cold) and
+filled (warm, the median of ``--repeat`` requests).
+
+    python -m benchmarks.grid --rooms 500 --reservations 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./grid.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+import numpy as np  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.api.endpoints.reservation import reservation_fields  # noqa: E402
+from app.api.responses import encode_rows  # noqa: E402
+from app.core.db import AsyncSessionLocal, engine  # noqa: E402
+from app.core.grid import occupancy_grid  # noqa: E402
+from app.core.seed import generate, reset  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Reservation  # noqa: E402
+
+
+async def reservations_json_size(day: date, days: int) -> int:
+    from_reserve = datetime.combine(day, datetime.min.time())
+    to_reserve = from_reserve + timedelta(days=days)
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(*Reservation.__table__.c).where(
+                Reservation.to_reserve > from_reserve,
+                Reservation.from_reserve < to_reserve,
+            )
+        )).all()
+    return len(encode_rows(rows, reservation_fields))
+
+
+async def measure(client, day: date, days: int, repeat: int) -> dict:
+    params = {"day": day.isoformat(), "days": days}
+    occupancy_grid.cache.clear()
+    started = time.perf_counter()
+    response = await client.get("/meeting_rooms/grid", params=params)
+    cold = time.perf_counter() - started
+    assert response.status_code == 200, response.text
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await client.get("/meeting_rooms/grid", params=params)
+        warm.append(time.perf_counter() - started)
+    return {
+        "grid_bytes": len(response.content),
+        "reservations_json_bytes": await reservations_json_size(day, days),
+        "cold_ms": round(cold * 1e3, 1),
+        "warm_p50_ms": round(float(np.median(warm)) * 1e3, 1),
+    }
+
+
+async def run(args) -> dict:
+    await reset(engine)
+    await generate(
+        engine, args.rooms, 1, args.reservations, seed=args.seed
+    )
+    result = {"rooms": args.rooms, "reservations": args.reservations}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        for name, days in (("day", 1), ("week", 7)):
+            result[name] = await measure(
+                client, date.today(), days, args.repeat
+            )
+    await engine.dispose()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rooms", type=int, default=500)
+    parser.add_argument("--reservations", type=int, default=500000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark of list responses: ORM and pydantic against rows and orjson.
+
+Future reservations are loaded from a fresh SQLite file and rendered to a
+JSON body twice: as before, by loading ORM instances and rendering them
+the way FastAPI renders a ``response_model`` (validation, then
+``jsonable_encoder`` and ``json.dumps``), and by the read path of the list
+endpoints, plain rows encoded by orjson. Both bodies are compared.
+
+    python -m benchmarks.list_responses --rows 100000
+
+The time of each path is the best of ``--repeat`` runs, peak memory is
+traced by ``tracemalloc`` in a separate run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./list_responses.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import parse_obj_as  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import (AsyncSession,  # noqa: E402
+                                    create_async_engine)
+
+from app.api.endpoints.reservation import reservation_fields  # noqa: E402
+from app.api.responses import encode_rows  # noqa: E402
+from app.core.db import Base  # noqa: E402
+from app.crud.reservation import reservation_crud  # noqa: E402
+from app.models import MeetingRoom, Reservation  # noqa: E402
+from app.schemas.reservation import ReservationDB  # noqa: E402
+
+INSERT_CHUNK_SIZE = 50000
+
+
+async def orm_body(session: AsyncSession) -> bytes:
+    reservations = await session.execute(
+        select(Reservation).where(Reservation.to_reserve > datetime.now())
+        .order_by(Reservation.from_reserve, Reservation.id)
+    )
+    validated = parse_obj_as(
+        List[ReservationDB], reservations.scalars().all()
+    )
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+async def rows_body(session: AsyncSession) -> bytes:
+    rows = await reservation_crud.get_future_reservations(session)
+    return encode_rows(rows, reservation_fields)
+
+
+async def seed(engine, rows: int, rooms: int) -> None:
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            MeetingRoom.__table__.insert(),
+            [{"name": f"Room {number}"} for number in range(rooms)],
+        )
+        for offset in range(0, rows, INSERT_CHUNK_SIZE):
+            await conn.execute(Reservation.__table__.insert(), [
+                {
+                    "meetingroom_id": number % rooms + 1,
+                    "user_id": 1,
+                    "from_reserve": start + timedelta(hours=number // rooms),
+                    "to_reserve": start + timedelta(
+                        hours=number // rooms, minutes=30
+                    ),
+                }
+                for number in range(
+                    offset, min(offset + INSERT_CHUNK_SIZE, rows)
+                )
+            ])
+
+
+async def measure(engine, render, repeat: int):
+    best = None
+    for _ in range(repeat):
+        async with AsyncSession(engine) as session:
+            started = time.perf_counter()
+            body = await render(session)
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    async with AsyncSession(engine) as session:
+        tracemalloc.start()
+        await render(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return body, best, peak
+
+
+async def run(args) -> dict:
+    engine = create_async_engine(args.database_url)
+    await seed(engine, args.rows, args.rooms)
+    orm, orm_seconds, orm_peak = await measure(engine, orm_body, args.repeat)
+    rows, rows_seconds, rows_peak = await measure(
+        engine, rows_body, args.repeat
+    )
+    await engine.dispose()
+    return {
+        "rows": args.rows,
+        "orm_pydantic_seconds": round(orm_seconds, 3),
+        "rows_orjson_seconds": round(rows_seconds, 3),
+        "speedup": round(orm_seconds / rows_seconds, 1),
+        "orm_pydantic_peak_mib": round(orm_peak / 2 ** 20, 1),
+        "rows_orjson_peak_mib": round(rows_peak / 2 ** 20, 1),
+        "bodies_match": json.loads(orm) == json.loads(rows),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark of the fan-out of live events in one process.
+
+``--subscribers`` consumers follow one of ``--rooms`` rooms each, and
+``--events`` events are published to random rooms in bursts of
+``--burst``. A share of the consumers, ``--slow``, sleeps for
+``--slow-delay`` seconds on every event as a client on a bad network
+would. Fast consumers must receive all events of their rooms, slow ones
+are dropped once their queue is full.
+
+    python -m benchmarks.live --subscribers 10000 --events 20000
+
+Reported are the rates of events and of their deliveries to consumers,
+which run between the bursts, the latency from the publication to
+the consumer (median and 99th percentile) and the delivered and dropped
+counts of the hub.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+# No database is used, the settings require its URL.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import numpy as np  # noqa: E402
+
+from app.core.events import EventHub  # noqa: E402
+
+
+async def consume(subscription, delay: float, latencies: list) -> None:
+    while True:
+        message = await subscription.get()
+        if message is None:
+            return
+        latencies.append(time.perf_counter() - float(message))
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run(args) -> dict:
+    hub = EventHub(args.queue_size)
+    rng = random.Random(args.seed)
+    latencies = []
+    consumers = []
+    subscriptions = []
+    for number in range(args.subscribers):
+        subscription = hub.subscribe([rng.randint(1, args.rooms)])
+        subscriptions.append(subscription)
+        slow = number < args.subscribers * args.slow
+        consumers.append(asyncio.ensure_future(consume(
+            subscription.__enter__(),
+            args.slow_delay if slow else 0,
+            latencies,
+        )))
+    started = time.perf_counter()
+    for offset in range(0, args.events, args.burst):
+        for _ in range(min(args.burst, args.events - offset)):
+            hub.deliver(rng.randint(1, args.rooms), repr(time.perf_counter()))
+        # Consumers run between the bursts.
+        await asyncio.sleep(0)
+    publishing = time.perf_counter() - started
+    # Let the fast consumers drain their queues.
+    await asyncio.sleep(0.1)
+    for consumer in consumers:
+        consumer.cancel()
+    for subscription in subscriptions:
+        subscription.__exit__(None, None, None)
+    p50, p99 = np.percentile(np.array(latencies) * 1e6, (50, 99))
+    return {
+        "subscribers": args.subscribers,
+        "events": args.events,
+        "events_per_second": round(args.events / publishing),
+        "deliveries_per_second": round(hub.delivered / publishing),
+        "latency_p50_us": round(float(p50), 1),
+        "latency_p99_us": round(float(p99), 1),
+        **{
+            key: value for key, value in hub.stats().items()
+            if key != "subscribers"
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--slow", type=float, default=0.01)
+    parser.add_argument("--slow-delay", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,626 @@
+"""HTTP load benchmark of every route of the application.
+
+A fresh SQLite file is seeded with a reproducible dataset: thousands of
+rooms, a million reservations, most of them in the past, recurring
+series and users with Faker names. Concurrent ``httpx.AsyncClient``
+workers then drive all routes of ``app/api/routers.py`` in process
+through the application with its own engine, pool and real JWT
+authentication, in several workloads:
+
+- ``read``: lists, availability, the occupancy grid, reports and
+  monitoring;
+- ``write``: creation, update and deletion of reservations, series,
+  rooms and users, login and registration;
+- ``mixed``: 80% of the reads and 20% of the writes;
+- ``contention``: overlapping bookings of the same room.
+
+    python -m benchmarks.load --rooms 2000 --reservations 1000000 \\
+        --requests 2000 --concurrency 32 --output load.json
+
+The database is taken from ``DATABASE_URL``, ``./load.db`` by default; its
+tables are dropped and created again.
+
+Latency percentiles and throughput are reported per workload and per
+route template as JSON with sorted keys, so the output of two releases
+can be diffed. The same ``--seed`` gives the same dataset and the same
+sequence of requests of each worker; ids created during the run may
+differ with the order the requests complete in.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./load.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+import numpy as np  # noqa: E402
+from fastapi.routing import APIRoute  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.core.db import engine  # noqa: E402
+from app.core.seed import (FUTURE_SHARE, generate,  # noqa: E402
+                           hash_password, reservation_days, reset)
+from app.core.user import jwt_strategy  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import ReservationSeries, User  # noqa: E402
+
+ADMIN_ID = 1
+PASSWORD = "benchmark"
+WRITE_SHARE = 0.2
+PERCENTILES = (50, 95, 99)
+
+
+class Dataset:
+    """Bounds of the seeded rows and the state shared by the workers."""
+
+    def __init__(self, args, today: datetime):
+        self.rooms = args.rooms
+        self.users = args.users
+        days = reservation_days(args.reservations, args.rooms)
+        self.first_day = today - timedelta(
+            days=int(days * (1 - FUTURE_SHARE))
+        )
+        self.last_day = self.first_day + timedelta(days=days)
+        # New reservations of the run are booked after the seeded ones.
+        series_weeks = 10 * -(-args.series // args.rooms)
+        self.horizon = max(
+            self.last_day, self.first_day + timedelta(weeks=series_weeks)
+        ) + timedelta(days=1)
+        self.reservations = args.reservations
+        self.series = args.series
+        self.tokens: Dict[int, str] = {}
+        self.next_slot = 0
+        self.next_series = 0
+        self.created: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+    def user_id(self, rng: random.Random) -> int:
+        return rng.randint(ADMIN_ID + 1, ADMIN_ID + self.users)
+
+    def room_id(self, rng: random.Random) -> int:
+        return rng.randint(1, self.rooms)
+
+    def future_day(self, rng: random.Random) -> datetime:
+        today = datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        return today + timedelta(days=rng.randint(1, max(
+            (self.last_day - today).days - 1, 1
+        )))
+
+    def free_slot(self) -> Tuple[int, datetime, datetime]:
+        """A slot no other request of the run books."""
+        slot, self.next_slot = self.next_slot, self.next_slot + 1
+        index = slot // self.rooms
+        start = self.horizon + timedelta(
+            days=index // 10, hours=8 + index % 10
+        )
+        return slot % self.rooms + 1, start, start + timedelta(minutes=50)
+
+    def free_series(self) -> Tuple[int, datetime]:
+        """Room and first start of a weekly series no one else books."""
+        slot, self.next_series = self.next_series, self.next_series + 1
+        return slot % self.rooms + 1, self.horizon + timedelta(
+            weeks=4 * (slot // self.rooms), hours=20
+        )
+
+
+async def seed(dataset: Dataset, seed: int) -> None:
+    rng = random.Random(seed)
+    await reset(engine)
+    async with engine.begin() as conn:
+        await conn.execute(User.__table__.insert(), {
+            "id": ADMIN_ID,
+            "email": "admin@example.com",
+            "hashed_password": hash_password(PASSWORD),
+            "is_active": True,
+            "is_superuser": True,
+            "is_verified": True,
+        })
+    await generate(
+        engine, dataset.rooms, dataset.users, dataset.reservations,
+        PASSWORD, dataset.first_day, seed,
+    )
+    async with engine.begin() as conn:
+        # Weekly series in the evenings, clear of the seeded reservations.
+        series = []
+        for number in range(dataset.series):
+            # Series of the same room follow each other by ten weeks.
+            start = dataset.first_day + timedelta(
+                weeks=10 * (number // dataset.rooms),
+                days=rng.randrange(7),
+                hours=19,
+            )
+            series.append({
+                "meetingroom_id": number % dataset.rooms + 1,
+                "user_id": dataset.user_id(rng),
+                "from_reserve": start,
+                "to_reserve": start + timedelta(hours=1),
+                "frequency": "weekly",
+                "interval": 1,
+                "count": 10,
+                "exceptions": [],
+                "last_to_reserve": start + timedelta(weeks=9, hours=1),
+            })
+        if series:
+            await conn.execute(ReservationSeries.__table__.insert(), series)
+
+
+async def token(dataset: Dataset, user_id: int) -> str:
+    if user_id not in dataset.tokens:
+        dataset.tokens[user_id] = await jwt_strategy.write_token(
+            User(id=user_id)
+        )
+    return dataset.tokens[user_id]
+
+
+def slot_json(start: datetime, end: datetime) -> dict:
+    return {"from_reserve": start.isoformat(), "to_reserve": end.isoformat()}
+
+
+# Lists are read a page at a time, as a calendar does; without ``limit``
+# they would be returned whole.
+PAGE = {"limit": 100}
+
+
+# Every operation returns the request to make: the route template it
+# drives, the acting user (None for anonymous) and the arguments of
+# ``AsyncClient.request``. ``after`` hooks record what a request created.
+
+def get_rooms(dataset, rng):
+    return "GET /meeting_rooms/", dataset.user_id(rng), {"params": PAGE}
+
+
+def get_availability(dataset, rng):
+    start = dataset.future_day(rng) + timedelta(hours=8)
+    return "GET /meeting_rooms/availability", dataset.user_id(rng), {
+        "params": {
+            **slot_json(start, start + timedelta(hours=10)),
+            "min_duration": 60, "granularity": 30,
+        },
+    }
+
+
+def get_grid(dataset, rng):
+    return "GET /meeting_rooms/grid", dataset.user_id(rng), {"params": {
+        "day": dataset.future_day(rng).date().isoformat(),
+        "days": rng.choice((1, 7)),
+        "slot": rng.choice((15, 30)),
+    }}
+
+
+def get_room_reservations(dataset, rng):
+    return (
+        "GET /meeting_rooms/{meeting_room_id}/reservations",
+        ADMIN_ID,
+        {"path": {"meeting_room_id": dataset.room_id(rng)}, "params": PAGE},
+    )
+
+
+def get_reservations(dataset, rng):
+    return "GET /reservations/", dataset.user_id(rng), {"params": PAGE}
+
+
+def export_reservations(dataset, rng):
+    start = dataset.future_day(rng) - timedelta(days=30)
+    return "GET /reservations/export", ADMIN_ID, {"params": {
+        **slot_json(start, start + timedelta(days=30)),
+        "meetingroom_id": dataset.room_id(rng),
+    }}
+
+
+def get_my_reservations(dataset, rng):
+    return "GET /reservations/my_reservations", dataset.user_id(rng), {
+        "params": PAGE,
+    }
+
+
+def get_my_series(dataset, rng):
+    return "GET /reservation_series/my_series", dataset.user_id(rng), {}
+
+
+def get_occurrences(dataset, rng):
+    return (
+        "GET /reservation_series/{series_id}/occurrences",
+        dataset.user_id(rng),
+        {"path": {"series_id": rng.randint(1, max(dataset.series, 1))}},
+    )
+
+
+def get_utilization(dataset, rng):
+    start = dataset.future_day(rng) - timedelta(days=14)
+    return "GET /analytics/utilization", ADMIN_ID, {
+        "params": slot_json(start, start + timedelta(days=7)),
+    }
+
+
+def get_cache_stats(dataset, rng):
+    return "GET /monitoring/caches", ADMIN_ID, {}
+
+
+def get_pool_stats(dataset, rng):
+    return "GET /monitoring/pool", ADMIN_ID, {}
+
+
+def get_metrics(dataset, rng):
+    return "GET /metrics", None, {}
+
+
+def get_me(dataset, rng):
+    return "GET /users/me", dataset.user_id(rng), {}
+
+
+def get_user(dataset, rng):
+    return "GET /users/{id}", ADMIN_ID, {
+        "path": {"id": dataset.user_id(rng)}
+    }
+
+
+def create_reservation(dataset, rng):
+    room_id, start, end = dataset.free_slot()
+    return "POST /reservations/", dataset.user_id(rng), {
+        "json": {**slot_json(start, end), "meetingroom_id": room_id},
+        "after": "reservations",
+    }
+
+
+def create_batch(dataset, rng):
+    reservations = []
+    for _ in range(5):
+        room_id, start, end = dataset.free_slot()
+        reservations.append(
+            {**slot_json(start, end), "meetingroom_id": room_id}
+        )
+    return "POST /reservations/batch", dataset.user_id(rng), {
+        "json": {"reservations": reservations, "mode": "best_effort"},
+    }
+
+
+def pop_created(dataset, rng, kind) -> Tuple[int, int]:
+    """A row created by the run and its author, or a missing one."""
+    created = dataset.created[kind]
+    if not created:
+        return 0, dataset.user_id(rng)
+    return created.pop(rng.randrange(len(created)))
+
+
+def update_reservation(dataset, rng):
+    reservation_id, user_id = pop_created(dataset, rng, "reservations")
+    _, start, end = dataset.free_slot()
+    return "PATCH /reservations/{reservation_id}", user_id, {
+        "path": {"reservation_id": reservation_id},
+        "json": slot_json(start, end),
+        "after": "reservations",
+    }
+
+
+def delete_reservation(dataset, rng):
+    reservation_id, user_id = pop_created(dataset, rng, "reservations")
+    return "DELETE /reservations/{reservation_id}", user_id, {
+        "path": {"reservation_id": reservation_id},
+    }
+
+
+def create_series(dataset, rng):
+    room_id, start = dataset.free_series()
+    return "POST /reservation_series/", dataset.user_id(rng), {
+        "json": {
+            **slot_json(start, start + timedelta(hours=1)),
+            "frequency": "weekly", "count": 4, "meetingroom_id": room_id,
+        },
+        "after": "series",
+    }
+
+
+def update_series(dataset, rng):
+    series_id, user_id = pop_created(dataset, rng, "series")
+    return "PATCH /reservation_series/{series_id}", user_id, {
+        "path": {"series_id": series_id},
+        "json": {"exceptions": []},
+        "after": "series",
+    }
+
+
+def delete_series(dataset, rng):
+    series_id, user_id = pop_created(dataset, rng, "series")
+    return "DELETE /reservation_series/{series_id}", user_id, {
+        "path": {"series_id": series_id},
+    }
+
+
+def create_room(dataset, rng):
+    return "POST /meeting_rooms/", ADMIN_ID, {
+        "json": {"name": f"Room {uuid.UUID(int=rng.getrandbits(128))}"},
+        "after": "rooms",
+    }
+
+
+def update_room(dataset, rng):
+    return "PATCH /meeting_rooms/{meeting_room_id}", ADMIN_ID, {
+        "path": {"meeting_room_id": dataset.room_id(rng)},
+        "json": {"description": f"Updated {rng.getrandbits(32)}"},
+    }
+
+
+def delete_room(dataset, rng):
+    room_id, _ = pop_created(dataset, rng, "rooms")
+    return "DELETE /meeting_rooms/{meeting_room_id}", ADMIN_ID, {
+        "path": {"meeting_room_id": room_id},
+    }
+
+
+def register(dataset, rng):
+    return "POST /auth/register", None, {"json": {
+        "email": f"{uuid.UUID(int=rng.getrandbits(128)).hex}@example.com",
+        "password": PASSWORD,
+    }, "after": "users"}
+
+
+def login(dataset, rng):
+    return "POST /auth/jwt/login", None, {"data": {
+        "username": "admin@example.com", "password": PASSWORD,
+    }}
+
+
+def logout(dataset, rng):
+    return "POST /auth/jwt/logout", dataset.user_id(rng), {}
+
+
+def update_me(dataset, rng):
+    return "PATCH /users/me", dataset.user_id(rng), {"json": {}}
+
+
+def update_user(dataset, rng):
+    return "PATCH /users/{id}", ADMIN_ID, {
+        "path": {"id": dataset.user_id(rng)}, "json": {"is_verified": True},
+    }
+
+
+def delete_user(dataset, rng):
+    user_id, _ = pop_created(dataset, rng, "users")
+    return "DELETE /users/{id}", ADMIN_ID, {"path": {"id": user_id}}
+
+
+def contended_reservation(dataset, rng):
+    # Slots shift by ten minutes, so most of them overlap.
+    start = dataset.horizon + timedelta(minutes=10 * rng.randrange(12))
+    return "POST /reservations/", dataset.user_id(rng), {
+        "json": {
+            **slot_json(start, start + timedelta(hours=1)),
+            "meetingroom_id": 1,
+        },
+    }
+
+
+def contended_series(dataset, rng):
+    start = dataset.horizon + timedelta(minutes=10 * rng.randrange(12))
+    return "POST /reservation_series/", dataset.user_id(rng), {"json": {
+        **slot_json(start, start + timedelta(hours=1)),
+        "frequency": "daily", "count": 5, "meetingroom_id": 1,
+    }}
+
+
+def contended_room_reservations(dataset, rng):
+    return (
+        "GET /meeting_rooms/{meeting_room_id}/reservations",
+        ADMIN_ID,
+        {"path": {"meeting_room_id": 1}, "params": PAGE},
+    )
+
+
+Operation = Callable[[Dataset, random.Random], Tuple[str, Optional[int], dict]]
+
+READS: Dict[Operation, int] = {
+    get_rooms: 10,
+    get_availability: 3,
+    get_grid: 3,
+    get_room_reservations: 10,
+    get_reservations: 5,
+    export_reservations: 1,
+    get_my_reservations: 10,
+    get_my_series: 5,
+    get_occurrences: 5,
+    get_utilization: 1,
+    get_cache_stats: 1,
+    get_pool_stats: 1,
+    get_metrics: 2,
+    get_me: 5,
+    get_user: 2,
+}
+WRITES: Dict[Operation, int] = {
+    create_reservation: 10,
+    create_batch: 2,
+    update_reservation: 4,
+    delete_reservation: 4,
+    create_series: 3,
+    update_series: 1,
+    delete_series: 1,
+    create_room: 1,
+    update_room: 1,
+    delete_room: 1,
+    register: 1,
+    login: 1,
+    logout: 1,
+    update_me: 1,
+    update_user: 1,
+    delete_user: 1,
+}
+WORKLOADS: Dict[str, List[Tuple[float, Dict[Operation, int]]]] = {
+    "read": [(1, READS)],
+    "write": [(1, WRITES)],
+    "mixed": [(1 - WRITE_SHARE, READS), (WRITE_SHARE, WRITES)],
+    "contention": [(1, {
+        contended_reservation: 6,
+        contended_series: 1,
+        contended_room_reservations: 3,
+    })],
+}
+
+
+def choose(rng: random.Random, workload: str) -> Operation:
+    shares = WORKLOADS[workload]
+    _, operations = rng.choices(shares, [share for share, _ in shares])[0]
+    return rng.choices(list(operations), list(operations.values()))[0]
+
+
+def covered_routes() -> set:
+    """Route templates driven by the workloads."""
+    dataset = Dataset(argparse.Namespace(
+        rooms=1, users=1, reservations=1, series=1
+    ), datetime.now())
+    return {
+        operation(dataset, random.Random(0))[0]
+        for shares in WORKLOADS.values()
+        for _, operations in shares
+        for operation in operations
+    }
+
+
+def app_routes() -> set:
+    return {
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+
+
+async def worker(
+    client: AsyncClient, dataset: Dataset, workload: str,
+    rng: random.Random, requests: int, results: list,
+) -> None:
+    for _ in range(requests):
+        route, user_id, kwargs = choose(rng, workload)(dataset, rng)
+        method, template = route.split(" ", 1)
+        after = kwargs.pop("after", None)
+        url = template.format(**kwargs.pop("path", {}))
+        headers = {}
+        if user_id is not None:
+            bearer = await token(dataset, user_id)
+            headers["Authorization"] = f"Bearer {bearer}"
+        started = time.perf_counter()
+        response = await client.request(
+            method, url, headers=headers, **kwargs
+        )
+        results.append(
+            (route, time.perf_counter() - started, response.status_code)
+        )
+        if after is not None and response.status_code in (200, 201):
+            dataset.created[after].append((response.json()["id"], user_id))
+
+
+def summarize(latencies: List[float], statuses: Counter, seconds: float):
+    milliseconds = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / seconds, 1),
+        "statuses": {str(code): count for code, count in statuses.items()},
+        **{
+            f"p{percentile}_ms": round(float(value), 2)
+            for percentile, value in zip(
+                PERCENTILES, np.percentile(milliseconds, PERCENTILES)
+            )
+        },
+    }
+
+
+async def run_workload(
+    dataset: Dataset, workload: str, args,
+) -> dict:
+    results: list = []
+    per_worker = -(-args.requests // args.concurrency)
+    # Errors of the application are reported as 500, not raised.
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(
+        transport=transport, base_url="http://load"
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(
+                client, dataset, workload,
+                random.Random(f"{args.seed}-{workload}-{number}"),
+                per_worker, results,
+            )
+            for number in range(args.concurrency)
+        ))
+        seconds = time.perf_counter() - started
+    by_route = defaultdict(list)
+    for route, latency, status in results:
+        by_route[route].append((latency, status))
+    return {
+        **summarize(
+            [latency for _, latency, _ in results],
+            Counter(status for _, _, status in results),
+            seconds,
+        ),
+        "seconds": round(seconds, 3),
+        "routes": {
+            route: summarize(
+                [latency for latency, _ in measured],
+                Counter(status for _, status in measured),
+                seconds,
+            )
+            for route, measured in by_route.items()
+        },
+    }
+
+
+async def run(args) -> dict:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    dataset = Dataset(args, today)
+    started = time.perf_counter()
+    await seed(dataset, args.seed)
+    seed_seconds = time.perf_counter() - started
+    workloads = {}
+    for workload in args.workloads:
+        workloads[workload] = await run_workload(dataset, workload, args)
+    await engine.dispose()
+    return {
+        "config": {
+            "rooms": args.rooms,
+            "users": args.users,
+            "reservations": args.reservations,
+            "series": args.series,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "seed_seconds": round(seed_seconds, 3),
+        "routes_not_covered": sorted(app_routes() - covered_routes()),
+        "workloads": workloads,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--reservations", type=int, default=1000000)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="requests per workload"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--workloads", nargs="+", choices=list(WORKLOADS),
+        default=list(WORKLOADS),
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this file")
+    args = parser.parse_args()
+    report = json.dumps(asyncio.run(run(args)), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Latency of reads during a login storm.
+
+A fresh SQLite file is seeded with rooms and users, then ``--readers``
+clients request ``GET /meeting_rooms/`` in a loop while ``--logins``
+logins are sent ``--concurrency`` at a time, as at the start of a working
+day. The storm runs twice in process through the application: with the
+passwords verified on the event loop, as fastapi-users does, and in the
+thread pool of ``password_hasher``.
+
+    python -m benchmarks.login_storm --logins 60 --concurrency 20
+
+Reported are the percentiles of the reads without logins and during each
+storm, the duration of the storm and the logins answered with 503 by the
+full queue of the pool.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./login_storm.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+import numpy as np  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.core.db import engine  # noqa: E402
+from app.core.passwords import password_hasher  # noqa: E402
+from app.core.seed import DEFAULT_PASSWORD, generate, reset  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import User  # noqa: E402
+
+PERCENTILES = (50, 99)
+
+
+async def on_event_loop(function, *args):
+    return function(*args)
+
+
+async def read(client, stop: asyncio.Event, latencies: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/meeting_rooms/")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+
+
+async def login(client, emails, statuses: Counter) -> None:
+    for email in emails:
+        response = await client.post("/auth/jwt/login", data={
+            "username": email, "password": DEFAULT_PASSWORD,
+        })
+        statuses[response.status_code] += 1
+
+
+def percentiles(latencies: list) -> dict:
+    return {
+        f"p{percentile}_ms": round(float(value) * 1e3, 1)
+        for percentile, value in zip(
+            PERCENTILES, np.percentile(latencies, PERCENTILES)
+        )
+    }
+
+
+async def storm(client, emails, args) -> dict:
+    stop = asyncio.Event()
+    latencies = []
+    statuses = Counter()
+    readers = [
+        asyncio.ensure_future(read(client, stop, latencies))
+        for _ in range(args.readers)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        login(client, emails[number::args.concurrency], statuses)
+        for number in range(args.concurrency)
+    ))
+    duration = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*readers)
+    return {
+        **percentiles(latencies),
+        "storm_seconds": round(duration, 1),
+        "logins": statuses[200],
+        "rejected": statuses[503],
+    }
+
+
+async def run(args) -> dict:
+    await reset(engine)
+    await generate(engine, args.rooms, args.logins, 0, seed=args.seed)
+    async with engine.connect() as conn:
+        emails = (await conn.scalars(select(User.email))).all()
+    result = {
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "workers": password_hasher.workers,
+        "queue": password_hasher.queue_size,
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        stop = asyncio.Event()
+        latencies = []
+        readers = [
+            asyncio.ensure_future(read(client, stop, latencies))
+            for _ in range(args.readers)
+        ]
+        await asyncio.sleep(args.idle)
+        stop.set()
+        await asyncio.gather(*readers)
+        result["idle"] = percentiles(latencies)
+
+        run_in_pool = password_hasher._run
+        password_hasher._run = on_event_loop
+        try:
+            result["event_loop"] = await storm(client, emails, args)
+        finally:
+            password_hasher._run = run_in_pool
+        result["thread_pool"] = await storm(client, emails, args)
+    password_hasher.shutdown()
+    await engine.dispose()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--idle", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
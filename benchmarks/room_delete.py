@@ -0,0 +1,97 @@
+"""Benchmark of the deletion of a room with a long reservation history.
+
+A fresh SQLite file is seeded with one room holding ``--reservations``
+reservations, and the room is deleted twice, from a fresh seed each time:
+
+- as before, by loading the reservations of the room into the session and
+  deleting them by primary key, which is what the ORM cascade did;
+- by the endpoint code, ``meeting_room_crud.remove``: the room row is
+  deleted and the database removes the reservations, ON DELETE CASCADE.
+
+    python -m benchmarks.room_delete --reservations 500000
+
+The write lock of SQLite is held for the whole deletion. Peak memory is
+traced by ``tracemalloc`` in a separate run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./room_delete.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.core.db import AsyncSessionLocal, engine  # noqa: E402
+from app.core.seed import generate, reset  # noqa: E402
+from app.crud.meeting_room import meeting_room_crud  # noqa: E402
+from app.models import (MeetingRoom, Reservation,  # noqa: E402
+                        ReservationArchive, ReservationSeries)
+
+ROOM_ID = 1
+
+
+async def delete_loaded(room: MeetingRoom, session: AsyncSession) -> None:
+    for model in (Reservation, ReservationArchive, ReservationSeries):
+        rows = await session.scalars(
+            select(model).where(model.meetingroom_id == room.id)
+        )
+        for row in rows.all():
+            await session.delete(row)
+    await session.delete(room)
+    await session.commit()
+
+
+async def delete_cascade(room: MeetingRoom, session: AsyncSession) -> None:
+    await meeting_room_crud.remove(room, session)
+
+
+async def measure(delete, reservations: int, traced: bool) -> float:
+    await reset(engine)
+    await generate(
+        engine, 1, 1, reservations, first_day=datetime(2000, 1, 3)
+    )
+    async with AsyncSessionLocal() as session:
+        room = await session.get(MeetingRoom, ROOM_ID)
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter()
+        await delete(room, session)
+        elapsed = time.perf_counter() - started
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        left = await session.scalar(select(func.count(Reservation.id)))
+    assert left == 0, f"{left} reservations of the deleted room are left"
+    return peak if traced else elapsed
+
+
+async def run(args) -> dict:
+    result = {"reservations": args.reservations}
+    for name, delete in (("orm", delete_loaded), ("cascade", delete_cascade)):
+        seconds = await measure(delete, args.reservations, traced=False)
+        peak = await measure(delete, args.reservations, traced=True)
+        result[f"{name}_seconds"] = round(seconds, 3)
+        result[f"{name}_peak_mib"] = round(peak / 2 ** 20, 1)
+    result["speedup"] = round(
+        result["orm_seconds"] / result["cascade_seconds"], 1
+    )
+    await engine.dispose()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reservations", type=int, default=500000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark of the utilization report on synthetic reservations.
+
+Random reservations of many rooms over a quarter are bucketed into hours
+of the week twice: by the vectorized ``app.core.analytics.utilization``
+and by a plain Python loop over reservations and their hours, the way the
+report would be written without NumPy. The loop runs on a sample of the
+rows and its time is scaled to all of them. The results of both are
+compared on the sample.
+
+    python -m benchmarks.utilization --rows 2000000 --rooms 200
+
+With ``--database`` the rows are also written to a fresh SQLite file and
+the time of loading them back as epoch minutes is reported.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///./utilization.db"
+
+os.environ.setdefault("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+import numpy as np  # noqa: E402
+from sqlalchemy.ext.asyncio import (AsyncSession,  # noqa: E402
+                                    create_async_engine)
+
+from app.core.analytics import (HOURS_IN_WEEK,  # noqa: E402
+                                to_epoch_minutes, utilization)
+from app.core.db import Base  # noqa: E402
+from app.crud.reservation import reservation_crud  # noqa: E402
+from app.models import MeetingRoom, Reservation  # noqa: E402
+
+# Monday.
+START = datetime(2030, 1, 7)
+INSERT_CHUNK_SIZE = 50000
+
+
+def generate(rows: int, rooms: int, days: int, seed: int) -> np.ndarray:
+    """Rows of room id, start and end in epoch minutes."""
+    rng = np.random.default_rng(seed)
+    starts = to_epoch_minutes(START) + rng.integers(
+        0, days * 24 * 60, rows, dtype=np.int64
+    )
+    return np.column_stack([
+        rng.integers(1, rooms + 1, rows, dtype=np.int64),
+        starts,
+        starts + rng.integers(15, 4 * 60, rows, dtype=np.int64),
+    ])
+
+
+def loop_utilization(room_ids, bounds, from_reserve, to_reserve):
+    """The report written with Python loops over reservations."""
+    window_from = to_epoch_minutes(from_reserve)
+    window_to = to_epoch_minutes(to_reserve)
+    positions = {room_id: position for position, room_id in enumerate(
+        room_ids
+    )}
+    minutes = [[0] * HOURS_IN_WEEK for _ in room_ids]
+    hour_counts = [0] * HOURS_IN_WEEK
+    first_hour = from_reserve.weekday() * 24 + from_reserve.hour
+    for hour in range((window_to - window_from) // 60):
+        hour_counts[(first_hour + hour) % HOURS_IN_WEEK] += 1
+    for room_id, start, end in bounds:
+        position = positions.get(room_id)
+        if position is None:
+            continue
+        start, end = max(start, window_from), min(end, window_to)
+        while start < end:
+            hour = (start - window_from) // 60
+            hour_end = min(end, window_from + (hour + 1) * 60)
+            minutes[position][(first_hour + hour) % HOURS_IN_WEEK] += (
+                hour_end - start
+            )
+            start = hour_end
+    return [
+        [
+            value / (60 * count) if count else 0.0
+            for value, count in zip(room_minutes, hour_counts)
+        ]
+        for room_minutes in minutes
+    ]
+
+
+async def load_from_database(
+    database_url: str, bounds: np.ndarray, rooms: int,
+    from_reserve: datetime, to_reserve: datetime,
+) -> float:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            MeetingRoom.__table__.insert(),
+            [{"name": f"Room {number}"} for number in range(rooms)],
+        )
+        epoch = datetime(1970, 1, 1)
+        for offset in range(0, len(bounds), INSERT_CHUNK_SIZE):
+            await conn.execute(Reservation.__table__.insert(), [
+                {
+                    "meetingroom_id": room_id,
+                    "from_reserve": epoch + timedelta(minutes=start),
+                    "to_reserve": epoch + timedelta(minutes=end),
+                }
+                for room_id, start, end in bounds[
+                    offset:offset + INSERT_CHUNK_SIZE
+                ].tolist()
+            ])
+    async with AsyncSession(engine) as session:
+        started = time.perf_counter()
+        loaded = await reservation_crud.get_minute_bounds(
+            from_reserve=from_reserve, to_reserve=to_reserve, session=session
+        )
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+    assert len(loaded) == len(bounds)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument(
+        "--loop-rows", type=int, default=100000,
+        help="rows of the sample run by the Python loop",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database", action="store_true",
+        help="time loading of the rows from a SQLite database as well",
+    )
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    args = parser.parse_args()
+
+    bounds = generate(args.rows, args.rooms, args.days, args.seed)
+    room_ids = np.arange(1, args.rooms + 1)
+    from_reserve = START
+    to_reserve = START + timedelta(days=args.days)
+
+    started = time.perf_counter()
+    utilization(room_ids, bounds, from_reserve, to_reserve)
+    vectorized = time.perf_counter() - started
+
+    sample = bounds[:args.loop_rows]
+    started = time.perf_counter()
+    expected = loop_utilization(
+        room_ids.tolist(), sample.tolist(), from_reserve, to_reserve
+    )
+    loop = (time.perf_counter() - started) * len(bounds) / len(sample)
+    report = utilization(room_ids, sample, from_reserve, to_reserve)
+
+    result = {
+        "rows": args.rows,
+        "rooms": args.rooms,
+        "days": args.days,
+        "vectorized_seconds": round(vectorized, 3),
+        "loop_seconds_estimated": round(loop, 3),
+        "speedup": round(loop / vectorized, 1),
+        "results_match": bool(np.allclose(report.by_hour_of_week, expected)),
+    }
+    if args.database:
+        result["database_load_seconds"] = round(asyncio.run(
+            load_from_database(
+                args.database_url, bounds, args.rooms,
+                from_reserve, to_reserve,
+            )
+        ), 3)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
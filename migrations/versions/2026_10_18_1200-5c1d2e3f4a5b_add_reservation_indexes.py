@@ -0,0 +1,47 @@
+"""add reservation indexes
+
+Revision ID: 5c1d2e3f4a5b
+Revises: 3151c900518d
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1d2e3f4a5b'
+down_revision = '3151c900518d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_reservation_meetingroom_id_to_reserve_from_reserve',
+        'reservation',
+        ['meetingroom_id', 'to_reserve', 'from_reserve'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_reservation_user_id_from_reserve',
+        'reservation',
+        ['user_id', 'from_reserve'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_reservation_to_reserve',
+        'reservation',
+        ['to_reserve'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservation_to_reserve', table_name='reservation')
+    op.drop_index(
+        'ix_reservation_user_id_from_reserve', table_name='reservation'
+    )
+    op.drop_index(
+        'ix_reservation_meetingroom_id_to_reserve_from_reserve',
+        table_name='reservation',
+    )
@@ -0,0 +1,59 @@
+"""add reservation series model
+
+Revision ID: 7d2e3f4a5b6c
+Revises: 5c1d2e3f4a5b
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e3f4a5b6c'
+down_revision = '5c1d2e3f4a5b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('reservationseries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('from_reserve', sa.DateTime(), nullable=False),
+    sa.Column('to_reserve', sa.DateTime(), nullable=False),
+    sa.Column('frequency', sa.String(length=10), nullable=False),
+    sa.Column('interval', sa.Integer(), nullable=False),
+    sa.Column('until', sa.DateTime(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('exceptions', sa.JSON(), nullable=False),
+    sa.Column('last_to_reserve', sa.DateTime(), nullable=False),
+    sa.Column('meetingroom_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['meetingroom_id'], ['meetingroom.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_reservationseries_meetingroom_id_last_to_reserve',
+        'reservationseries',
+        ['meetingroom_id', 'last_to_reserve'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_reservationseries_user_id_from_reserve',
+        'reservationseries',
+        ['user_id', 'from_reserve'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_reservationseries_user_id_from_reserve',
+        table_name='reservationseries',
+    )
+    op.drop_index(
+        'ix_reservationseries_meetingroom_id_last_to_reserve',
+        table_name='reservationseries',
+    )
+    op.drop_table('reservationseries')
@@ -0,0 +1,28 @@
+"""add reservation page index
+
+Revision ID: 9e3f4a5b6c7d
+Revises: 7d2e3f4a5b6c
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3f4a5b6c7d'
+down_revision = '7d2e3f4a5b6c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_reservation_from_reserve_id',
+        'reservation',
+        ['from_reserve', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservation_from_reserve_id', table_name='reservation')
@@ -0,0 +1,63 @@
+"""add reservation archive
+
+Revision ID: a1b2c3d4e5f6
+Revises: 9e3f4a5b6c7d
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1b2c3d4e5f6'
+down_revision = '9e3f4a5b6c7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('reservation_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('from_reserve', sa.DateTime(), nullable=True),
+    sa.Column('to_reserve', sa.DateTime(), nullable=True),
+    sa.Column('meetingroom_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['meetingroom_id'], ['meetingroom.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_reservation_archive_user_id_from_reserve',
+        'reservation_archive',
+        ['user_id', 'from_reserve'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_reservation_archive_from_reserve_id',
+        'reservation_archive',
+        ['from_reserve', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_reservation_archive_to_reserve',
+        'reservation_archive',
+        ['to_reserve'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_reservation_archive_to_reserve',
+        table_name='reservation_archive',
+    )
+    op.drop_index(
+        'ix_reservation_archive_from_reserve_id',
+        table_name='reservation_archive',
+    )
+    op.drop_index(
+        'ix_reservation_archive_user_id_from_reserve',
+        table_name='reservation_archive',
+    )
+    op.drop_table('reservation_archive')
@@ -0,0 +1,55 @@
+"""cascade room reservations
+
+Revision ID: b2c3d4e5f6a7
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c3d4e5f6a7'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+TABLES = ('reservation', 'reservationseries', 'reservation_archive')
+# Names of the unnamed foreign keys reflected by a batch on SQLite.
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def replace_foreign_keys(table, room_ondelete, user_ondelete) -> None:
+    foreign_keys = {
+        foreign_key['constrained_columns'][0]: foreign_key['name']
+        for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table)
+    }
+    with op.batch_alter_table(
+        table, naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        for column, referred, ondelete in (
+            ('meetingroom_id', 'meetingroom', room_ondelete),
+            ('user_id', 'user', user_ondelete),
+        ):
+            name = (
+                foreign_keys.get(column) or
+                f'fk_{table}_{column}_{referred}'
+            )
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                name, referred, [column], ['id'], ondelete=ondelete,
+            )
+
+
+def upgrade() -> None:
+    # Reservations of a deleted user stay, without the user.
+    for table in TABLES:
+        replace_foreign_keys(table, 'CASCADE', 'SET NULL')
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        replace_foreign_keys(table, None, None)
@@ -0,0 +1,54 @@
+"""reservation autoincrement
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = 'b2c3d4e5f6a7'
+branch_labels = None
+depends_on = None
+
+# Names of the unnamed foreign keys reflected by a batch on SQLite.
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def recreate_reservation(autoincrement) -> None:
+    with op.batch_alter_table(
+        'reservation',
+        recreate='always',
+        naming_convention=NAMING_CONVENTION,
+        table_kwargs={'sqlite_autoincrement': autoincrement},
+    ):
+        pass
+
+
+def upgrade() -> None:
+    # Server databases take ids from a sequence and never give them again.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    recreate_reservation(True)
+    # Ids of archived rows are above the live ones if archival already
+    # took the row with the largest id.
+    op.execute(sa.text(
+        "DELETE FROM sqlite_sequence WHERE name = 'reservation'"
+    ))
+    op.execute(sa.text(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'reservation', "
+        "max(coalesce((SELECT max(id) FROM reservation), 0), "
+        "coalesce((SELECT max(id) FROM reservation_archive), 0))"
+    ))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    recreate_reservation(False)
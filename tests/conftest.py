@@ -40,6 +40,9 @@ except (NameError, ImportError):
     )
 
 
+from app.core.cache import caches
+from app.core.occupancy import occupancy_index
+
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
 pytest_plugins = [
@@ -72,6 +75,14 @@ async def init_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    yield
+    occupancy_index.invalidate()
+    for cache in caches.values():
+        cache.clear()
+
+
 @pytest.fixture
 def mixer():
     mixer_engine = create_engine(f'sqlite:///{str(TEST_DB)}')
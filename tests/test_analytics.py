@@ -0,0 +1,122 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.analytics import (HOURS_IN_WEEK, to_epoch_minutes,
+                                utilization)
+
+# Понедельник.
+START = datetime(2030, 1, 7, 0, 0)
+
+
+def naive_utilization(room_ids, reservations, from_reserve, to_reserve):
+    """Поминутный подсчёт занятости циклами для сверки."""
+    hours = int((to_reserve - from_reserve).total_seconds()) // 3600
+    minutes = {room_id: [0] * HOURS_IN_WEEK for room_id in room_ids}
+    hour_counts = [0] * HOURS_IN_WEEK
+    for hour in range(hours):
+        hour_of_week = from_reserve.weekday() * 24 + from_reserve.hour + hour
+        hour_counts[hour_of_week % HOURS_IN_WEEK] += 1
+    for room_id, start, end in reservations:
+        if room_id not in minutes:
+            continue
+        minute = max(start, from_reserve)
+        while minute < min(end, to_reserve):
+            hour_of_week = minute.weekday() * 24 + minute.hour
+            minutes[room_id][hour_of_week] += 1
+            minute += timedelta(minutes=1)
+    return [
+        [
+            value / (60 * count) if count else 0.0
+            for value, count in zip(minutes[room_id], hour_counts)
+        ]
+        for room_id in room_ids
+    ]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_utilization_matches_naive_count(seed):
+    """Векторный подсчёт совпадает с поминутным подсчётом циклами"""
+    rng = random.Random(seed)
+    room_ids = [1, 3, 4]
+    from_reserve = START + timedelta(hours=rng.randrange(24))
+    to_reserve = from_reserve + timedelta(hours=rng.randrange(24, 24 * 10))
+    reservations = []
+    for _ in range(200):
+        start = START + timedelta(
+            minutes=rng.randrange(-60 * 24, 60 * 24 * 12)
+        )
+        reservations.append((
+            # Переговорки 2 нет среди переданных, её брони не учитываются.
+            rng.choice([1, 2, 3, 4]),
+            start,
+            start + timedelta(minutes=rng.randrange(1, 60 * 5)),
+        ))
+
+    report = utilization(
+        np.array(room_ids),
+        np.array([
+            (room_id, to_epoch_minutes(start), to_epoch_minutes(end))
+            for room_id, start, end in reservations
+        ]),
+        from_reserve,
+        to_reserve,
+    )
+    expected = naive_utilization(
+        room_ids, reservations, from_reserve, to_reserve
+    )
+    assert np.allclose(report.by_hour_of_week, expected)
+    assert report.by_hour_of_week.shape == (len(room_ids), HOURS_IN_WEEK)
+
+
+def test_get_utilization(superuser_client, mixer):
+    """Отчёт о загрузке учитывает брони и серии, находит пиковые часы и
+    простаивающие переговорки"""
+    rooms = [
+        mixer.blend('app.models.meeting_room.MeetingRoom', name=f'Room {n}')
+        for n in range(3)
+    ]
+    start = START + timedelta(weeks=1)
+    mixer.blend(
+        'app.models.reservation.Reservation',
+        from_reserve=start + timedelta(hours=10),
+        to_reserve=start + timedelta(hours=11, minutes=30),
+        meetingroom_id=rooms[0].id,
+    )
+    mixer.blend(
+        'app.models.reservation_series.ReservationSeries',
+        from_reserve=start + timedelta(hours=10),
+        to_reserve=start + timedelta(hours=11),
+        frequency='daily',
+        interval=1,
+        count=2,
+        exceptions=[],
+        last_to_reserve=start + timedelta(days=1, hours=11),
+        meetingroom_id=rooms[1].id,
+    )
+
+    response = superuser_client.get('/analytics/utilization', params={
+        'from_reserve': start.isoformat(),
+        'to_reserve': (start + timedelta(weeks=1)).isoformat(),
+        'peaks': 2,
+        'idle_threshold': 0.005,
+    })
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert [room['room_id'] for room in data['rooms']] == [
+        room.id for room in rooms
+    ]
+    monday = data['rooms'][0]['by_hour_of_week'][0]
+    assert monday[10:12] == [1.0, 0.5] and sum(monday) == 1.5
+    tuesday = data['rooms'][1]['by_hour_of_week'][1]
+    assert tuesday[10] == 1.0, 'Вхождения серий должны учитываться'
+    assert data['peak_hours'] == [
+        {'weekday': 0, 'hour': 10, 'utilization': round(2 / 3, 4)},
+        {'weekday': 1, 'hour': 10, 'utilization': round(1 / 3, 4)},
+    ]
+    assert data['idle_rooms'] == [rooms[2].id], (
+        'Переговорки с занятостью ниже порога должны считаться '
+        'простаивающими'
+    )
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.archive import archive_reservations
+from app.core.config import settings
+from app.models import Reservation, ReservationArchive
+from conftest import TestingSessionLocal
+
+NOW = datetime.now().replace(microsecond=0)
+
+
+@pytest.fixture
+def reservations(mixer, create_meeting_room):
+    """Брони пользователя 2: три завершены давно, одна только что,
+    одна впереди и ещё одна завершена давно."""
+    ends = [
+        NOW - timedelta(days=30),
+        NOW - timedelta(days=20),
+        NOW - timedelta(days=10),
+        NOW - timedelta(hours=1),
+        NOW + timedelta(days=1),
+        NOW - timedelta(days=40),
+    ]
+    return [
+        mixer.blend(
+            'app.models.reservation.Reservation',
+            from_reserve=end - timedelta(hours=1), to_reserve=end,
+            meetingroom_id=create_meeting_room.id, user_id=2,
+        )
+        for end in ends
+    ]
+
+
+async def ids(model):
+    async with TestingSessionLocal() as session:
+        return (await session.execute(
+            select(model.id).order_by(model.id)
+        )).scalars().all()
+
+
+async def test_archive_finished(reservations, monkeypatch):
+    """Завершённые брони переносятся в архив пакетами"""
+    monkeypatch.setattr(settings, 'archive_batch_size', 2)
+    result = await archive_reservations(TestingSessionLocal, NOW)
+    assert result == {'archived': 4, 'purged': 0}
+    assert await ids(ReservationArchive) == [1, 2, 3, 6]
+    assert await ids(Reservation) == [4, 5], (
+        'Недавно завершённая и будущая брони остаются в таблице броней'
+    )
+    assert await archive_reservations(TestingSessionLocal, NOW) == {
+        'archived': 0, 'purged': 0,
+    }
+
+
+async def test_archive_retention(reservations, monkeypatch):
+    """Архивные брони старше срока хранения удаляются"""
+    monkeypatch.setattr(settings, 'archive_retention_days', 15)
+    result = await archive_reservations(TestingSessionLocal, NOW)
+    assert result == {'archived': 4, 'purged': 3}
+    assert await ids(ReservationArchive) == [3]
+
+
+async def test_archive_after_max_id_deleted(
+        reservations, create_meeting_room
+):
+    """Id удалённой брони с наибольшим id не выдаются снова, и архивация
+    продолжается"""
+    await archive_reservations(TestingSessionLocal, NOW)
+    async with TestingSessionLocal() as session:
+        await session.delete(await session.get(Reservation, 5))
+        session.add_all([
+            Reservation(
+                from_reserve=NOW - timedelta(days=days, hours=1),
+                to_reserve=NOW - timedelta(days=days),
+                meetingroom_id=create_meeting_room.id,
+            )
+            for days in (5, 6)
+        ])
+        await session.commit()
+    assert await ids(Reservation) == [4, 7, 8], (
+        'Новые брони не должны получать id архивных броней'
+    )
+    assert await archive_reservations(TestingSessionLocal, NOW) == {
+        'archived': 2, 'purged': 0,
+    }
+    assert await ids(ReservationArchive) == [1, 2, 3, 6, 7, 8]
+
+
+async def test_history_includes_archive(user_client, reservations):
+    """Список своих броней включает архивные брони по порядку, и страницы
+    продолжаются из одной таблицы в другую"""
+    expected = [
+        reservation.id for reservation in sorted(
+            reservations, key=lambda reservation: reservation.from_reserve
+        )
+    ]
+    before = user_client.get('/reservations/my_reservations').json()
+    await archive_reservations(TestingSessionLocal, NOW)
+    after = user_client.get('/reservations/my_reservations').json()
+    assert after == before
+    assert [reservation['id'] for reservation in after] == expected
+    pages = []
+    response = user_client.get(
+        '/reservations/my_reservations', params={'limit': 2}
+    )
+    while True:
+        pages.extend(reservation['id'] for reservation in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        response = user_client.get(
+            '/reservations/my_reservations',
+            params={'limit': 2, 'cursor': cursor},
+        )
+    assert pages == expected
@@ -1,3 +1,12 @@
+from sqlalchemy import event, select, update
+
+from conftest import TestingSessionLocal, engine
+from app.core.config import settings
+from app.core.passwords import password_context, password_hasher
+from app.core.user import token_cache, user_cache
+from app.models.user import User
+
+
 def test_register(test_client):
     response = test_client.post('/auth/register', json={
         'email': 'dead@pool.com',
@@ -37,4 +46,120 @@ def test_register_invalid_pass(user_client):
             'code': 'REGISTER_INVALID_PASSWORD',
             'reason': 'Password should be at least 3 characters',
         },
-    }, 'При некорректной регистрации пользователя тело ответа API отличается от ожидаемого.'
\ No newline at end of file
+    }, 'При некорректной регистрации пользователя тело ответа API отличается от ожидаемого.'
+
+
+def register_and_login(client, email):
+    password = 'chimichangas4life'
+    response = client.post(
+        '/auth/register', json={'email': email, 'password': password}
+    )
+    assert response.status_code == 201, response.json()
+    token = client.post('/auth/jwt/login', data={
+        'username': email, 'password': password,
+    }).json()['access_token']
+    return response.json()['id'], {'Authorization': f'Bearer {token}'}
+
+
+async def test_user_cache(test_client):
+    """Пользователь запроса читается из кэша, а изменения и деактивация
+    сбрасывают кэш"""
+    user_id, headers = register_and_login(test_client, 'dead@pool.com')
+    admin_id, admin_headers = register_and_login(test_client, 'admin@pool.com')
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(User).where(User.id == admin_id).values(is_superuser=True)
+        )
+        await session.commit()
+
+    assert test_client.get('/users/me', headers=headers).status_code == 200
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        response = test_client.get('/users/me', headers=headers)
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+    assert response.status_code == 200
+    assert statements == [], (
+        'Пользователь из кэша не должен загружаться из БД, выполнено: '
+        f'{statements}'
+    )
+
+    response = test_client.patch(
+        f'/users/{user_id}', json={'is_active': False}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.json()
+    assert test_client.get('/users/me', headers=headers).status_code == 401, (
+        'Деактивация пользователя должна действовать сразу'
+    )
+
+    # Изменения из других процессов видны после устаревания записи кэша.
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(User).where(User.id == admin_id).values(is_active=False)
+        )
+        await session.commit()
+    response = test_client.get('/users/me', headers=admin_headers)
+    assert response.status_code == 200
+    user_cache.clear()
+    response = test_client.get('/users/me', headers=admin_headers)
+    assert response.status_code == 401
+
+
+def test_token_cache(test_client):
+    """Токен проверяется один раз, а неверный токен не кэшируется"""
+    _, headers = register_and_login(test_client, 'dead@pool.com')
+    misses, hits = token_cache.misses, token_cache.hits
+    for _ in range(3):
+        assert test_client.get('/users/me', headers=headers).status_code == 200
+    assert (token_cache.misses, token_cache.hits) == (misses + 1, hits + 2), (
+        'Повторные запросы с тем же токеном должны брать его из кэша'
+    )
+
+    size = len(token_cache)
+    forged = {'Authorization': headers['Authorization'][:-2] + 'xx'}
+    assert test_client.get('/users/me', headers=forged).status_code == 401
+    assert len(token_cache) == size, 'Неверный токен не должен кэшироваться'
+
+
+async def test_login_rehashes_password(test_client):
+    """Хеш пароля с другой стоимостью заменяется при успешном входе"""
+    user_id, _ = register_and_login(test_client, 'dead@pool.com')
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(User).where(User.id == user_id).values(
+                hashed_password=password_context(4).hash('chimichangas4life')
+            )
+        )
+        await session.commit()
+
+    response = test_client.post('/auth/jwt/login', data={
+        'username': 'dead@pool.com', 'password': 'chimichangas4life',
+    })
+    assert response.status_code == 200, response.json()
+    async with TestingSessionLocal() as session:
+        hashed_password = await session.scalar(
+            select(User.hashed_password).where(User.id == user_id)
+        )
+    assert hashed_password.startswith(
+        f'$2b${settings.password_hash_rounds:02d}$'
+    ), 'Хеш должен быть пересчитан с заданной стоимостью'
+
+
+def test_login_queue_full(test_client, monkeypatch):
+    """При переполненной очереди хеширования вход отклоняется с 503"""
+    monkeypatch.setattr(password_hasher, 'workers', 0)
+    monkeypatch.setattr(password_hasher, 'queue_size', 0)
+    response = test_client.post('/auth/jwt/login', data={
+        'username': 'dead@pool.com', 'password': 'chimichangas4life',
+    })
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
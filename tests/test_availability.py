@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import engine
+from app.core.availability import free_slots
+
+START = datetime(2030, 1, 1, 10, 0)
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+@pytest.mark.parametrize('busy, granularity, min_duration, expected', [
+    ([], 1, 0, [(0, 120)]),
+    ([(30, 60)], 1, 0, [(0, 29), (61, 120)]),
+    ([(-60, 0), (120, 180)], 1, 0, [(1, 119)]),
+    ([(-60, 180)], 1, 0, []),
+    ([(30, 60), (40, 50), (55, 70)], 1, 0, [(0, 29), (71, 120)]),
+    ([(30, 60)], 15, 0, [(0, 15), (75, 120)]),
+    ([(30, 60)], 15, 30, [(75, 120)]),
+], ids=[
+    'free_window',
+    'one_reservation',
+    'touching_window_bounds',
+    'busy_window',
+    'nested_reservations',
+    'granularity',
+    'min_duration',
+])
+def test_free_slots(busy, granularity, min_duration, expected):
+    """Свободные слоты не касаются броней и лежат на сетке поиска"""
+    slots = free_slots(
+        [(at(start), at(end)) for start, end in busy],
+        at(0),
+        at(120),
+        timedelta(minutes=granularity),
+        timedelta(minutes=min_duration),
+    )
+    assert list(slots) == [(at(start), at(end)) for start, end in expected]
+
+
+def test_get_free_meeting_rooms(user_client, mixer):
+    """Поиск возвращает свободные слоты всех переговорок, учитывая брони и
+    вхождения серий, за постоянное число запросов к БД"""
+    rooms = [
+        mixer.blend('app.models.meeting_room.MeetingRoom', name=f'Room {n}')
+        for n in range(10)
+    ]
+    start = (datetime.now() + timedelta(days=1)).replace(
+        hour=10, minute=0, second=0, microsecond=0
+    )
+    mixer.blend(
+        'app.models.reservation.Reservation',
+        from_reserve=start + timedelta(minutes=30),
+        to_reserve=start + timedelta(minutes=60),
+        meetingroom_id=rooms[0].id,
+    )
+    response = user_client.post('/reservation_series/', json={
+        'from_reserve': (start + timedelta(hours=1)).isoformat(),
+        'to_reserve': (start + timedelta(hours=2)).isoformat(),
+        'frequency': 'daily',
+        'count': 2,
+        'meetingroom_id': rooms[1].id,
+    })
+    assert response.status_code == 200, response.json()
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        response = user_client.get('/meeting_rooms/availability', params={
+            'from_reserve': start.isoformat(),
+            'to_reserve': (start + timedelta(hours=2)).isoformat(),
+            'granularity': 15,
+            'min_duration': 40,
+        })
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+    assert response.status_code == 200, response.json()
+    assert len(statements) == 2, (
+        'Поиск должен выполнять один запрос переговорок с бронями и один '
+        f'запрос серий, выполнено: {statements}'
+    )
+    data = response.json()
+    assert [room['room']['id'] for room in data] == [
+        room.id for room in rooms
+    ]
+
+    def slots(room):
+        return [
+            (slot['from_reserve'], slot['to_reserve'])
+            for slot in room['free_slots']
+        ]
+
+    assert slots(data[0]) == [(
+        (start + timedelta(minutes=75)).isoformat(),
+        (start + timedelta(hours=2)).isoformat(),
+    )], 'Слот короче `min_duration` не должен попадать в ответ'
+    assert slots(data[1]) == [(
+        start.isoformat(), (start + timedelta(minutes=45)).isoformat(),
+    )], 'Вхождения серий должны занимать переговорку'
+    assert slots(data[2]) == [(
+        start.isoformat(), (start + timedelta(hours=2)).isoformat(),
+    )]
+
+    free_from, free_to = slots(data[0])[0]
+    response = user_client.post('/reservations/', json={
+        'from_reserve': free_from,
+        'to_reserve': free_to,
+        'meetingroom_id': rooms[0].id,
+    })
+    assert response.status_code == 200, (
+        'Найденный свободный слот должен бронироваться целиком'
+    )
+
+
+@pytest.mark.parametrize('hours', [-1, 24 * 32])
+def test_get_free_meeting_rooms_invalid_window(user_client, hours):
+    """Пустой или слишком длинный интервал поиска отклоняется"""
+    start = datetime.now() + timedelta(days=1)
+    response = user_client.get('/meeting_rooms/availability', params={
+        'from_reserve': start.isoformat(),
+        'to_reserve': (start + timedelta(hours=hours)).isoformat(),
+    })
+    assert response.status_code == 422
@@ -0,0 +1,121 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from app.core.cache import TTLCache, caches
+from app.crud.meeting_room import meeting_room_crud
+from conftest import TEST_DB, app, current_user
+from fixtures.user import user
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache():
+    """Кэш ограничен размером и временем жизни записей и считает
+    попадания и промахи"""
+    timer = FakeTimer()
+    cache = TTLCache('test', maxsize=2, ttl=10, timer=timer)
+    try:
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None, (
+            'При переполнении вытесняется давно не использованная запись'
+        )
+        assert cache.get('a') == 1 and cache.get('c') == 3
+
+        timer.now = 10
+        assert cache.get('a') is None, 'Запись должна устаревать через ttl'
+        assert len(cache) == 1
+        assert cache.stats() == {
+            'size': 1,
+            'maxsize': 2,
+            'ttl': 10,
+            'hits': 3,
+            'misses': 2,
+            'hit_ratio': 0.6,
+        }
+    finally:
+        del caches['test']
+
+
+def test_meeting_room_cache(superuser_client, create_meeting_room):
+    """Список и переговорки читаются из кэша, а изменения переговорок
+    сбрасывают его"""
+    cache = meeting_room_crud.cache
+    response = superuser_client.get('/meeting_rooms/')
+    assert response.status_code == 200
+    hits = cache.hits
+    assert superuser_client.get('/meeting_rooms/').json() == response.json()
+    assert cache.hits == hits + 1, (
+        'Повторный запрос списка должен попасть в кэш'
+    )
+
+    response = superuser_client.post('/meeting_rooms/', json={'name': 'New'})
+    assert response.status_code == 200
+    names = [room['name'] for room in superuser_client.get(
+        '/meeting_rooms/'
+    ).json()]
+    assert names == ['Test room 1', 'New'], (
+        'Создание переговорки должно сбрасывать кэш списка'
+    )
+
+    room_id = create_meeting_room.id
+    superuser_client.get(f'/meeting_rooms/{room_id}/reservations')
+    hits = cache.hits
+    response = superuser_client.patch(
+        f'/meeting_rooms/{room_id}', json={'description': 'Cached'}
+    )
+    assert cache.hits == hits + 1, 'Переговорка должна читаться из кэша'
+    assert response.json() == {
+        'id': room_id, 'name': 'Test room 1', 'description': 'Cached',
+    }, 'Переговорка из кэша должна изменяться как загруженная из БД'
+
+    superuser_client.get(f'/meeting_rooms/{room_id}/reservations')
+    response = superuser_client.delete(f'/meeting_rooms/{room_id}')
+    assert response.status_code == 200, response.json()
+    assert [room['name'] for room in superuser_client.get(
+        '/meeting_rooms/'
+    ).json()] == ['New']
+
+    response = superuser_client.get('/monitoring/caches')
+    assert response.status_code == 200
+    assert response.json()['meeting_rooms']['hits'] == cache.hits
+
+
+def test_write_rechecks_cached_room(superuser_client, create_meeting_room):
+    """Бронь не создаётся в переговорке, удалённой другим воркером, даже
+    если она осталась в кэше"""
+    room_id = create_meeting_room.id
+    superuser_client.get(f'/meeting_rooms/{room_id}/reservations')
+    # Deleted by another worker, the cache of this one is not cleared.
+    connection = sqlite3.connect(TEST_DB)
+    with connection:
+        connection.execute('DELETE FROM meetingroom WHERE id = ?', (room_id,))
+    connection.close()
+
+    app.dependency_overrides[current_user] = lambda: user
+    from_reserve = datetime.now() + timedelta(days=1)
+    slot = {
+        'from_reserve': from_reserve.isoformat(),
+        'to_reserve': (from_reserve + timedelta(hours=1)).isoformat(),
+        'meetingroom_id': room_id,
+    }
+    response = superuser_client.post('/reservations/', json=slot)
+    assert response.status_code == 404, (
+        'Бронь удалённой переговорки должна отклоняться со статус-кодом 404'
+    )
+    assert response.json() == {'detail': 'Переговорка не найдена!'}
+    response = superuser_client.post(
+        '/reservation_series/',
+        json={**slot, 'frequency': 'daily', 'count': 2},
+    )
+    assert response.status_code == 404, (
+        'Серия в удалённой переговорке должна отклоняться со статус-кодом 404'
+    )
@@ -0,0 +1,186 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.core import events
+from app.core.events import EventHub, RelayBroker, start_relay
+from app.core.user import current_websocket_user
+from conftest import app
+from fixtures.user import user
+
+FROM_RESERVE = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+
+
+def reservation_json(meetingroom_id, hours=0):
+    return {
+        'meetingroom_id': meetingroom_id,
+        'from_reserve': (FROM_RESERVE + timedelta(hours=hours)).isoformat(),
+        'to_reserve': (
+            FROM_RESERVE + timedelta(hours=hours, minutes=30)
+        ).isoformat(),
+    }
+
+
+def test_live_reservation_events(
+    user_client, create_meeting_room, create_another_meeting_room
+):
+    """Подписчик переговорки получает создание, изменение и удаление её
+    броней и не получает события других переговорок"""
+    app.dependency_overrides[current_websocket_user] = lambda: user
+    with user_client.websocket_connect('/reservations/live?rooms=1') as live:
+        assert user_client.post(
+            '/reservations/', json=reservation_json(2)
+        ).status_code == 200
+        created = user_client.post('/reservations/', json=reservation_json(1))
+        assert created.status_code == 200
+        reservation_id = created.json()['id']
+        assert user_client.patch(
+            f'/reservations/{reservation_id}',
+            json={
+                key: value for key, value in reservation_json(1, 1).items()
+                if key != 'meetingroom_id'
+            },
+        ).status_code == 200
+        assert user_client.delete(
+            f'/reservations/{reservation_id}'
+        ).status_code == 200
+
+        event = live.receive_json()
+        assert event == {
+            'event': 'reservation.created',
+            'meetingroom_id': 1,
+            'data': created.json(),
+        }, 'Событие должно содержать бронь в том же виде, что и ответ API'
+        assert [live.receive_json()['event'] for _ in range(2)] == [
+            'reservation.updated', 'reservation.deleted',
+        ]
+
+
+def test_live_requires_token(user_client):
+    """Подключение без токена закрывается с кодом 1008"""
+    with pytest.raises(WebSocketDisconnect) as error:
+        with user_client.websocket_connect('/reservations/live'):
+            pass
+    assert error.value.code == 1008
+
+
+async def test_slow_subscriber_dropped():
+    """Подписчик с заполненной очередью отключается, остальные получают
+    события"""
+    hub = EventHub(queue_size=2)
+    with hub.subscribe([1]) as slow, hub.subscribe() as fast:
+        for number in range(3):
+            hub.deliver(1, str(number))
+            assert await fast.get() == str(number)
+        hub.deliver(2, 'other room')
+        assert await fast.get() == 'other room'
+        assert slow.dropped
+        assert await slow.get() is None, (
+            'Отключённый подписчик не должен получать устаревшие события'
+        )
+        assert hub.stats() == {
+            'subscribers': 2, 'delivered': 6, 'dropped': 1,
+        }
+    assert hub.stats()['subscribers'] == 0
+
+
+async def test_relay_shares_events():
+    """События одного воркера доходят до подписчиков другого через
+    ретранслятор"""
+    server = await start_relay('127.0.0.1', 0)
+    address = '127.0.0.1:{}'.format(server.sockets[0].getsockname()[1])
+    brokers = [RelayBroker(address), RelayBroker(address)]
+    try:
+        for broker in brokers:
+            await broker.start()
+            await asyncio.wait_for(broker.connected.wait(), 1)
+        with brokers[0].hub.subscribe([1]) as local, \
+                brokers[1].hub.subscribe([1]) as remote:
+            await brokers[0].publish(1, '{"event": "reservation.created"}')
+            assert await local.get() == '{"event": "reservation.created"}'
+            assert await asyncio.wait_for(remote.get(), 1) == (
+                '{"event": "reservation.created"}'
+            )
+    finally:
+        for broker in brokers:
+            await broker.stop()
+        server.close()
+        await server.wait_closed()
+
+
+async def test_relay_line_over_limit(monkeypatch):
+    """Слишком длинная строка от ретранслятора не останавливает приём
+    событий: воркер переподключается"""
+    monkeypatch.setattr(events, 'RECONNECT_DELAY', 0.01)
+    lines = [
+        b'1 ' + b'x' * events.RELAY_LINE_LIMIT + b'\n',
+        b'1 {"event": "reservation.created"}\n',
+    ]
+
+    async def handle(reader, writer):
+        writer.write(lines.pop(0) if len(lines) > 1 else lines[0])
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    broker = RelayBroker(
+        '127.0.0.1:{}'.format(server.sockets[0].getsockname()[1])
+    )
+    try:
+        await broker.start()
+        with broker.hub.subscribe([1]) as subscription:
+            assert await asyncio.wait_for(subscription.get(), 1) == (
+                '{"event": "reservation.created"}'
+            )
+    finally:
+        await broker.stop()
+        server.close()
+        await server.wait_closed()
+
+
+async def test_relay_not_reading(monkeypatch):
+    """Воркер не копит события для ретранслятора, который их не читает:
+    соединение закрывается и устанавливается заново"""
+    monkeypatch.setattr(events, 'RECONNECT_DELAY', 0.01)
+    monkeypatch.setattr(events, 'RELAY_BUFFER_LIMIT', 2 ** 16)
+    connections = []
+    closed = asyncio.Event()
+
+    async def handle(reader, writer):
+        # Never reads the events of the worker.
+        connections.append(writer)
+        await closed.wait()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    broker = RelayBroker(
+        '127.0.0.1:{}'.format(server.sockets[0].getsockname()[1])
+    )
+    try:
+        await broker.start()
+        await asyncio.wait_for(broker.connected.wait(), 1)
+        message = 'x' * 2 ** 16
+        for _ in range(1000):
+            writer = broker._writer
+            if writer is None:
+                break
+            assert writer.transport.get_write_buffer_size() <= (
+                2 * events.RELAY_BUFFER_LIMIT
+            ), 'Буфер записи в ретранслятор должен быть ограничен'
+            await broker.publish(1, message)
+        assert broker._writer is None, (
+            'Соединение с нечитающим ретранслятором должно закрываться'
+        )
+        for _ in range(100):
+            if len(connections) > 1:
+                break
+            await asyncio.sleep(0.01)
+        assert len(connections) == 2, 'Воркер должен переподключиться'
+    finally:
+        await broker.stop()
+        closed.set()
+        server.close()
+        await server.wait_closed()
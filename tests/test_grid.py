@@ -0,0 +1,89 @@
+import base64
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+
+from app.core.queries import record_queries
+
+DAY = date.today() + timedelta(days=2)
+
+
+def at(hours, minutes=0):
+    return (
+        datetime.combine(DAY, time()) + timedelta(hours=hours, minutes=minutes)
+    ).isoformat()
+
+
+def busy_slots(bitmap, slots):
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(bitmap), np.uint8))
+    assert len(bits) == -(-slots // 8) * 8
+    return np.flatnonzero(bits[:slots]).tolist()
+
+
+def test_occupancy_grid(
+    user_client, create_meeting_room, create_another_meeting_room
+):
+    """Битовая карта отмечает слоты, занятые бронями и вхождениями серий
+    хотя бы на минуту"""
+    assert user_client.post('/reservations/', json={
+        'meetingroom_id': 1,
+        'from_reserve': at(9), 'to_reserve': at(10, 31),
+    }).status_code == 200
+    assert user_client.post('/reservation_series/', json={
+        'meetingroom_id': 1,
+        'from_reserve': at(12), 'to_reserve': at(12, 15),
+        'frequency': 'daily', 'count': 3,
+    }).status_code == 200
+
+    response = user_client.get(
+        '/meeting_rooms/grid', params={'day': DAY.isoformat(), 'days': 2}
+    )
+    assert response.status_code == 200
+    grid = response.json()
+    assert grid['slot_minutes'] == 15 and grid['slots'] == 192
+    assert grid['from_reserve'] == at(0)
+    assert busy_slots(grid['rooms']['1'], 192) == [
+        36, 37, 38, 39, 40, 41, 42, 48, 96 + 48,
+    ]
+    assert busy_slots(grid['rooms']['2'], 192) == []
+
+    response = user_client.get('/meeting_rooms/grid', params={
+        'day': DAY.isoformat(), 'slot': 60, 'rooms': [1],
+    })
+    assert response.json()['rooms'] == {
+        '1': base64.b64encode(bytes([0, 0b01101000, 0])).decode()
+    }
+
+
+def test_occupancy_grid_cache(user_client, create_meeting_room):
+    """Повторный запрос сетки читается из кэша, бронь сбрасывает кэш
+    своих дней"""
+    params = {'day': DAY.isoformat(), 'rooms': [1]}
+    assert busy_slots(user_client.get(
+        '/meeting_rooms/grid', params=params
+    ).json()['rooms']['1'], 96) == []
+    with record_queries() as recorder:
+        user_client.get('/meeting_rooms/grid', params=params)
+    assert not [
+        statement for statement in recorder.statements
+        if 'reservation' in statement
+    ], 'Занятость дня должна читаться из кэша'
+
+    reservation = user_client.post('/reservations/', json={
+        'meetingroom_id': 1, 'from_reserve': at(10), 'to_reserve': at(11),
+    })
+    assert busy_slots(user_client.get(
+        '/meeting_rooms/grid', params=params
+    ).json()['rooms']['1'], 96) == [40, 41, 42, 43]
+    user_client.delete(f'/reservations/{reservation.json()["id"]}')
+    assert busy_slots(user_client.get(
+        '/meeting_rooms/grid', params=params
+    ).json()['rooms']['1'], 96) == []
+
+
+def test_occupancy_grid_slot(user_client):
+    """Длина слота должна делить сутки"""
+    response = user_client.get(
+        '/meeting_rooms/grid', params={'day': DAY.isoformat(), 'slot': 7}
+    )
+    assert response.status_code == 422
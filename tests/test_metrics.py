@@ -0,0 +1,60 @@
+from sqlalchemy import text
+
+from app.core.db import make_engine
+from app.core.metrics import instrument_engine, pool_collectors, registry
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint(user_client):
+    """Запросы считаются по шаблонам маршрутов и видны в /metrics"""
+    labels = {
+        'method': 'GET',
+        'route': '/reservation_series/{series_id}/occurrences',
+    }
+    requests = sample('http_requests_total', **labels, status='404')
+    observed = sample('http_request_duration_seconds_count', **labels)
+    assert user_client.get(
+        '/reservation_series/12345/occurrences'
+    ).status_code == 404
+    assert sample(
+        'http_requests_total', **labels, status='404'
+    ) == requests + 1, 'Запрос должен учитываться по шаблону маршрута'
+    assert sample(
+        'http_request_duration_seconds_count', **labels
+    ) == observed + 1
+    assert sample('http_requests_in_progress', method='GET') == 0
+
+    response = user_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    body = response.text
+    for name in (
+        'http_requests_total', 'http_request_duration_seconds_bucket',
+        'db_statement_duration_seconds', 'db_pool_checked_out',
+    ):
+        assert name in body, f'В метриках нет {name}'
+    assert '/reservation_series/12345' not in body, (
+        'Метки не должны содержать путь запроса'
+    )
+
+
+async def test_statement_metrics(tmp_path):
+    """Время SQL-выражений учитывается по виду выражения"""
+    engine = make_engine(f'sqlite+aiosqlite:///{tmp_path / "metrics.db"}')
+    instrument_engine(engine.sync_engine)
+    try:
+        selects = sample(
+            'db_statement_duration_seconds_count', operation='SELECT'
+        )
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            await conn.execute(text('select 2'))
+        assert sample(
+            'db_statement_duration_seconds_count', operation='SELECT'
+        ) == selects + 2
+    finally:
+        registry.unregister(pool_collectors.pop())
+        await engine.dispose()
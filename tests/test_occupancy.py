@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.core.occupancy import (RoomOccupancy, occupancy_index,
+                                sweep_intersections)
+from app.models import Reservation
+from conftest import TestingSessionLocal
+
+START = datetime(2030, 1, 1, 10, 0)
+
+
+def reservation(id, start_hours, end_hours):
+    return SimpleNamespace(
+        id=id,
+        from_reserve=START + timedelta(hours=start_hours),
+        to_reserve=START + timedelta(hours=end_hours),
+    )
+
+
+def test_room_occupancy_intersections():
+    """Индекс находит пересечения с теми же границами, что и запрос к БД"""
+    room = RoomOccupancy([
+        reservation(2, 4, 5),
+        reservation(1, 0, 1),
+        reservation(3, 2, 3),
+    ])
+    assert not room.stale
+    assert room.ids == [1, 3, 2], 'Брони должны быть отсортированы по началу'
+
+    def intersecting_ids(start, end, reservation_id=None):
+        return [
+            room.ids[position] for position in room.get_intersections(
+                START + timedelta(hours=start),
+                START + timedelta(hours=end),
+                reservation_id,
+            )
+        ]
+
+    assert intersecting_ids(1.25, 1.75) == []
+    assert intersecting_ids(1, 2) == [1, 3], (
+        'Касание границ считается пересечением, как и в запросе к БД'
+    )
+    assert intersecting_ids(0.5, 4.5) == [1, 3, 2]
+    assert intersecting_ids(0.5, 4.5, reservation_id=3) == [1, 2]
+    assert intersecting_ids(6, 7) == []
+
+
+def test_room_occupancy_detects_stale():
+    """Индекс помечается устаревшим, если запись в БД ему противоречит"""
+    room = RoomOccupancy([reservation(1, 0, 1)])
+    room.add(2, START + timedelta(hours=2), START + timedelta(hours=3))
+    assert room.ids == [1, 2] and not room.stale
+    room.discard(1)
+    assert room.ids == [2] and not room.stale
+
+    room.add(3, START + timedelta(hours=2.5), START + timedelta(hours=4))
+    assert room.stale, 'Пересекающаяся бронь означает пропущенное изменение'
+
+    room = RoomOccupancy([reservation(1, 0, 1)])
+    room.discard(42)
+    assert room.stale, 'Неизвестная бронь означает пропущенное изменение'
+    assert not room.is_fresh(ttl=60)
+
+
+def test_create_reservation_with_occupancy_index(
+        user_client, create_meeting_room, monkeypatch
+):
+    """Проверка пересечений через индекс даёт те же ответы, что и через БД"""
+    monkeypatch.setattr(settings, 'occupancy_index_enabled', True)
+    from_reserve = datetime.now() + timedelta(hours=1)
+    json = {
+        'from_reserve': from_reserve.isoformat(),
+        'to_reserve': (from_reserve + timedelta(hours=1)).isoformat(),
+        'meetingroom_id': create_meeting_room.id,
+    }
+    response = user_client.post('/reservations/', json=json)
+    assert response.status_code == 200, response.json()
+    reservation_id = response.json()['id']
+
+    # Пересечение проверяется через индекс, который загружает комнату.
+    response = user_client.post('/reservations/', json=json)
+    assert response.status_code == 422, (
+        'Пересекающаяся бронь должна отклоняться'
+    )
+    room = occupancy_index._rooms[create_meeting_room.id]
+    assert room.ids == [reservation_id]
+
+    json['from_reserve'] = (from_reserve + timedelta(hours=2)).isoformat()
+    json['to_reserve'] = (from_reserve + timedelta(hours=3)).isoformat()
+    response = user_client.post('/reservations/', json=json)
+    assert response.status_code == 200, response.json()
+    assert len(room) == 2, (
+        'Новая бронь должна попасть в загруженный индекс'
+    )
+
+
+async def test_occupancy_index_confirms_free_room(
+        user_client, create_meeting_room, monkeypatch
+):
+    """Бронь другого воркера, ещё не попавшая в индекс, не даёт занять
+    переговорку повторно"""
+    monkeypatch.setattr(settings, 'occupancy_index_enabled', True)
+    from_reserve = (datetime.now() + timedelta(hours=1)).replace(
+        microsecond=0
+    )
+    response = user_client.post('/reservations/', json={
+        'from_reserve': from_reserve.isoformat(),
+        'to_reserve': (from_reserve + timedelta(hours=1)).isoformat(),
+        'meetingroom_id': create_meeting_room.id,
+    })
+    assert response.status_code == 200, response.json()
+    reservation_id = response.json()['id']
+    async with TestingSessionLocal() as session:
+        await occupancy_index.get_room(create_meeting_room.id, session)
+
+    async with TestingSessionLocal() as session:
+        session.add(Reservation(
+            from_reserve=from_reserve + timedelta(hours=4),
+            to_reserve=from_reserve + timedelta(hours=5),
+            meetingroom_id=create_meeting_room.id,
+        ))
+        await session.commit()
+    response = user_client.patch(f'/reservations/{reservation_id}', json={
+        'from_reserve': (from_reserve + timedelta(hours=4)).isoformat(),
+        'to_reserve': (from_reserve + timedelta(hours=5)).isoformat(),
+    })
+    assert response.status_code == 422, (
+        'Свободная по индексу переговорка должна проверяться в БД'
+    )
+    assert create_meeting_room.id not in occupancy_index._rooms, (
+        'Индекс, пропустивший бронь, должен сбрасываться'
+    )
+
+
+def test_sweep_intersections():
+    """Один проход по двум отсортированным спискам находит все пересечения"""
+    def hours(start, end):
+        return (START + timedelta(hours=start), START + timedelta(hours=end))
+
+    intervals = [hours(0, 1), hours(24, 25), hours(48, 49)]
+    others = [
+        hours(-2, -1), hours(0.5, 2), hours(1, 30),
+        hours(26, 27), hours(49, 50), hours(60, 61),
+    ]
+    assert sweep_intersections(intervals, others) == [1, 2, 4]
+    assert sweep_intersections(intervals, []) == []
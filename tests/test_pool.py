@@ -0,0 +1,69 @@
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import make_engine
+from app.core.pool import InstrumentedQueuePool, pool_stats
+
+
+async def test_sqlite_pragmas(tmp_path):
+    """Соединения с файлом SQLite берутся из пула и получают прагмы"""
+    engine = make_engine(f'sqlite+aiosqlite:///{tmp_path / "pool.db"}')
+    try:
+        assert isinstance(engine.sync_engine.pool, InstrumentedQueuePool)
+        async with engine.connect() as conn:
+            pragmas = {
+                name: (await conn.execute(
+                    text(f'PRAGMA {name}')
+                )).scalar_one()
+                for name in (
+                    'journal_mode', 'synchronous', 'busy_timeout',
+                    'cache_size',
+                )
+            }
+        assert pragmas == {
+            'journal_mode': 'wal',
+            # NORMAL.
+            'synchronous': 1,
+            'busy_timeout': settings.sqlite_busy_timeout,
+            'cache_size': settings.sqlite_cache_size,
+        }
+    finally:
+        await engine.dispose()
+
+
+async def test_pool_stats(tmp_path):
+    """Статистика пула считает выданные соединения"""
+    engine = make_engine(f'sqlite+aiosqlite:///{tmp_path / "pool.db"}')
+    try:
+        pool = engine.sync_engine.pool
+        async with engine.connect():
+            async with engine.connect():
+                stats = pool_stats(pool)
+                assert stats['checked_out'] == 2
+        stats = pool_stats(pool)
+        assert stats['pool_class'] == 'InstrumentedQueuePool'
+        assert stats['checked_out'] == 0
+        assert stats['checked_in'] == 2
+        assert stats['size'] == settings.db_pool_size
+        assert stats['checkouts'] == 2
+        assert stats['failed_checkouts'] == 0
+        assert stats['max_checkout_seconds'] >= 0
+    finally:
+        await engine.dispose()
+
+
+def test_in_memory_sqlite_keeps_static_pool():
+    """База SQLite в памяти остаётся в единственном соединении"""
+    engine = make_engine('sqlite+aiosqlite://')
+    assert pool_stats(engine.sync_engine.pool) == {
+        'pool_class': 'StaticPool'
+    }
+
+
+def test_pool_stats_endpoint(superuser_client):
+    """Администратор получает состояние пула соединений"""
+    response = superuser_client.get('/monitoring/pool')
+    assert response.status_code == 200, (
+        'Администратор должен получать состояние пула'
+    )
+    assert 'pool_class' in response.json()
@@ -0,0 +1,195 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+
+from conftest import (
+    app, current_superuser, current_user, get_async_session, override_db
+)
+from fixtures.user import superuser
+from app.core.config import settings
+from app.core.queries import QUERY_COUNT_HEADER, normalize, record_queries
+
+START = (datetime.now() + timedelta(days=1)).replace(
+    hour=10, minute=0, second=0, microsecond=0
+)
+
+
+def at(hours):
+    return (START + timedelta(hours=hours)).isoformat()
+
+
+RESERVATION = {'from_reserve': at(2), 'to_reserve': at(3)}
+WINDOW = {'from_reserve': at(0), 'to_reserve': at(24)}
+
+# Наибольшее число SQL-выражений запроса к каждому маршруту приложения:
+# (метод, маршрут) -> (путь, параметры запроса, тело, лимит).
+QUERY_BUDGETS = {
+    ('POST', '/meeting_rooms/'): (
+        '/meeting_rooms/', None, {'name': 'New room'}, 1
+    ),
+    ('GET', '/meeting_rooms/'): ('/meeting_rooms/', None, None, 1),
+    ('GET', '/meeting_rooms/availability'): (
+        '/meeting_rooms/availability', WINDOW, None, 2
+    ),
+    ('PATCH', '/meeting_rooms/{meeting_room_id}'): (
+        '/meeting_rooms/1', None, {'description': 'New'}, 2
+    ),
+    ('DELETE', '/meeting_rooms/{meeting_room_id}'): (
+        '/meeting_rooms/1', None, None, 2
+    ),
+    ('GET', '/meeting_rooms/grid'): (
+        '/meeting_rooms/grid', {'day': START.date().isoformat()}, None, 3
+    ),
+    ('GET', '/meeting_rooms/{meeting_room_id}/reservations'): (
+        '/meeting_rooms/1/reservations', None, None, 2
+    ),
+    ('POST', '/reservations/'): (
+        '/reservations/', None, {**RESERVATION, 'meetingroom_id': 1}, 1
+    ),
+    ('POST', '/reservations/batch'): (
+        '/reservations/batch', None,
+        {'reservations': [{**RESERVATION, 'meetingroom_id': 1}]}, 6
+    ),
+    ('GET', '/reservations/'): ('/reservations/', None, None, 1),
+    ('GET', '/reservations/export'): ('/reservations/export', None, None, 1),
+    ('DELETE', '/reservations/{reservation_id}'): (
+        '/reservations/1', None, None, 2
+    ),
+    ('PATCH', '/reservations/{reservation_id}'): (
+        '/reservations/1', None, RESERVATION, 5
+    ),
+    ('GET', '/reservations/my_reservations'): (
+        '/reservations/my_reservations', None, None, 1
+    ),
+    ('POST', '/reservation_series/'): (
+        '/reservation_series/', None,
+        {
+            'from_reserve': at(4), 'to_reserve': at(5), 'frequency': 'daily',
+            'count': 3, 'meetingroom_id': 1,
+        },
+        5,
+    ),
+    ('GET', '/reservation_series/my_series'): (
+        '/reservation_series/my_series', None, None, 1
+    ),
+    ('GET', '/reservation_series/{series_id}/occurrences'): (
+        '/reservation_series/1/occurrences', None, None, 1
+    ),
+    ('PATCH', '/reservation_series/{series_id}'): (
+        '/reservation_series/1', None, {'exceptions': [at(48)]}, 5
+    ),
+    ('DELETE', '/reservation_series/{series_id}'): (
+        '/reservation_series/1', None, None, 2
+    ),
+    ('GET', '/analytics/utilization'): (
+        '/analytics/utilization', WINDOW, None, 3
+    ),
+    ('GET', '/monitoring/caches'): ('/monitoring/caches', None, None, 0),
+    ('GET', '/monitoring/pool'): ('/monitoring/pool', None, None, 0),
+    ('GET', '/metrics'): ('/metrics', None, None, 0),
+    ('DELETE', '/users/{id}'): ('/users/1', None, None, 0),
+}
+# Маршрут перекрыт маршрутом fastapi-users со своей проверкой прав.
+SHADOWED_ROUTES = {('DELETE', '/users/{id}')}
+
+
+@pytest.fixture
+def reservation_data(mixer, create_meeting_room):
+    mixer.blend(
+        'app.models.reservation.Reservation',
+        from_reserve=START, to_reserve=START + timedelta(hours=1),
+        meetingroom_id=create_meeting_room.id, user_id=superuser.id,
+    )
+    mixer.blend(
+        'app.models.reservation_series.ReservationSeries',
+        from_reserve=START + timedelta(hours=6),
+        to_reserve=START + timedelta(hours=7),
+        frequency='daily', interval=1, until=None, count=3, exceptions=[],
+        last_to_reserve=START + timedelta(days=2, hours=7),
+        meetingroom_id=create_meeting_room.id, user_id=superuser.id,
+    )
+
+
+@pytest_asyncio.fixture
+async def admin_client():
+    app.dependency_overrides = {
+        get_async_session: override_db,
+        current_user: lambda: superuser,
+        current_superuser: lambda: superuser,
+    }
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        yield client
+
+
+def test_every_route_has_budget():
+    """Для каждого маршрута приложения задан лимит SQL-выражений"""
+    routes = {
+        (method, route.path)
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.endpoint.__module__.startswith('app.api.endpoints')
+        for method in route.methods
+    }
+    assert routes - set(QUERY_BUDGETS) == set(), (
+        'Добавьте лимит SQL-выражений новых маршрутов в QUERY_BUDGETS'
+    )
+
+
+@pytest.mark.parametrize('method, route', list(QUERY_BUDGETS))
+async def test_query_budget(
+    method, route, admin_client, reservation_data, monkeypatch
+):
+    """Запрос к маршруту выполняет не больше SQL-выражений, чем задано"""
+    monkeypatch.setattr(settings, 'query_count_header', True)
+    path, params, json, budget = QUERY_BUDGETS[method, route]
+    with record_queries() as recorder:
+        response = await admin_client.request(
+            method, path, params=params, json=json
+        )
+    assert response.status_code < 500
+    if (method, route) not in SHADOWED_ROUTES:
+        assert response.status_code not in (401, 403, 404, 422), (
+            response.text
+        )
+    assert len(recorder) <= budget, (
+        f'{method} {route} выполняет {len(recorder)} SQL-выражений '
+        f'при лимите {budget}:\n' + '\n'.join(recorder.statements)
+    )
+    if route != '/reservations/export':
+        assert int(response.headers[QUERY_COUNT_HEADER]) == len(recorder), (
+            'Заголовок X-Query-Count должен содержать число выражений'
+        )
+
+
+def test_normalize():
+    """Списки параметров не различают нормализованные выражения"""
+    assert normalize('SELECT a\n  FROM t WHERE id IN (?, ?)') == (
+        normalize('SELECT a FROM t WHERE id IN (?, ?, ?)')
+    )
+    assert normalize('INSERT INTO t (a) VALUES (?), (?), (?)') == (
+        'INSERT INTO t (a) VALUES (?)'
+    )
+
+
+async def test_repeated_statement_logged(
+    admin_client, reservation_data, monkeypatch, caplog
+):
+    """Повторение одного выражения в запросе попадает в журнал"""
+    monkeypatch.setattr(settings, 'repeated_query_threshold', 0)
+    with caplog.at_level(logging.WARNING, logger='app.core.queries'):
+        response = await admin_client.get('/reservations/')
+    assert response.status_code == 200
+    assert 'GET /reservations/ ran the same statement' in caplog.text, (
+        'Повторяющееся выражение должно попасть в журнал'
+    )
+    caplog.clear()
+    monkeypatch.setattr(settings, 'repeated_query_threshold', 10)
+    with caplog.at_level(logging.WARNING, logger='app.core.queries'):
+        await admin_client.get('/reservations/')
+    assert caplog.text == '', (
+        'Выражения, не превысившие порог, не должны попадать в журнал'
+    )
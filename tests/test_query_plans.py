@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import TestingSessionLocal, engine
+from app.crud.reservation import reservation_crud
+from app.models.user import User
+
+
+async def get_query_plans(crud_call):
+    """Выполняет запрос CRUD и возвращает план каждого его SQL-выражения."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        async with TestingSessionLocal() as session:
+            await crud_call(session)
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f'EXPLAIN QUERY PLAN {statement}', parameters
+            )
+            plans.append([row[-1] for row in result])
+    return plans
+
+
+NOW = datetime.now()
+# Курсор страницы: ключ последней брони предыдущей страницы.
+AFTER = (NOW + timedelta(days=1), 1)
+LIMIT = 101
+
+
+@pytest.mark.parametrize('crud_call, index_name, sorted_by_index', [
+    (
+        lambda session: reservation_crud.get_reservations_at_the_same_time(
+            from_reserve=NOW + timedelta(hours=1),
+            to_reserve=NOW + timedelta(hours=2),
+            meetingroom_id=1,
+            reservation_id=1,
+            session=session,
+        ),
+        'ix_reservation_meetingroom_id_to_reserve_from_reserve',
+        True,
+    ),
+    (
+        lambda session: reservation_crud.get_future_reservations_for_room(
+            room_id=1, session=session, after=AFTER, limit=LIMIT
+        ),
+        'ix_reservation_meetingroom_id_to_reserve_from_reserve',
+        True,
+    ),
+    (
+        lambda session: reservation_crud.get_future_reservations(
+            session, after=AFTER, limit=LIMIT
+        ),
+        'ix_reservation_from_reserve_id',
+        True,
+    ),
+    (
+        lambda session: reservation_crud.get_by_user(
+            session=session, user=User(id=1), after=AFTER, limit=LIMIT
+        ),
+        'ix_reservation_user_id_from_reserve',
+        True,
+    ),
+], ids=[
+    'get_reservations_at_the_same_time',
+    'get_future_reservations_for_room',
+    'get_future_reservations',
+    'get_by_user',
+])
+async def test_reservation_queries_use_indexes(
+        crud_call, index_name, sorted_by_index
+):
+    """Запросы к бронированиям должны использовать индексы, а не полный
+    просмотр таблицы `reservation`"""
+    plans = await get_query_plans(crud_call)
+    assert plans, 'Запрос CRUD не выполнил ни одного SQL-выражения.'
+    for plan in plans:
+        details = ' '.join(plan)
+        assert f'SEARCH reservation USING INDEX {index_name}' in details, (
+            f'Запрос должен использовать индекс `{index_name}`, план: {plan}'
+        )
+        assert not sorted_by_index or 'TEMP B-TREE' not in details, (
+            f'Сортировка должна выполняться по индексу, план: {plan}'
+        )
+
+
+async def test_history_reads_archive_by_index():
+    """История пользователя читает архив по индексу и сливает его с
+    актуальными бронями без сортировки"""
+    plans = await get_query_plans(
+        lambda session: reservation_crud.get_by_user(
+            session=session, user=User(id=1), after=AFTER, limit=LIMIT
+        )
+    )
+    details = ' '.join(plans[0])
+    assert (
+        'SEARCH reservation_archive USING INDEX '
+        'ix_reservation_archive_user_id_from_reserve'
+    ) in details, f'Архив должен читаться по индексу, план: {plans[0]}'
+    assert 'TEMP B-TREE' not in details, (
+        f'Брони и архив должны сливаться по индексам, план: {plans[0]}'
+    )
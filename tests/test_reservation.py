@@ -0,0 +1,282 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from conftest import (
+    TestingSessionLocal, app, current_superuser, current_user,
+    get_async_session, override_db
+)
+from fixtures.user import user
+from app.api import pagination
+from app.models.reservation import Reservation
+
+
+async def test_concurrent_overlapping_reservations(
+        create_meeting_room, create_another_meeting_room
+):
+    """Из одновременных пересекающихся бронирований одной переговорки
+    успешным должно быть только одно"""
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[current_user] = lambda: user
+    rooms = [create_meeting_room.id, create_another_meeting_room.id]
+    from_reserve = datetime.now() + timedelta(hours=1)
+
+    async with AsyncClient(app=app, base_url='http://test') as client:
+        responses = await asyncio.gather(*(
+            client.post('/reservations/', json={
+                'from_reserve': (
+                    from_reserve + timedelta(minutes=number % 30)
+                ).isoformat(),
+                'to_reserve': (
+                    from_reserve + timedelta(minutes=60 + number % 30)
+                ).isoformat(),
+                'meetingroom_id': rooms[number % len(rooms)],
+            })
+            for number in range(100)
+        ))
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == len(rooms), (
+        'Для каждой переговорки должна пройти ровно одна бронь, '
+        f'получены статусы {sorted(set(statuses))}'
+    )
+    assert statuses.count(422) == len(statuses) - len(rooms)
+    async with TestingSessionLocal() as session:
+        reservations = await session.execute(select(Reservation))
+    assert len(reservations.all()) == len(rooms), (
+        'В БД не должно оказаться пересекающихся броней'
+    )
+
+
+def batch_item(room_id, start_hours, end_hours):
+    now = datetime.now()
+    return {
+        'from_reserve': (now + timedelta(hours=start_hours)).isoformat(),
+        'to_reserve': (now + timedelta(hours=end_hours)).isoformat(),
+        'meetingroom_id': room_id,
+    }
+
+
+BATCH = [
+    batch_item(1, 3, 4),
+    # Пересекается с бронью из фикстуры (через 1-2 часа).
+    batch_item(1, 1.5, 2.5),
+    batch_item(999, 3, 4),
+    # Пересекается с первой бронью запроса.
+    batch_item(1, 3.5, 5),
+    batch_item(2, 3.5, 5),
+]
+
+
+@pytest.mark.parametrize('mode, status_code, statuses', [
+    (
+        'atomic',
+        422,
+        ['not_created', 'conflict', 'room_not_found', 'conflict',
+         'not_created'],
+    ),
+    (
+        'best_effort',
+        200,
+        ['created', 'conflict', 'room_not_found', 'conflict', 'created'],
+    ),
+])
+async def test_create_reservations_batch(
+        user_client, create_meeting_room, create_another_meeting_room,
+        create_actual_reserved_meeting_room, mode, status_code, statuses
+):
+    """Пакетное бронирование проверяет переговорки и пересечения с БД и
+    внутри пакета, а создаёт брони в зависимости от режима"""
+    response = user_client.post(
+        '/reservations/batch', json={'reservations': BATCH, 'mode': mode}
+    )
+    assert response.status_code == status_code, response.json()
+    data = response.json()
+    results = data['detail'] if status_code == 422 else data['results']
+    assert [result['status'] for result in results] == statuses
+    assert [result['index'] for result in results] == list(range(len(BATCH)))
+
+    async with TestingSessionLocal() as session:
+        reservations = await session.execute(
+            select(Reservation).order_by(Reservation.id)
+        )
+        reservations = reservations.scalars().all()
+    created = statuses.count('created')
+    assert len(reservations) == 1 + created, (
+        'Должны быть созданы только брони со статусом `created`'
+    )
+    if created:
+        assert data['created'] == created
+        assert [
+            result['reservation']['id'] for result in results
+            if result['status'] == 'created'
+        ] == [reservation.id for reservation in reservations[1:]]
+        assert all(
+            reservation.user_id == user.id
+            for reservation in reservations[1:]
+        )
+
+
+def test_reservations_pagination(user_client, create_meeting_room):
+    """Список бронирований отдаётся страницами по курсору из заголовка
+    X-Next-Cursor, а некорректный курсор отклоняется"""
+    batch = [
+        batch_item(create_meeting_room.id, number, number + 0.5)
+        for number in range(1, 8)
+    ]
+    response = user_client.post(
+        '/reservations/batch', json={'reservations': batch}
+    )
+    assert response.status_code == 200, response.json()
+    created = [
+        result['reservation']['id'] for result in response.json()['results']
+    ]
+
+    pages = []
+    params = {'limit': 3}
+    while True:
+        response = user_client.get('/reservations/', params=params)
+        assert response.status_code == 200, response.json()
+        pages.append([reservation['id'] for reservation in response.json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        params['cursor'] = cursor
+    assert [len(page) for page in pages] == [3, 3, 1], (
+        'Брони должны возвращаться страницами по `limit` штук, на последней '
+        'странице заголовок X-Next-Cursor отсутствует'
+    )
+    assert sum(pages, []) == created, (
+        'Страницы должны содержать все брони по порядку без повторов'
+    )
+
+    response = user_client.get(
+        '/reservations/', params={'cursor': 'не курсор'}
+    )
+    assert response.status_code == 422, (
+        'При некорректном курсоре должен возвращаться статус-код 422'
+    )
+
+
+def test_reservations_without_limit(
+        monkeypatch, user_client, create_meeting_room
+):
+    """Без limit и курсора список отдаётся целиком, курсор без limit
+    отдаёт страницу размера по умолчанию"""
+    monkeypatch.setattr(pagination, 'DEFAULT_PAGE_SIZE', 2)
+    batch = [
+        batch_item(create_meeting_room.id, number, number + 0.5)
+        for number in range(1, 6)
+    ]
+    response = user_client.post(
+        '/reservations/batch', json={'reservations': batch}
+    )
+    assert response.status_code == 200, response.json()
+
+    response = user_client.get('/reservations/')
+    assert response.status_code == 200, response.json()
+    assert len(response.json()) == 5, (
+        'Без limit и курсора должны возвращаться все брони'
+    )
+    assert 'X-Next-Cursor' not in response.headers, (
+        'У полного списка не должно быть курсора следующей страницы'
+    )
+
+    response = user_client.get('/reservations/', params={'limit': 1})
+    response = user_client.get(
+        '/reservations/',
+        params={'cursor': response.headers['X-Next-Cursor']},
+    )
+    assert len(response.json()) == 2, (
+        'Курсор без limit должен отдавать страницу размера по умолчанию'
+    )
+    assert 'X-Next-Cursor' in response.headers
+
+
+def test_list_responses_match_schema(user_client, create_meeting_room):
+    """Списки, закодированные напрямую из строк БД, совпадают с ответами,
+    построенными по схеме"""
+    from_reserve = datetime.now() + timedelta(days=1, microseconds=123456)
+    response = user_client.post('/reservations/', json={
+        'from_reserve': from_reserve.isoformat(),
+        'to_reserve': (from_reserve + timedelta(hours=1)).isoformat(),
+        'meetingroom_id': create_meeting_room.id,
+    })
+    assert response.status_code == 200, response.json()
+    reservation = response.json()
+    assert user_client.get('/reservations/').json() == [reservation]
+    del reservation['user_id']
+    assert user_client.get(
+        '/reservations/my_reservations'
+    ).json() == [reservation], (
+        'Свои брони возвращаются без поля user_id'
+    )
+
+    series_from = from_reserve + timedelta(days=1)
+    response = user_client.post('/reservation_series/', json={
+        'from_reserve': series_from.isoformat(),
+        'to_reserve': (series_from + timedelta(hours=1)).isoformat(),
+        'frequency': 'daily',
+        'count': 3,
+        'exceptions': [(series_from + timedelta(days=1)).isoformat()],
+        'meetingroom_id': create_meeting_room.id,
+    })
+    assert response.status_code == 200, response.json()
+    assert user_client.get(
+        '/reservation_series/my_series'
+    ).json() == [response.json()]
+
+
+def test_export_reservations(
+        superuser_client, create_actual_reserved_meeting_room,
+        create_not_actual_reserved_meeting_room
+):
+    """Выгрузка отдаёт всю историю бронирований в NDJSON и CSV с учётом
+    фильтров и доступна только администраторам"""
+    actual = create_actual_reserved_meeting_room
+    finished = create_not_actual_reserved_meeting_room
+
+    response = superuser_client.get('/reservations/export')
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['id'] for row in rows] == [finished.id, actual.id], (
+        'Выгрузка должна содержать и завершённые брони в порядке их начала'
+    )
+    assert rows[1] == {
+        'from_reserve': actual.from_reserve.isoformat(),
+        'to_reserve': actual.to_reserve.isoformat(),
+        'id': actual.id,
+        'meetingroom_id': actual.meetingroom_id,
+        'user_id': actual.user_id,
+    }
+
+    response = superuser_client.get('/reservations/export', params={
+        'format': 'csv', 'from_reserve': datetime.now().isoformat(),
+    })
+    assert response.status_code == 200, response.text
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row['id']) for row in rows] == [actual.id], (
+        'Выгрузка должна учитывать фильтр по времени начала брони'
+    )
+
+    response = superuser_client.get('/reservations/export', params={
+        'format': 'csv', 'meetingroom_id': actual.meetingroom_id + 1,
+    })
+    assert response.text.splitlines() == [
+        'from_reserve,to_reserve,id,meetingroom_id,user_id'
+    ], 'Пустая выгрузка в CSV должна содержать только заголовок'
+
+    app.dependency_overrides.pop(current_superuser)
+    response = superuser_client.get('/reservations/export')
+    assert response.status_code in (401, 403), (
+        'Выгрузка должна быть доступна только администраторам'
+    )
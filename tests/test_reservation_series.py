@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+
+
+def series_json(start, **kwargs):
+    json = {
+        'from_reserve': start.isoformat(),
+        'to_reserve': (start + timedelta(hours=1)).isoformat(),
+        'frequency': 'weekly',
+        'count': 4,
+        'meetingroom_id': 1,
+    }
+    json.update(kwargs)
+    return json
+
+
+def test_create_series_and_get_occurrences(user_client, create_meeting_room):
+    """Вхождения серии разворачиваются по запросу за нужный период"""
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    response = user_client.post('/reservation_series/', json=series_json(
+        start, exceptions=[(start + timedelta(weeks=1)).isoformat()]
+    ))
+    assert response.status_code == 200, response.json()
+    data = response.json()
+    assert data['last_to_reserve'] == (
+        start + timedelta(weeks=3, hours=1)
+    ).isoformat()
+
+    response = user_client.get(
+        f'/reservation_series/{data["id"]}/occurrences'
+    )
+    assert response.status_code == 200
+    assert [occurrence['from_reserve'] for occurrence in response.json()] == [
+        (start + timedelta(weeks=week)).isoformat() for week in (0, 2, 3)
+    ], 'Отменённое вхождение не должно возвращаться'
+
+    response = user_client.get(
+        f'/reservation_series/{data["id"]}/occurrences',
+        params={
+            'from_reserve': (start + timedelta(weeks=1)).isoformat(),
+            'to_reserve': (start + timedelta(weeks=2, minutes=30)).isoformat(),
+        },
+    )
+    assert [occurrence['from_reserve'] for occurrence in response.json()] == [
+        (start + timedelta(weeks=2)).isoformat()
+    ]
+
+    response = user_client.get('/reservation_series/my_series')
+    assert [series['id'] for series in response.json()] == [data['id']]
+
+
+@pytest.mark.parametrize('json', [
+    {'count': None},
+    {'until': (datetime.now() + timedelta(days=30)).isoformat()},
+    {'frequency': 'daily', 'to_reserve': (
+        datetime.now() + timedelta(days=3)).isoformat()},
+    {'count': 5000},
+])
+def test_create_series_incorrect(user_client, create_meeting_room, json):
+    """Серия должна иметь одно условие окончания, ограниченную длину и не
+    пересекаться сама с собой"""
+    response = user_client.post('/reservation_series/', json=series_json(
+        datetime.now() + timedelta(days=1), **json
+    ))
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize('occupancy_index_enabled', [False, True])
+def test_series_conflicts(
+        user_client, create_meeting_room,
+        create_actual_reserved_meeting_room, monkeypatch,
+        occupancy_index_enabled
+):
+    """Серия проверяется на пересечения с бронями целиком, а отдельная
+    бронь - с вхождениями серий"""
+    monkeypatch.setattr(
+        settings, 'occupancy_index_enabled', occupancy_index_enabled
+    )
+    reserved_from = create_actual_reserved_meeting_room.from_reserve
+    response = user_client.post('/reservation_series/', json=series_json(
+        reserved_from - timedelta(weeks=1, minutes=30), count=2,
+    ))
+    assert response.status_code == 422, (
+        'Второе вхождение серии пересекается с существующей бронью'
+    )
+
+    series_start = reserved_from + timedelta(days=1)
+    response = user_client.post(
+        '/reservation_series/', json=series_json(series_start)
+    )
+    assert response.status_code == 200, response.json()
+    series_id = response.json()['id']
+
+    reservation = {
+        'from_reserve': (series_start + timedelta(weeks=2)).isoformat(),
+        'to_reserve': (
+            series_start + timedelta(weeks=2, minutes=30)
+        ).isoformat(),
+        'meetingroom_id': 1,
+    }
+    response = user_client.post('/reservations/', json=reservation)
+    assert response.status_code == 422, (
+        'Бронь пересекается с третьим вхождением серии'
+    )
+
+    response = user_client.patch(
+        f'/reservation_series/{series_id}',
+        json={'exceptions': [reservation['from_reserve']]},
+    )
+    assert response.status_code == 200, response.json()
+    response = user_client.post('/reservations/', json=reservation)
+    assert response.status_code == 200, (
+        'Отменённое вхождение серии не должно мешать бронированию'
+    )
+
+    response = user_client.patch(
+        f'/reservation_series/{series_id}', json={'exceptions': []}
+    )
+    assert response.status_code == 422, (
+        'Нельзя вернуть вхождение серии, если время уже занято'
+    )
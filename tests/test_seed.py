@@ -0,0 +1,189 @@
+import csv
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from app.core import seed
+from app.core.passwords import password_hasher
+from app.models import MeetingRoom, Reservation, ReservationSeries, User
+from conftest import TestingSessionLocal, engine
+
+FIRST_DAY = datetime(2030, 1, 7)
+
+DOUBLE_BOOKINGS = text(
+    'SELECT count(*) FROM reservation AS a JOIN reservation AS b '
+    'ON a.meetingroom_id = b.meetingroom_id AND a.id < b.id '
+    'AND a.from_reserve <= b.to_reserve AND a.to_reserve >= b.from_reserve'
+)
+
+
+async def scalar(statement):
+    async with engine.connect() as conn:
+        return await conn.scalar(statement)
+
+
+async def test_generate(monkeypatch):
+    """Сгенерированные брони не пересекаются, пароль хешируется один раз"""
+    monkeypatch.setattr(seed, 'REBUILD_INDEXES_FROM', 1)
+    seed.hash_password.cache_clear()
+    result = await seed.generate(
+        engine, rooms=3, users=4, reservations=50, first_day=FIRST_DAY
+    )
+    assert result == {'rooms': 3, 'users': 4, 'reservations': 50}
+    assert await scalar(select(func.count(MeetingRoom.id))) == 3
+    assert await scalar(select(func.count(Reservation.id))) == 50
+    assert await scalar(DOUBLE_BOOKINGS) == 0, (
+        'Сгенерированные брони одной комнаты не должны пересекаться'
+    )
+    assert await scalar(select(func.min(Reservation.from_reserve))) == (
+        FIRST_DAY + timedelta(hours=8)
+    )
+    assert seed.hash_password.cache_info().misses == 1, (
+        'Одинаковый пароль должен хешироваться один раз'
+    )
+    hashed_password = await scalar(select(User.hashed_password))
+    assert password_hasher.helper.verify_and_update(
+        seed.DEFAULT_PASSWORD, hashed_password
+    )[0]
+    indexes = await scalar(text(
+        "SELECT count(*) FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'reservation' "
+        "AND name LIKE 'ix_reservation_%'"
+    ))
+    assert indexes == len(Reservation.__table__.indexes), (
+        'Индексы брони должны быть созданы заново после загрузки'
+    )
+
+
+async def test_generate_appends(mixer):
+    """Новые комнаты и пользователи получают следующие идентификаторы"""
+    mixer.blend('app.models.meeting_room.MeetingRoom', name='Existing')
+    await seed.generate(
+        engine, rooms=2, users=1, reservations=4, first_day=FIRST_DAY
+    )
+    assert await scalar(select(func.max(MeetingRoom.id))) == 3
+    assert await scalar(
+        select(func.count(Reservation.id)).where(
+            Reservation.meetingroom_id == 1
+        )
+    ) == 0, 'Брони создаются только для новых комнат'
+
+
+async def test_import(mixer, tmp_path):
+    """Импорт пропускает брони, пересекающиеся между собой и с базой"""
+    with open(tmp_path / 'rooms.csv', 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['name', 'description'])
+        writer.writerows([['Room 1', ''], ['Room 2', 'Second']])
+    with open(tmp_path / 'users.csv', 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['email', 'password', 'is_superuser'])
+        writer.writerows([
+            ['admin@example.com', 'secret', 'true'],
+            ['user@example.com', 'secret', 'false'],
+        ])
+    await seed.import_files(
+        engine, rooms=tmp_path / 'rooms.csv', users=tmp_path / 'users.csv'
+    )
+    assert await scalar(select(func.count(User.id))) == 2
+    assert await scalar(
+        select(User.is_superuser).where(User.email == 'admin@example.com')
+    )
+    mixer.blend(
+        'app.models.reservation.Reservation', meetingroom_id=1, user_id=1,
+        from_reserve=FIRST_DAY, to_reserve=FIRST_DAY + timedelta(hours=1),
+    )
+
+    def reservation(room_id, start, end):
+        return {
+            'from_reserve': (FIRST_DAY + timedelta(hours=start)).isoformat(),
+            'to_reserve': (FIRST_DAY + timedelta(hours=end)).isoformat(),
+            'id': None,
+            'meetingroom_id': room_id,
+            'user_id': 2,
+        }
+
+    reservations = [
+        reservation(1, 0.5, 2),  # Пересекает бронь в базе.
+        reservation(1, 2, 3),
+        reservation(1, 2.5, 4),  # Пересекает предыдущую.
+        reservation(1, 5, 4),  # Начало позже окончания.
+        reservation(2, 0.5, 2),
+    ]
+    with open(tmp_path / 'reservations.ndjson', 'w') as file:
+        file.writelines(json.dumps(row) + '\n' for row in reservations)
+    result = await seed.import_files(
+        engine, reservations=tmp_path / 'reservations.ndjson'
+    )
+    assert result == {'reservations': 2, 'skipped_reservations': 3}
+    assert await scalar(select(func.count(Reservation.id))) == 3
+    assert await scalar(DOUBLE_BOOKINGS) == 0
+
+
+async def test_import_chunks_and_series(monkeypatch, tmp_path):
+    """Импорт по частям пропускает брони, пересекающие прошлые части и
+    повторения серий"""
+    monkeypatch.setattr(seed, 'IMPORT_CHUNK_SIZE', 2)
+    await seed.generate(engine, rooms=2, users=1, reservations=0)
+    async with TestingSessionLocal() as session:
+        session.add(ReservationSeries(
+            from_reserve=FIRST_DAY + timedelta(hours=9),
+            to_reserve=FIRST_DAY + timedelta(hours=10),
+            frequency='daily', count=2,
+            last_to_reserve=FIRST_DAY + timedelta(days=1, hours=10),
+            meetingroom_id=1, user_id=1,
+        ))
+        await session.commit()
+
+    def reservation(room_id, start, end):
+        return {
+            'from_reserve': (FIRST_DAY + timedelta(hours=start)).isoformat(),
+            'to_reserve': (FIRST_DAY + timedelta(hours=end)).isoformat(),
+            'id': None,
+            'meetingroom_id': room_id,
+            'user_id': 1,
+        }
+
+    reservations = [
+        reservation(1, 9.5, 11),  # Пересекает первое повторение серии.
+        reservation(1, 12, 13),
+        reservation(2, 12, 13),
+        reservation(1, 12.5, 14),  # Пересекает бронь из первой части.
+        reservation(1, 33, 33.5),  # Пересекает второе повторение серии.
+        reservation(1, 35, 36),
+    ]
+    with open(tmp_path / 'reservations.ndjson', 'w') as file:
+        file.writelines(json.dumps(row) + '\n' for row in reservations)
+    result = await seed.import_files(
+        engine, reservations=tmp_path / 'reservations.ndjson'
+    )
+    assert result == {'reservations': 3, 'skipped_reservations': 3}
+    assert await scalar(DOUBLE_BOOKINGS) == 0
+
+
+async def test_import_assigns_ids(mixer, tmp_path):
+    """Импортированные брони получают новые id, а не id из выгрузки"""
+    await seed.generate(engine, rooms=1, users=1, reservations=0)
+    mixer.blend(
+        'app.models.reservation.Reservation', id=1, meetingroom_id=1,
+        user_id=1, from_reserve=FIRST_DAY,
+        to_reserve=FIRST_DAY + timedelta(hours=1),
+    )
+    with open(tmp_path / 'reservations.ndjson', 'w') as file:
+        file.write(json.dumps({
+            'id': 1,
+            'from_reserve': (FIRST_DAY + timedelta(hours=2)).isoformat(),
+            'to_reserve': (FIRST_DAY + timedelta(hours=3)).isoformat(),
+            'meetingroom_id': 1,
+            'user_id': 1,
+        }) + '\n')
+    result = await seed.import_files(
+        engine, reservations=tmp_path / 'reservations.ndjson'
+    )
+    assert result == {'reservations': 1, 'skipped_reservations': 0}
+    async with engine.connect() as conn:
+        ids = (await conn.scalars(
+            select(Reservation.id).order_by(Reservation.id)
+        )).all()
+    assert ids == [1, 2], 'Id из выгрузки не должен занимать id в базе'
@@ -0,0 +1,262 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.validators import check_name_duplicate
+from app.core import seed
+from app.core.archive import archive_reservations
+from app.core.queries import record_queries
+from app.core.user import UserManager
+from app.crud.meeting_room import meeting_room_crud
+from app.crud.reservation import reservation_crud
+from app.models import (MeetingRoom, Reservation, ReservationArchive,
+                        ReservationSeries, User)
+from app.schemas.reservation import ReservationCreate
+from conftest import TestingSessionLocal, engine
+
+FROM_RESERVE = (datetime.now() + timedelta(days=1)).replace(microsecond=0)
+
+
+@pytest.fixture
+def statements():
+    """SQL-выражения, выполненные за время теста."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement.split(maxsplit=1)[0].upper())
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    yield executed
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
+async def test_remove_meeting_room_cascade():
+    """Брони удаляемой комнаты удаляет БД, ORM их не загружает"""
+    await seed.generate(
+        engine, rooms=2, users=1, reservations=20,
+        first_day=datetime(2020, 1, 6),
+    )
+    await archive_reservations(TestingSessionLocal)
+    async with engine.connect() as conn:
+        # Foreign keys of the application database, see _set_sqlite_pragmas.
+        await conn.exec_driver_sql('PRAGMA foreign_keys=ON')
+        async with AsyncSession(bind=conn) as session:
+            room = await session.get(MeetingRoom, 1)
+            with record_queries() as recorder:
+                await meeting_room_crud.remove(room, session)
+        assert not [
+            statement for statement in recorder.statements
+            if 'reservation' in statement
+        ], 'Брони комнаты не должны загружаться и удаляться по одной'
+        room_ids = set()
+        for model in (Reservation, ReservationArchive):
+            room_ids.update((await conn.execute(
+                select(model.meetingroom_id).distinct()
+            )).scalars())
+        assert room_ids == {2}, (
+            'Брони удалённой комнаты должны удаляться вместе с ней'
+        )
+
+
+async def test_remove_user_keeps_reservations():
+    """Брони и серии удалённого пользователя остаются без владельца"""
+    await seed.generate(engine, rooms=1, users=1, reservations=20)
+    await archive_reservations(TestingSessionLocal)
+    async with engine.connect() as conn:
+        # Foreign keys of the application database, see _set_sqlite_pragmas.
+        await conn.exec_driver_sql('PRAGMA foreign_keys=ON')
+        async with AsyncSession(bind=conn) as session:
+            session.add(ReservationSeries(
+                from_reserve=FROM_RESERVE,
+                to_reserve=FROM_RESERVE + timedelta(hours=1),
+                frequency='daily', count=2,
+                last_to_reserve=FROM_RESERVE + timedelta(days=1, hours=1),
+                meetingroom_id=1, user_id=1,
+            ))
+            await session.commit()
+            user = await session.get(User, 1)
+            await UserManager(SQLAlchemyUserDatabase(session, User)).delete(
+                user
+            )
+        for model in (Reservation, ReservationArchive, ReservationSeries):
+            user_ids = (await conn.execute(
+                select(model.user_id).distinct()
+            )).scalars().all()
+            assert user_ids == [None], (
+                f'Строки {model.__tablename__} должны остаться без владельца'
+            )
+
+
+def reservation_json(hours=0):
+    return {
+        'meetingroom_id': 1,
+        'from_reserve': (FROM_RESERVE + timedelta(hours=hours)).isoformat(),
+        'to_reserve': (
+            FROM_RESERVE + timedelta(hours=hours, minutes=30)
+        ).isoformat(),
+    }
+
+
+def test_create_meeting_room_queries(superuser_client, statements):
+    """Создание переговорки выполняется одним запросом к базе"""
+    response = superuser_client.post('/meeting_rooms/', json={'name': 'New'})
+    assert response.status_code == 200
+    assert response.json()['name'] == 'New'
+    assert statements == ['INSERT'], (
+        'Создание переговорки должно выполняться одним INSERT без проверки '
+        'имени и перечитывания записи'
+    )
+
+
+def test_update_meeting_room_queries(
+    superuser_client, create_meeting_room, statements
+):
+    """Изменение переговорки не перечитывает её после записи"""
+    response = superuser_client.patch(
+        f'/meeting_rooms/{create_meeting_room.id}', json={'name': 'Renamed'}
+    )
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Renamed'
+    assert statements == ['SELECT', 'UPDATE'], (
+        'Изменение переговорки должно читать её и выполнять один UPDATE'
+    )
+
+
+def test_update_meeting_room_duplicate(
+    superuser_client, create_meeting_room, create_another_meeting_room
+):
+    """Переименование в существующее имя возвращает 422 и не меняет
+    переговорку"""
+    response = superuser_client.patch(
+        f'/meeting_rooms/{create_another_meeting_room.id}',
+        json={'name': create_meeting_room.name},
+    )
+    assert response.status_code == 422
+    assert response.json() == {
+        'detail': 'Переговорка с таким именем уже существует!'
+    }
+    response = superuser_client.patch(
+        f'/meeting_rooms/{create_another_meeting_room.id}',
+        json={'name': create_another_meeting_room.name},
+    )
+    assert response.status_code == 200, (
+        'Переговорку можно сохранить с её собственным именем'
+    )
+
+
+def test_name_duplicate_other_integrity_error():
+    """Нарушение других ограничений не выдаётся за дубликат имени"""
+    error = IntegrityError(
+        'DELETE FROM meetingroom', {}, Exception(
+            'FOREIGN KEY constraint failed'
+        )
+    )
+    with pytest.raises(IntegrityError):
+        with check_name_duplicate():
+            raise error
+
+
+def test_create_reservation_queries(
+    user_client, create_meeting_room, statements
+):
+    """Свободная комната бронируется одним запросом к базе"""
+    response = user_client.post('/reservations/', json=reservation_json())
+    assert response.status_code == 200
+    assert response.json()['from_reserve'] == reservation_json()[
+        'from_reserve'
+    ]
+    assert statements == ['INSERT'], (
+        'Проверка комнаты, пересечений и запись брони должны выполняться '
+        'одним INSERT ... SELECT'
+    )
+
+
+def test_create_reservation_failures(user_client, create_meeting_room):
+    """Неудачная вставка различает отсутствующую комнату и пересечение"""
+    response = user_client.post(
+        '/reservations/', json={**reservation_json(), 'meetingroom_id': 2}
+    )
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'Переговорка не найдена!'}
+    assert user_client.post(
+        '/reservations/', json=reservation_json()
+    ).status_code == 200
+    assert user_client.post(
+        '/reservations/', json=reservation_json()
+    ).status_code == 422, 'Пересекающаяся бронь должна отклоняться'
+
+
+async def test_create_reservation_failure_keeps_user(mixer):
+    """Неудачная вставка не сбрасывает пользователя, загруженного в той же
+    сессии"""
+    mixer.blend('app.models.user.User', email='user@example.com')
+    async with TestingSessionLocal() as session:
+        user = await session.scalar(select(User))
+        created = await reservation_crud.create_if_free(
+            ReservationCreate(**reservation_json()), session, user
+        )
+        assert created is None
+        assert user.email == 'user@example.com', (
+            'После отката пользователь запроса должен оставаться доступным '
+            'без обращения к базе'
+        )
+
+
+def test_create_reservation_between_occurrences(
+    user_client, create_meeting_room
+):
+    """Бронь между бронированиями серии создаётся, хотя попадает в
+    период серии"""
+    response = user_client.post('/reservation_series/', json={
+        **reservation_json(), 'frequency': 'daily', 'count': 3,
+    })
+    assert response.status_code == 200, response.json()
+    response = user_client.post(
+        '/reservations/', json=reservation_json(hours=2)
+    )
+    assert response.status_code == 200, response.json()
+    response = user_client.post(
+        '/reservations/', json=reservation_json(hours=24)
+    )
+    assert response.status_code == 422, (
+        'Бронь, пересекающая бронирование серии, должна отклоняться'
+    )
+
+
+def test_update_reservation_queries(
+    user_client, create_meeting_room, statements
+):
+    """Изменение брони записывается одним UPDATE последним запросом"""
+    reservation_id = user_client.post(
+        '/reservations/', json=reservation_json()
+    ).json()['id']
+    statements.clear()
+    moved = reservation_json(hours=2)
+    del moved['meetingroom_id']
+    response = user_client.patch(f'/reservations/{reservation_id}', json=moved)
+    assert response.status_code == 200
+    assert response.json()['from_reserve'] == moved['from_reserve']
+    assert statements.count('UPDATE') == 1
+    assert statements[-1] == 'UPDATE', (
+        'После изменения брони не должно быть запросов к базе'
+    )
+
+
+def test_create_series_queries(user_client, create_meeting_room, statements):
+    """Серия записывается одним INSERT последним запросом"""
+    response = user_client.post('/reservation_series/', json={
+        **reservation_json(), 'frequency': 'weekly', 'count': 3,
+    })
+    assert response.status_code == 200, response.json()
+    assert statements.count('INSERT') == 1
+    assert statements[-1] == 'INSERT', (
+        'После записи серии не должно быть запросов к базе'
+    )